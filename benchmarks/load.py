@@ -0,0 +1,402 @@
+"""
+Capacity test of a served viewer app under many concurrent sessions.
+
+    python benchmarks/load.py examples/05_multi_view.py
+    python benchmarks/load.py examples/05_multi_view.py --sessions 1,10,50 --num-procs 4
+    python benchmarks/load.py examples/08_live_mesh.py --interact 2 -o capacity.json
+
+Starts ``panel serve`` on the app with ``probe.py`` as its setup script
+and opens sessions in steps, without a browser. Each simulated user
+requests the page, connects to the Bokeh WebSocket with the session token
+from it and pulls the document, then stays connected, counting the
+messages the server pushes. With ``--interact`` every session also sends
+camera changes at the given rate, like a user dragging the view. Sessions
+accumulate, so each step holds its number of sessions for ``--hold``
+seconds.
+
+Each step of the resulting capacity curve records the open latency of
+the sessions it added (page, WebSocket and document), the messages and
+bytes per second received and sent, the bytes per session, the event
+loop lag of the workers and their resident and proportional set sizes.
+The largest step whose 95th percentile open latency and 99th percentile
+lag stay within ``--slo-ms`` and ``--max-lag-ms`` without failed sessions
+is reported as the capacity. Repeat with different ``--num-procs`` to
+size the workers of a host. The clients share the host with the server,
+so the curve is pessimistic at large steps.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.websocket import websocket_connect
+
+PROBE = Path(__file__).parent / "probe.py"
+
+TOKEN = re.compile(r'"token":"([^"]+)"')
+
+MAX_MESSAGE_SIZE = 1 << 31
+
+# Panel names the data model of a component after its class
+VIEWER_MODEL = re.compile(r"ModelViewer\d*$")
+
+
+class Session:
+    """
+    A simulated user of the app, speaking the Bokeh protocol.
+    """
+
+    def __init__(self):
+        self.open_ms = None
+        self.document_bytes = 0
+        self.received = self.received_bytes = 0
+        self.sent = self.sent_bytes = 0
+        self.error = None
+        self._ws = None
+        self._tasks = []
+
+    async def open(self, url: str, interact: float, timeout: float) -> None:
+        start = time.perf_counter()
+        try:
+            response = await AsyncHTTPClient().fetch(url, request_timeout=timeout)
+            match = TOKEN.search(response.body.decode())
+            if match is None:
+                raise ValueError("The page has no session token")
+            self._ws = await websocket_connect(
+                HTTPRequest(re.sub("^http", "ws", url) + "/ws", request_timeout=timeout),
+                subprotocols=["bokeh", match.group(1)],
+                max_message_size=MAX_MESSAGE_SIZE,
+            )
+            # The server accepts messages once it acknowledged the connection
+            await asyncio.wait_for(self._receive(), timeout)
+            await self._send("PULL-DOC-REQ", {})
+            while True:
+                header, content = await asyncio.wait_for(self._receive(), timeout)
+                if header["msgtype"] == "PULL-DOC-REPLY":
+                    break
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.close()
+            return
+        self.open_ms = (time.perf_counter() - start) * 1e3
+        self.document_bytes = self.received_bytes
+        self._tasks.append(asyncio.ensure_future(self._listen()))
+        if interact:
+            models = _camera_models(json.loads(content)["doc"])
+            if models:
+                self._tasks.append(asyncio.ensure_future(self._interact(models, interact)))
+
+    async def _receive(self) -> tuple[dict, str | bytes]:
+        """
+        The header and content of the next message. The content of large
+        documents is only parsed when needed.
+        """
+        frames = []
+        for _ in range(3):
+            frames.append(await self._read())
+        header = json.loads(frames[0])
+        for _ in range(2 * header.get("num_buffers", 0)):
+            await self._read()
+        self.received += 1
+        return header, frames[2]
+
+    async def _read(self) -> str | bytes:
+        ws = self._ws
+        if ws is None:
+            raise ConnectionError("Connection closed by the client")
+        frame = await ws.read_message()
+        if frame is None:
+            raise ConnectionError("Connection closed by the server")
+        self.received_bytes += len(frame)
+        return frame
+
+    async def _send(self, msgtype: str, content: dict) -> None:
+        ws = self._ws
+        if ws is None:
+            raise ConnectionError("Connection closed by the client")
+        header = {"msgid": uuid.uuid4().hex, "msgtype": msgtype}
+        for frame in (json.dumps(header), "{}", json.dumps(content)):
+            await ws.write_message(frame)
+            self.sent_bytes += len(frame)
+        self.sent += 1
+
+    async def _listen(self) -> None:
+        try:
+            while True:
+                await self._receive()
+        except Exception as e:
+            if self._ws is not None:
+                self.error = f"{type(e).__name__}: {e}"
+
+    async def _interact(self, models: list[str], rate: float) -> None:
+        while self._ws is not None:
+            await asyncio.sleep(random.expovariate(rate))
+            orbit = f"{random.uniform(-180, 180):.1f}deg {random.uniform(10, 170):.1f}deg auto"
+            event = {
+                "kind": "ModelChanged",
+                "model": {"id": random.choice(models)},
+                "attr": "camera_orbit",
+                "new": orbit,
+            }
+            try:
+                await self._send("PATCH-DOC", {"events": [event]})
+            except Exception:
+                return
+
+    def close(self) -> None:
+        ws, self._ws = self._ws, None
+        for task in self._tasks:
+            task.cancel()
+        if ws is not None:
+            ws.close()
+
+
+def _camera_models(doc: dict) -> list[str]:
+    """
+    Ids of the models holding the parameters of ModelViewer components in
+    a serialized document.
+    """
+    ids, stack = [], [doc]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if value.get("type") == "object" and VIEWER_MODEL.match(value.get("name", "")):
+                ids.append(value["id"])
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return ids
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(app: Path, num_procs: int, directory: Path, timeout: float):
+    """
+    Run ``panel serve`` on ``app`` with the probe until the block exits,
+    yielding the URL of the app once every worker reports.
+    """
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "panel", "serve", str(app),
+        "--port", str(port),
+        "--num-procs", str(num_procs),
+        "--setup", str(PROBE),
+        "--allow-websocket-origin", f"localhost:{port}",
+    ]
+    with open(directory / "server.log", "w") as log:
+        process = subprocess.Popen(
+            command,
+            env={**os.environ, "MODEL_VIEWER_PROBE": str(directory)},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    try:
+        deadline = time.monotonic() + timeout
+        while len(_probe_records(directory)) < num_procs or not _listening(port):
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(
+                    f"panel serve did not start, see {directory / 'server.log'}:\n"
+                    + (directory / "server.log").read_text()[-2000:]
+                )
+            time.sleep(0.2)
+        yield f"http://localhost:{port}/{app.stem}"
+    finally:
+        # The workers of --num-procs share the process group
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+def _listening(port: int) -> bool:
+    with socket.socket() as s:
+        return s.connect_ex(("localhost", port)) == 0
+
+
+def _probe_records(directory: Path) -> dict[int, list[dict]]:
+    records = {}
+    for path in directory.glob("*.jsonl"):
+        lines = path.read_text().splitlines()
+        records[int(path.stem)] = [json.loads(line) for line in lines if line.endswith("}")]
+    return {pid: r for pid, r in records.items() if r}
+
+
+def _server_stats(directory: Path, start: float, end: float) -> dict:
+    """
+    Event loop lag of all workers between ``start`` and ``end`` and the
+    memory they last reported by ``end``.
+    """
+    lags, rss, pss = [], 0, 0
+    for records in _probe_records(directory).values():
+        window = [r for r in records if start <= r["time"] <= end + 1]
+        for record in window:
+            lags.extend(record["lag_ms"])
+        last = [r for r in records if r["time"] <= end + 1][-1]
+        rss += last.get("rss", 0)
+        pss += last.get("pss", 0)
+    return {
+        "loop_lag_ms": _percentiles(lags, (50, 99, 100)),
+        "rss_bytes": rss,
+        "pss_bytes": pss or None,
+    }
+
+
+def _percentiles(values, percentiles=(50, 95, 100)) -> dict[str, float] | None:
+    if not len(values):
+        return None
+    names = ["max" if p == 100 else f"p{p}" for p in percentiles]
+    return dict(zip(names, np.percentile(values, percentiles).round(3).tolist(), strict=True))
+
+
+async def ramp(url: str, steps, hold: float, interact: float, directory: Path, timeout: float):
+    sessions: list[Session] = []
+    await asyncio.sleep(hold)
+    idle = _server_stats(directory, time.time() - hold, time.time())
+    curve = []
+    print(HEADER)
+    try:
+        for n in steps:
+            start = time.time()
+            added = [Session() for _ in range(max(0, n - len(sessions)))]
+            await asyncio.gather(*(s.open(url, interact, timeout) for s in added))
+            sessions.extend(added)
+            live = [s for s in sessions if s.error is None]
+            before = [(s.received, s.received_bytes, s.sent, s.sent_bytes) for s in live]
+            await asyncio.sleep(hold)
+            held = time.time()
+            after = [(s.received, s.received_bytes, s.sent, s.sent_bytes) for s in live]
+            rates = (np.sum(after, axis=0) - np.sum(before, axis=0)) / hold if live else [0] * 4
+            opened = [s for s in added if s.open_ms is not None]
+            server = _server_stats(directory, start, held)
+            step = {
+                "sessions": n,
+                "live": sum(s.error is None for s in sessions),
+                "failed": sum(s.error is not None for s in sessions),
+                "open_ms": _percentiles([s.open_ms for s in opened]),
+                "document_bytes": int(np.mean([s.document_bytes for s in opened]))
+                if opened else None,
+                "bytes_per_session": int(np.mean([s.received_bytes for s in live]))
+                if live else None,
+                "received_per_s": float(rates[0]),
+                "received_bytes_per_s": float(rates[1]),
+                "sent_per_s": float(rates[2]),
+                "sent_bytes_per_s": float(rates[3]),
+                **server,
+                "rss_per_session": (server["rss_bytes"] - idle["rss_bytes"]) / n,
+            }
+            curve.append(step)
+            _print_step(step)
+            errors = {s.error for s in sessions if s.error}
+            for error in sorted(errors)[:3]:
+                print(f"  error: {error}", file=sys.stderr)
+    finally:
+        for session in sessions:
+            session.close()
+    return idle, curve
+
+
+def capacity(curve: list[dict], slo_ms: float, max_lag_ms: float) -> int:
+    """
+    The largest number of sessions before the first step that failed
+    sessions or exceeded the latency or lag objectives.
+    """
+    supported = 0
+    for step in curve:
+        open_ms, lag = step["open_ms"] or {}, step["loop_lag_ms"] or {}
+        if (
+            step["failed"]
+            or open_ms.get("p95", 0) > slo_ms
+            or lag.get("p99", 0) > max_lag_ms
+        ):
+            break
+        supported = step["sessions"]
+    return supported
+
+
+HEADER = (
+    f"{'sessions':>8} {'failed':>6} {'open p50':>9} {'open p95':>9} {'msg/s':>8} "
+    f"{'kB/s':>9} {'MB/sess':>8} {'lag p99':>8} {'lag max':>8} {'RSS MB':>8} "
+    f"{'PSS MB':>8} {'RSS/sess':>8}"
+)
+
+
+def _print_step(step: dict) -> None:
+    open_ms = step["open_ms"] or {"p50": float("nan"), "p95": float("nan")}
+    lag = step["loop_lag_ms"] or {"p99": float("nan"), "max": float("nan")}
+    print(
+        f"{step['sessions']:>8} {step['failed']:>6} {open_ms['p50']:>9.0f} {open_ms['p95']:>9.0f} "
+        f"{step['received_per_s']:>8.1f} {step['received_bytes_per_s'] / 1e3:>9.1f} "
+        f"{(step['bytes_per_session'] or 0) / 1e6:>8.2f} {lag['p99']:>8.1f} {lag['max']:>8.1f} "
+        f"{step['rss_bytes'] / 1e6:>8.1f} {(step['pss_bytes'] or 0) / 1e6:>8.1f} "
+        f"{step['rss_per_session'] / 1e6:>8.2f}"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("app", type=Path, help="the app script to serve")
+    parser.add_argument("--sessions", default="1,5,10,25,50",
+                        help="comma separated numbers of concurrent sessions to ramp through")
+    parser.add_argument("--hold", type=float, default=10, help="seconds to hold each step")
+    parser.add_argument("--interact", type=float, default=0,
+                        help="camera changes per second each session sends")
+    parser.add_argument("--num-procs", type=int, default=1)
+    parser.add_argument("--slo-ms", type=float, default=3000,
+                        help="95th percentile session open latency objective")
+    parser.add_argument("--max-lag-ms", type=float, default=100,
+                        help="99th percentile event loop lag objective")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("-o", "--output", type=Path, help="write the capacity curve to this file")
+    args = parser.parse_args(argv)
+    steps = sorted({int(n) for n in args.sessions.split(",")})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        with serve(args.app, args.num_procs, directory, args.timeout) as url:
+            idle, curve = asyncio.run(
+                ramp(url, steps, args.hold, args.interact, directory, args.timeout)
+            )
+    supported = capacity(curve, args.slo_ms, args.max_lag_ms)
+    print(
+        f"Capacity: {supported} sessions with {args.num_procs} process(es) within "
+        f"p95 open {args.slo_ms:g} ms and p99 lag {args.max_lag_ms:g} ms"
+    )
+    if args.output:
+        result = {
+            "app": str(args.app),
+            "num_procs": args.num_procs,
+            "interact": args.interact,
+            "hold": args.hold,
+            "slo_ms": args.slo_ms,
+            "max_lag_ms": args.max_lag_ms,
+            "idle": idle,
+            "steps": curve,
+            "capacity": supported,
+        }
+        args.output.write_text(json.dumps(result, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Setup script that ``benchmarks/load.py`` passes to ``panel serve --setup``.
+
+Panel runs it in every worker process. It measures how late the event
+loop runs a callback scheduled every few milliseconds, and appends the
+delays, with the resident and proportional set sizes of the process,
+once a second as a JSON line to ``<MODEL_VIEWER_PROBE>/<pid>.jsonl``.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from tornado.ioloop import IOLoop
+
+INTERVAL = 0.02
+FLUSH = 1.0
+
+_path = Path(os.environ["MODEL_VIEWER_PROBE"]) / f"{os.getpid()}.jsonl"
+
+
+def _memory() -> dict:
+    sizes = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    sizes[key.lower()] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        sizes["rss"] = peak if os.uname().sysname == "Darwin" else peak * 1024
+    return sizes
+
+
+class _Probe:
+    def __init__(self, loop: IOLoop):
+        self.loop = loop
+        self.lags: list[float] = []
+        self.flushed = time.monotonic()
+        self.expected = self.flushed + INTERVAL
+        loop.call_at(loop.time() + INTERVAL, self.tick)
+
+    def tick(self) -> None:
+        now = time.monotonic()
+        self.lags.append(round(max(0.0, now - self.expected) * 1e3, 3))
+        if now - self.flushed >= FLUSH:
+            record = {"pid": os.getpid(), "time": time.time(), "lag_ms": self.lags, **_memory()}
+            with _path.open("a") as f:
+                f.write(json.dumps(record) + "\n")
+            self.lags, self.flushed = [], now
+        self.expected = time.monotonic() + INTERVAL
+        self.loop.call_at(self.loop.time() + INTERVAL, self.tick)
+
+
+_Probe(IOLoop.current())
@@ -0,0 +1,356 @@
+"""
+Benchmarks of the server-side cost and browser load time of ModelViewer.
+
+    python benchmarks/run.py                        # all suites, compared to baseline.json
+    python benchmarks/run.py -s encode -s session   # selected suites
+    python benchmarks/run.py -o results.json        # also write the results
+    python benchmarks/run.py --save-baseline        # record a new baseline
+    python benchmarks/run.py -s browser --save-baseline  # record or update one suite
+
+Suites:
+
+encode
+    Throughput of ``ModelViewer._process_blob`` on the bundled models
+    with an empty blob cache, and the size of the resulting src.
+session
+    Time to construct a viewer of each model and render it into a new
+    document, as every session does, and the size of the serialized
+    document a session pulls.
+memory
+    Server RSS per viewer over many sessions showing the same model.
+browser
+    Time from requesting each example from ``panel serve`` until every
+    <model-viewer> on the page has fired ``load``, in headless Chromium
+    rendering with SwiftShader. Needs playwright and its Chromium.
+
+The run exits with status 1 if a metric is worse than the baseline by
+more than the tolerance of its kind, has no baseline, or is in the
+baseline of a selected suite but was not measured, e.g. because the
+browser suite could not run. Timings vary between machines, so baselines
+should be recorded on the machine that compares against them. Saving a
+baseline replaces the metrics of the selected suites and keeps the rest.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import panel as pn
+from bokeh.core.types import ID
+from bokeh.document import Document
+from bokeh.protocol import Protocol
+
+from panel_model_viewer import ModelViewer
+from panel_model_viewer.cache import blob_cache
+
+ROOT = Path(__file__).parent.parent
+STATIC = ROOT / "panel_model_viewer" / "static"
+EXAMPLES = ROOT / "examples"
+BASELINE = Path(__file__).parent / "baseline.json"
+
+MODELS = ("Box.glb", "Fox.glb", "astronaut.glb")
+
+# Relative amount by which a metric of each kind may be worse than its baseline
+TOLERANCES = {"bytes": 0.02, "time": 0.5, "throughput": 0.5, "memory": 0.3}
+
+# Kinds that are compared relative to the reference workload timed alongside them
+SCALED = ("time", "throughput")
+
+# Headless Chromium renders WebGL on the CPU with these
+CHROMIUM_ARGS = ["--use-gl=angle", "--use-angle=swiftshader", "--enable-unsafe-swiftshader"]
+
+# Resolves once every <model-viewer>, including those in shadow roots, has loaded
+ALL_LOADED = """
+() => {
+    const viewers = [];
+    const walk = (root) => {
+        for (const el of root.querySelectorAll("*")) {
+            if (el.tagName === "MODEL-VIEWER") viewers.push(el);
+            if (el.shadowRoot) walk(el.shadowRoot);
+        }
+    };
+    walk(document);
+    return viewers.length > 0 && viewers.every((v) => v.loaded) && performance.now();
+}
+"""
+
+
+def metric(
+    value: float, unit: str, kind: str, better: str = "lower", reference_ms: float | None = None
+) -> dict:
+    result = {"value": value, "unit": unit, "kind": kind, "better": better}
+    if reference_ms is not None:
+        result["reference_ms"] = reference_ms
+    return result
+
+
+_RECORDS = [{"index": i, "name": str(i)} for i in range(5000)]
+
+
+def reference() -> None:
+    """
+    A fixed workload whose time tracks how fast the machine currently
+    runs Python. Timings are compared relative to it.
+    """
+    json.loads(json.dumps(_RECORDS))
+
+
+def timed(fn, repeat: int) -> tuple[float, float]:
+    """
+    Shortest wall times in seconds of ``repeat`` calls of ``fn`` and of
+    the reference workload run after each, the least disturbed by other
+    load on the machine. Like timeit, garbage collection is disabled
+    while timing.
+    """
+    times, reference_times = [], []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for target, samples in ((fn, times), (reference, reference_times)):
+                start = time.perf_counter()
+                target()
+                samples.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return min(times), min(reference_times)
+
+
+def rss() -> int:
+    """
+    Resident set size of this process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # Peak rather than current RSS, in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def session(src) -> tuple[ModelViewer, Document]:
+    """
+    A viewer of ``src`` rendered into a new document, as in a server session.
+    """
+    viewer = ModelViewer(src=src)
+    doc = Document()
+    doc.add_root(viewer.get_root(doc))
+    return viewer, doc
+
+
+def bench_encode(repeat: int) -> dict:
+    metrics = {}
+    viewer = ModelViewer()
+    for name in MODELS:
+        path = STATIC / name
+        megabytes = path.stat().st_size / 1e6
+
+        def cold(path=path):
+            blob_cache.clear()
+            viewer._process_blob(path)
+
+        seconds, reference_seconds = timed(cold, repeat)
+        metrics[f"encode.{name}.cold"] = metric(
+            megabytes / seconds, "MB/s", "throughput", "higher", reference_seconds * 1e3
+        )
+        metrics[f"encode.{name}.src_bytes"] = metric(
+            len(viewer._process_blob(path)), "B", "bytes"
+        )
+    return metrics
+
+
+def bench_session(repeat: int) -> dict:
+    metrics = {}
+    for name in MODELS:
+        path = STATIC / name
+        # The first session fills the blob cache, later ones hit it
+        session(path)
+        seconds, reference_seconds = timed(lambda path=path: session(path), repeat)
+        metrics[f"session.{name}.construct"] = metric(
+            seconds * 1e3, "ms", "time", reference_ms=reference_seconds * 1e3
+        )
+        _, doc = session(path)
+        message = Protocol().create("PULL-DOC-REPLY", ID("bench"), doc)
+        size = len(message.content_json) + sum(len(b.data) for b in message.buffers)
+        metrics[f"session.{name}.document_bytes"] = metric(size, "B", "bytes")
+    return metrics
+
+
+def bench_memory(sessions: int) -> dict:
+    metrics = {}
+    for name in MODELS:
+        path = STATIC / name
+        session(path)
+        gc.collect()
+        before = rss()
+        held = [session(path) for _ in range(sessions)]
+        gc.collect()
+        metrics[f"memory.{name}.rss_per_viewer"] = metric(
+            (rss() - before) / len(held), "B", "memory"
+        )
+        del held
+        gc.collect()
+    return metrics
+
+
+def bench_browser(repeat: int, timeout: float = 60) -> dict:
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        print("browser: skipped, playwright is not installed", file=sys.stderr)
+        return {}
+    from panel.tests.util import run_panel_serve, wait_for_port
+
+    metrics = {}
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(args=CHROMIUM_ARGS)
+        for script in sorted(EXAMPLES.glob("[0-9]*.py")):
+            with run_panel_serve(["--port", "0", script]) as process:
+                url = f"http://localhost:{wait_for_port(process.stdout)}/{script.stem}"
+                times, reference_times = [], []
+                for _ in range(repeat):
+                    # A new context has an empty HTTP cache, like a first visit
+                    context = browser.new_context()
+                    page = context.new_page()
+                    try:
+                        page.goto(url)
+                        handle = page.wait_for_function(
+                            ALL_LOADED, polling="raf", timeout=timeout * 1e3
+                        )
+                        times.append(handle.json_value())
+                    finally:
+                        context.close()
+                    reference_times.append(timed(reference, 3)[0] * 1e3)
+            metrics[f"browser.{script.stem}.load"] = metric(
+                statistics.median(times), "ms", "time", reference_ms=min(reference_times)
+            )
+        browser.close()
+    return metrics
+
+
+SUITES = {
+    "encode": lambda args: bench_encode(args.repeat),
+    "session": lambda args: bench_session(args.repeat),
+    "memory": lambda args: bench_memory(args.sessions),
+    "browser": lambda args: bench_browser(args.browser_repeat),
+}
+
+
+def compare(results: dict, baseline: dict, tolerances: dict = TOLERANCES) -> list[str]:
+    """
+    Descriptions of the metrics in ``results`` that are worse than in
+    ``baseline`` by more than the tolerance of their kind or that have no
+    baseline, and of the baseline metrics of the suites in ``results``
+    that were not measured. Timings are scaled by how much slower the
+    reference workload ran alongside them.
+    """
+    regressions = [
+        f"{name}: in the baseline but not measured"
+        for name in sorted(baseline["metrics"])
+        if _suite(name) in results["suites"] and name not in results["metrics"]
+    ]
+    for name, current in sorted(results["metrics"].items()):
+        base = baseline["metrics"].get(name)
+        if base is None:
+            regressions.append(f"{name}: not in the baseline, record it with --save-baseline")
+            continue
+        expected = base["value"]
+        if current["kind"] in SCALED and "reference_ms" in current and "reference_ms" in base:
+            slowdown = current["reference_ms"] / base["reference_ms"]
+            expected *= slowdown if current["better"] == "lower" else 1 / slowdown
+        if expected:
+            change = (current["value"] - expected) / expected
+        else:
+            change = float("inf") if current["value"] else 0.0
+        if current["better"] == "higher":
+            change = -change
+        if change > tolerances[current["kind"]]:
+            regressions.append(
+                f"{name}: {current['value']:.6g} {current['unit']}, expected "
+                f"{expected:.6g} from the baseline ({change:+.1%} worse, "
+                f"tolerance {tolerances[current['kind']]:.0%})"
+            )
+    return regressions
+
+
+def _suite(name: str) -> str:
+    return name.split(".", 1)[0]
+
+
+def _git(*args: str) -> str:
+    return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+
+def environment() -> dict:
+    commit = _git("rev-parse", "--short", "HEAD") or None
+    if commit and _git("status", "--porcelain", "--", "panel_model_viewer"):
+        # The measured package differs from the commit
+        commit += "-dirty"
+    return {
+        "python": platform.python_version(),
+        "panel": pn.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("-s", "--suite", action="append", choices=SUITES, dest="suites")
+    parser.add_argument("-o", "--output", type=Path, help="write the results to this file")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the results to the baseline instead of comparing")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--browser-repeat", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    suites = args.suites or list(SUITES)
+    results = {"environment": environment(), "suites": suites, "metrics": {}}
+    for suite in suites:
+        results["metrics"].update(SUITES[suite](args))
+    for name, m in sorted(results["metrics"].items()):
+        print(f"{name:<40} {m['value']:>16,.2f} {m['unit']}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    if args.save_baseline:
+        metrics = {
+            name: m
+            for name, m in (baseline["metrics"] if baseline else {}).items()
+            if _suite(name) not in suites
+        }
+        environments = baseline.get("environments", {}) if baseline else {}
+        environments.update(dict.fromkeys(suites, results["environment"]))
+        baseline = {
+            "environments": dict(sorted(environments.items())),
+            "metrics": dict(sorted({**metrics, **results["metrics"]}.items())),
+        }
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
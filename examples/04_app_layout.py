@@ -22,11 +22,15 @@ viewer = ModelViewer(
     style={"background-color": "#eee"},
 )
 
+background = pn.widgets.ColorPicker(name="Background Color", value="#eeeeee")
+reset_view = pn.widgets.Button(name="Reset View")
+
 sidebar = pn.Column(
     pn.pane.Markdown("## Controls"),
     pn.widgets.Checkbox.from_param(viewer.param.auto_rotate, name="Auto Rotate"),
     pn.widgets.Checkbox.from_param(viewer.param.camera_controls, name="Camera Controls"),
-    pn.widgets.ColorPicker(name="Background Color", value="#eeeeee"),
+    background,
+    reset_view,
 )
 
 
@@ -34,7 +38,18 @@ def update_bg(event):
     viewer.style = {**viewer.style, "background-color": event.new}
 
 
-sidebar[3].param.watch(update_bg, "value")
+def reset(event):
+    # Sent to the browser as one message and applied in one frame
+    with viewer.batch_update(
+        auto_rotate=True,
+        camera_orbit="0deg 75deg auto",
+        style={"background-color": "#eee"},
+    ):
+        background.value = "#eeeeee"
+
+
+background.param.watch(update_bg, "value")
+reset_view.on_click(reset)
 
 pn.template.MaterialTemplate(
     title="3D Model Dashboard",
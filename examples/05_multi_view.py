@@ -37,8 +37,17 @@ viewers = [
     ),
 ]
 
+# Dragging the camera of one viewer moves the others along
+for viewer, other in zip(viewers, viewers[1:] + viewers[:1], strict=True):
+    viewer.link(
+        other,
+        camera_orbit="camera_orbit",
+        camera_target="camera_target",
+        field_of_view="field_of_view",
+    )
+
 grid = pn.GridBox(*viewers, ncols=3, sizing_mode="stretch_width")
 
 pn.template.FastListTemplate(
-    title="Multi-View Gallery", main=[pn.pane.Markdown("# Multiple Independent Viewers"), grid]
+    title="Multi-View Gallery", main=[pn.pane.Markdown("# Multiple Linked Viewers"), grid]
 ).servable()
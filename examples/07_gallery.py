@@ -0,0 +1,31 @@
+from pathlib import Path
+
+import panel as pn
+
+from panel_model_viewer import ModelGallery
+
+pn.extension()
+
+# Models and posters are served from the asset route, run with
+# panel serve examples/07_gallery.py --plugins panel_model_viewer.assets
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
+
+# Repeat the bundled models to get a catalog of a few hundred items
+models = sorted(STATIC.glob("*.glb")) * 100
+
+gallery = ModelGallery(
+    objects=models,
+    page_size=30,
+    max_contexts=6,
+    item_width=200,
+    item_height=200,
+    height=700,
+    sizing_mode="stretch_width",
+)
+
+pn.Column(
+    "# Model Gallery",
+    pn.pane.Markdown(pn.bind(lambda i: f"Selected item: {i}", gallery.param.selected)),
+    gallery,
+).servable()
@@ -0,0 +1,37 @@
+import numpy as np
+import panel as pn
+
+from panel_model_viewer import ModelViewer
+
+pn.extension()
+
+# A 316 x 316 grid, about 100k vertices
+N = 316
+x, z = np.meshgrid(np.linspace(-1, 1, N), np.linspace(-1, 1, N))
+cells = np.arange(N * N).reshape(N, N)[:-1, :-1].ravel()
+faces = np.concatenate(
+    [np.stack([cells, cells + N, cells + 1], 1), np.stack([cells + 1, cells + N, cells + N + 1], 1)]
+)
+
+
+def surface(t):
+    r = np.hypot(x, z)
+    y = 0.1 * np.sin(12 * r - 4 * t) / (1 + 4 * r)
+    return np.column_stack([x.ravel(), y.ravel(), z.ravel()])
+
+
+viewer = ModelViewer.from_arrays(
+    surface(0), faces, height=600, sizing_mode="stretch_width", camera_orbit="30deg 60deg auto"
+)
+encoding = pn.widgets.RadioButtonGroup(options=["auto", "full", "quantized"], value="auto")
+state = {"t": 0.0}
+
+
+def step():
+    state["t"] += 1 / 30
+    viewer.update_geometry(positions=surface(state["t"]), encoding=encoding.value)
+
+
+pn.state.add_periodic_callback(step, period=33)
+
+pn.Column("# Live Mesh", encoding, viewer).servable()
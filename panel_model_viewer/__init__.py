@@ -1,3 +1,4 @@
+from .gallery import ModelGallery
 from .viewer import ModelViewer
 
-__all__ = ["ModelViewer"]
+__all__ = ["ModelGallery", "ModelViewer"]
@@ -0,0 +1,184 @@
+"""
+Content-addressed HTTP endpoint for serving local models.
+
+Instead of inlining a model into the Bokeh document as a base64 data URI,
+the bytes are registered here under their SHA-256 digest and the browser
+fetches them from a short URL. Because the URL changes whenever the content
+does, responses can be cached forever.
+
+Assets live in the shared :data:`~panel_model_viewer.cache.blob_cache`;
+blobs loaded from files survive eviction because they can be re-read, raw
+bytes that were evicted answer with 404.
+
+The same prefix serves the memory statistics of :mod:`.memory` as JSON
+and the browser statistics of :mod:`.telemetry` for scraping. The routes
+have to be known to the server. ``pn.serve`` servers are patched
+automatically when a viewer is created or an asset registered; with
+``panel serve`` pass ``--plugins panel_model_viewer.assets``.
+
+:mod:`.runtime` adds a route for the <model-viewer> runtime on the URL
+Panel's component resource route gives it. Only patched ``pn.serve``
+servers reach it. ``panel serve`` registers plugin routes after its own,
+so there Panel serves the runtime, uncompressed and without immutable
+caching, plugin or not.
+"""
+
+import gzip
+import mimetypes
+import re
+import weakref
+from typing import NoReturn
+
+from panel.io.state import state
+from tornado.web import HTTPError, RequestHandler
+
+from .cache import Blob, blob_cache
+from .memory import MemoryStatsHandler
+from .runtime import ROUTES as RUNTIME_ROUTES
+from .telemetry import MetricsHandler
+
+ASSET_PATH = "model_viewer_assets"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def asset_url(digest: str, suffix: str = ".glb") -> str:
+    """
+    URL of a registered asset, relative to the current page.
+    """
+    path = f"{ASSET_PATH}/{digest}{suffix}"
+    return f"{state.rel_path}/{path}" if state.rel_path else path
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """
+    The content codings an Accept-Encoding header allows, leaving out
+    those refused with q=0.
+    """
+    accepted = set()
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = next((p[2:] for p in params if p.startswith("q=")), "1")
+        try:
+            refused = float(quality) == 0
+        except ValueError:
+            refused = False
+        if coding and not refused:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def blob_src(blob: Blob, transport: str) -> str:
+    """
+    The src a browser loads a cached blob from: an asset URL for the
+    'http' transport, a data URI otherwise.
+    """
+    if transport == "http":
+        install_routes()
+        return asset_url(blob.digest, mimetypes.guess_extension(blob.mime) or ".glb")
+    return blob_cache.data_uri(blob)
+
+
+class ModelAssetHandler(RequestHandler):
+    """
+    Serves registered assets with immutable caching, Range requests and
+    gzip negotiation.
+
+    /model_viewer_assets/<sha256>[.<ext>]
+    """
+
+    def _asset(self, digest: str) -> Blob:
+        blob = blob_cache.get(digest)
+        if blob is None:
+            raise HTTPError(404, "Unknown asset")
+        return blob
+
+    def head(self, digest: str) -> None:  # ty: ignore[invalid-method-override]
+        self._serve(self._asset(digest), include_body=False)
+
+    def get(self, digest: str) -> None:  # ty: ignore[invalid-method-override]
+        self._serve(self._asset(digest), include_body=True)
+
+    def _serve(self, asset: Blob, include_body: bool) -> None:
+        etag = f'"{asset.digest}"'
+        self.set_header("ETag", etag)
+        self.set_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.set_header("Accept-Ranges", "bytes")
+        self.set_header("Vary", "Accept-Encoding")
+        self.set_header("Content-Type", asset.mime)
+
+        if_none_match = self.request.headers.get("If-None-Match", "")
+        if etag in if_none_match or if_none_match.strip() == "*":
+            self.set_status(304)
+            return
+
+        range_header = self.request.headers.get("Range")
+        if range_header is not None:
+            start, end = self._parse_range(range_header, asset.size)
+            self.set_status(206)
+            self.set_header("Content-Range", f"bytes {start}-{end - 1}/{asset.size}")
+            body = asset.data[start:end]
+        elif "gzip" in accepted_encodings(self.request.headers.get("Accept-Encoding", "")) and (
+            gzipped := blob_cache.representation(asset, "gzip", _gzip)
+        ):
+            self.set_header("Content-Encoding", "gzip")
+            body = gzipped
+        else:
+            body = asset.data
+
+        self.set_header("Content-Length", len(body))
+        if include_body:
+            # Blobs mapped from a model store are memoryviews
+            self.write(bytes(body))
+
+    def _parse_range(self, header: str, size: int) -> tuple[int, int]:
+        match = _RANGE_RE.match(header.strip())
+        if match is None or match.groups() == ("", ""):
+            self._unsatisfiable(size)
+        first, last = match.groups()
+        if first == "":
+            # Suffix range, e.g. bytes=-500 for the last 500 bytes
+            start, end = max(size - int(last), 0), size
+        else:
+            start = int(first)
+            end = min(int(last) + 1, size) if last else size
+        if start >= end:
+            self._unsatisfiable(size)
+        return start, end
+
+    def _unsatisfiable(self, size: int) -> NoReturn:
+        self.set_header("Content-Range", f"bytes */{size}")
+        raise HTTPError(416)
+
+    def compute_etag(self) -> None:
+        # The digest based ETag is set explicitly in _serve
+        return None
+
+
+def _gzip(blob: Blob) -> bytes:
+    # An empty encoding records that compression does not pay off
+    compressed = gzip.compress(blob.data, compresslevel=6, mtime=0)
+    return compressed if len(compressed) < blob.size else b""
+
+
+ROUTES = [
+    (rf"/{ASSET_PATH}/([0-9a-f]{{64}})(?:\.\w+)?", ModelAssetHandler),
+    (rf"/{ASSET_PATH}/memory", MemoryStatsHandler),
+    (rf"/{ASSET_PATH}/metrics", MetricsHandler),
+    *RUNTIME_ROUTES,
+]
+
+_patched_apps: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def install_routes() -> None:
+    """
+    Add the asset routes to every running ``pn.serve`` server that lacks it.
+    """
+    for server, *_ in list(state._servers.values()):
+        app = getattr(server, "_tornado", None)
+        if app is None or app in _patched_apps:
+            continue
+        prefix = getattr(app, "prefix", "")
+        app.add_handlers(r".*", [(f"{prefix}{pattern}", handler) for pattern, handler in ROUTES])
+        _patched_apps.add(app)
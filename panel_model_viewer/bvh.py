@@ -0,0 +1,355 @@
+"""
+Bounding volume hierarchy over model triangles for ray picking and
+point-to-surface queries, built and traversed with NumPy.
+
+The hierarchy is a linear BVH: triangles are sorted along a Morton curve
+through their centroids and cut into leaves of ``leaf_size`` consecutive
+triangles, which form the bottom level of a complete binary tree in heap
+order. Node bounds are reduced level by level, so building never loops
+over nodes in Python.
+
+Queries are batched. Every step of the traversal handles the whole
+frontier of (query, node) pairs at once, pruning pairs whose node cannot
+improve the best result found so far for their query.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from .cache import Blob, blob_cache
+from .gltf import GLB, SceneGeometry, scene_geometry
+from .optimize import morton_codes
+
+LEAF_SIZE = 8
+
+# Rays starting closer than this to a triangle do not hit it
+RAY_EPSILON = 1e-9
+
+
+class BVH:
+    """
+    A linear bounding volume hierarchy over triangles.
+
+    Parameters
+    ----------
+    triangles: np.ndarray
+        Triangle corners of shape (n, 3, 3).
+    leaf_size: int
+        Number of triangles per leaf.
+    """
+
+    def __init__(self, triangles: np.ndarray, leaf_size: int = LEAF_SIZE):
+        triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+        self.leaf_size = leaf_size
+        n = len(triangles)
+        self.order = (
+            np.argsort(morton_codes(triangles.mean(axis=1)), kind="stable")
+            if n
+            else np.zeros(0, dtype=np.int64)
+        )
+        self.triangles = triangles[self.order]
+        self.leaves = 1 << max(int(np.ceil(np.log2(max(n, 1) / leaf_size))), 0)
+
+        # Padding triangles have empty bounds, which no query can enter
+        size = self.leaves * leaf_size
+        lo = np.full((size, 3), np.inf)
+        hi = np.full((size, 3), -np.inf)
+        lo[:n], hi[:n] = self.triangles.min(axis=1), self.triangles.max(axis=1)
+        levels_lo = [lo.reshape(self.leaves, leaf_size, 3).min(axis=1)]
+        levels_hi = [hi.reshape(self.leaves, leaf_size, 3).max(axis=1)]
+        while len(levels_lo[0]) > 1:
+            levels_lo.insert(0, levels_lo[0].reshape(-1, 2, 3).min(axis=1))
+            levels_hi.insert(0, levels_hi[0].reshape(-1, 2, 3).max(axis=1))
+        # Heap order: the children of node i are 2i + 1 and 2i + 2
+        self.lo = np.concatenate(levels_lo)
+        self.hi = np.concatenate(levels_hi)
+
+    def __len__(self) -> int:
+        return len(self.triangles)
+
+    @property
+    def nbytes(self) -> int:
+        return self.triangles.nbytes + self.order.nbytes + self.lo.nbytes + self.hi.nbytes
+
+    def raycast(
+        self, origins: ArrayLike, directions: ArrayLike
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Nearest intersection of each ray with the triangles.
+
+        Returns the distance along the normalized direction (inf for
+        misses), the index of the hit triangle (-1 for misses) and the
+        barycentric weights (u, v) of its second and third corner.
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+        m = len(origins)
+        best = np.full(m, np.inf)
+        face = np.full(m, -1, dtype=np.int64)
+        uv = np.zeros((m, 2))
+        if not len(self):
+            return best, face, uv
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverse = 1 / directions
+        rays = np.arange(m)
+        nodes = np.zeros(m, dtype=np.int64)
+        while len(rays):
+            # Slab test against the node bounds
+            with np.errstate(invalid="ignore"):
+                t0 = (self.lo[nodes] - origins[rays]) * inverse[rays]
+                t1 = (self.hi[nodes] - origins[rays]) * inverse[rays]
+            near = np.nanmax(np.minimum(t0, t1), axis=1)
+            far = np.nanmin(np.maximum(t0, t1), axis=1)
+            keep = (near <= far) & (far >= 0) & (near <= best[rays])
+            rays, nodes = rays[keep], nodes[keep]
+
+            leaf = nodes >= self.leaves - 1
+            rays_leaf, first = rays[leaf], (nodes[leaf] - (self.leaves - 1)) * self.leaf_size
+            rays_leaf = np.repeat(rays_leaf, self.leaf_size)
+            tris = (first[:, None] + np.arange(self.leaf_size)).ravel()
+            valid = tris < len(self)
+            self._intersect(rays_leaf[valid], tris[valid], origins, directions, best, face, uv)
+
+            rays, nodes = rays[~leaf], nodes[~leaf]
+            rays = np.repeat(rays, 2)
+            nodes = 2 * np.repeat(nodes, 2) + np.tile([1, 2], len(nodes))
+        face[face >= 0] = self.order[face[face >= 0]]
+        return best, face, uv
+
+    def closest(self, points: ArrayLike) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Closest point on the triangles for each query point.
+
+        Returns the distances, the indices of the closest triangles and the
+        closest points.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        m = len(points)
+        best = np.full(m, np.inf)
+        face = np.full(m, -1, dtype=np.int64)
+        closest = np.full((m, 3), np.nan)
+        if not len(self) or not m:
+            return best, face, closest
+
+        # Descend greedily to one leaf per point for an initial bound, with
+        # the distance to the box center breaking ties between boxes that
+        # contain the point
+        queries = np.arange(m)
+        nodes = np.zeros(m, dtype=np.int64)
+        while nodes[0] < self.leaves - 1:
+            left, right = 2 * nodes + 1, 2 * nodes + 2
+            box_left = self._box_distance(points, left)
+            box_right = self._box_distance(points, right)
+            with np.errstate(invalid="ignore"):
+                center_left = np.linalg.norm(points - (self.lo[left] + self.hi[left]) / 2, axis=1)
+                center_right = np.linalg.norm(
+                    points - (self.lo[right] + self.hi[right]) / 2, axis=1
+                )
+            nearer = (box_left < box_right) | (
+                (box_left == box_right) & ~(center_right < center_left)
+            )
+            nodes = np.where(nearer, left, right)
+        self._leaf_distance(queries, nodes, points, best, face, closest)
+
+        # Every box contains a triangle, so the distance to its farthest
+        # corner bounds the result and tightens the pruning as we descend
+        bound = best.copy()
+        nodes = np.zeros(m, dtype=np.int64)
+        while len(queries):
+            q = points[queries]
+            far = np.linalg.norm(
+                np.maximum(np.abs(q - self.lo[nodes]), np.abs(q - self.hi[nodes])), axis=1
+            )
+            np.minimum.at(bound, queries, far)
+            keep = self._box_distance(q, nodes) <= np.minimum(bound, best)[queries]
+            queries, nodes = queries[keep], nodes[keep]
+            leaf = nodes >= self.leaves - 1
+            self._leaf_distance(queries[leaf], nodes[leaf], points, best, face, closest)
+            queries, nodes = queries[~leaf], nodes[~leaf]
+            queries = np.repeat(queries, 2)
+            nodes = 2 * np.repeat(nodes, 2) + np.tile([1, 2], len(nodes))
+        face[face >= 0] = self.order[face[face >= 0]]
+        return best, face, closest
+
+    def _box_distance(self, points: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        outside = np.maximum(np.maximum(self.lo[nodes] - points, points - self.hi[nodes]), 0)
+        return np.linalg.norm(outside, axis=1)
+
+    def _intersect(self, rays, tris, origins, directions, best, face, uv):
+        """
+        Moeller-Trumbore intersection of ray/triangle pairs, keeping the
+        nearest hit per ray.
+        """
+        if not len(rays):
+            return
+        a, b, c = self.triangles[tris, 0], self.triangles[tris, 1], self.triangles[tris, 2]
+        d = directions[rays]
+        e1, e2 = b - a, c - a
+        p = np.cross(d, e2)
+        det = np.einsum("ij,ij->i", e1, p)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inv = 1 / det
+            s = origins[rays] - a
+            u = np.einsum("ij,ij->i", s, p) * inv
+            q = np.cross(s, e1)
+            v = np.einsum("ij,ij->i", d, q) * inv
+            t = np.einsum("ij,ij->i", e2, q) * inv
+            hit = (det != 0) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > RAY_EPSILON)
+        rays, tris, t, u, v = rays[hit], tris[hit], t[hit], u[hit], v[hit]
+        order = np.lexsort((t, rays))
+        rays, first = np.unique(rays[order], return_index=True)
+        nearest = order[first]
+        better = t[nearest] < best[rays]
+        rays, nearest = rays[better], nearest[better]
+        best[rays] = t[nearest]
+        face[rays] = tris[nearest]
+        uv[rays] = np.stack([u[nearest], v[nearest]], axis=1)
+
+    def _leaf_distance(self, queries, nodes, points, best, face, closest):
+        if not len(queries):
+            return
+        first = (nodes - (self.leaves - 1)) * self.leaf_size
+        queries = np.repeat(queries, self.leaf_size)
+        tris = (first[:, None] + np.arange(self.leaf_size)).ravel()
+        valid = tris < len(self)
+        queries, tris = queries[valid], tris[valid]
+        nearest_points = closest_point_on_triangle(points[queries], self.triangles[tris])
+        distance = np.linalg.norm(nearest_points - points[queries], axis=1)
+        order = np.lexsort((distance, queries))
+        queries, first = np.unique(queries[order], return_index=True)
+        nearest = order[first]
+        better = distance[nearest] < best[queries]
+        queries, nearest = queries[better], nearest[better]
+        best[queries] = distance[nearest]
+        face[queries] = tris[nearest]
+        closest[queries] = nearest_points[nearest]
+
+
+def closest_point_on_triangle(points: np.ndarray, triangles: np.ndarray) -> np.ndarray:
+    """
+    Closest point on each triangle of shape (n, 3, 3) to the matching point,
+    by the Voronoi regions of its corners and edges (Ericson, Real-Time
+    Collision Detection, 5.1.5).
+    """
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    ab, ac, ap = b - a, c - a, points - a
+    d1, d2 = (ab * ap).sum(axis=1), (ac * ap).sum(axis=1)
+    bp = points - b
+    d3, d4 = (ab * bp).sum(axis=1), (ac * bp).sum(axis=1)
+    cp = points - c
+    d5, d6 = (ab * cp).sum(axis=1), (ac * cp).sum(axis=1)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = 1 / (va + vb + vc)
+        result = a + ab * (vb * denom)[:, None] + ac * (vc * denom)[:, None]
+        # Regions are assigned from the most general to the most specific,
+        # so that later assignments win
+        bc = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        result = np.where(bc[:, None], b + (c - b) * w[:, None], result)
+        on_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        result = np.where(on_ac[:, None], a + ac * (d2 / (d2 - d6))[:, None], result)
+        result = np.where(((d6 >= 0) & (d5 <= d6))[:, None], c, result)
+        on_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        result = np.where(on_ab[:, None], a + ab * (d1 / (d1 - d3))[:, None], result)
+    result = np.where(((d3 >= 0) & (d4 <= d3))[:, None], b, result)
+    result = np.where(((d1 <= 0) & (d2 <= 0))[:, None], a, result)
+    # Degenerate triangles fall back to their nearest corner
+    degenerate = ~np.isfinite(result).all(axis=1)
+    if degenerate.any():
+        corners = triangles[degenerate]
+        distance = np.linalg.norm(corners - points[degenerate, None], axis=2)
+        result[degenerate] = corners[np.arange(len(corners)), distance.argmin(axis=1)]
+    return result
+
+
+@dataclass
+class Hit:
+    """
+    Where a ray hit a model.
+    """
+
+    position: tuple[float, float, float]
+    distance: float
+    mesh: int
+    primitive: int
+    material: int | None
+    triangle: int
+    barycentric: tuple[float, float, float]
+
+    def to_dict(self) -> dict:
+        return {
+            "position": list(self.position),
+            "distance": self.distance,
+            "mesh": self.mesh,
+            "primitive": self.primitive,
+            "material": self.material,
+            "triangle": self.triangle,
+            "barycentric": list(self.barycentric),
+        }
+
+
+class SpatialIndex:
+    """
+    A BVH over the world-space triangles of a model's default scene, which
+    maps results back to meshes, primitives and materials.
+    """
+
+    def __init__(self, geometry: SceneGeometry):
+        self.geometry = geometry
+        self.bvh = BVH(geometry.triangles)
+
+    @property
+    def nbytes(self) -> int:
+        return self.geometry.nbytes + self.bvh.nbytes
+
+    def raycast(self, origins: ArrayLike, directions: ArrayLike) -> list[Hit | None]:
+        """
+        The nearest hit of each ray, or None for rays that miss.
+        """
+        distance, face, uv = self.bvh.raycast(origins, directions)
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+        positions = origins + directions * np.where(np.isfinite(distance), distance, 0)[:, None]
+        return [
+            self._hit(positions[i], distance[i], face[i], uv[i]) if face[i] >= 0 else None
+            for i in range(len(face))
+        ]
+
+    def distance(self, points: ArrayLike) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Distance of each point to the surface, with the closest triangles
+        and the closest points on them.
+        """
+        return self.bvh.closest(points)
+
+    def _hit(self, position, distance, face, uv) -> Hit:
+        g = self.geometry
+        material = int(g.face_material[face])
+        x, y, z = (float(c) for c in position)
+        return Hit(
+            position=(x, y, z),
+            distance=float(distance),
+            mesh=int(g.face_mesh[face]),
+            primitive=int(g.face_primitive[face]),
+            material=material if material >= 0 else None,
+            triangle=int(g.face_index[face]),
+            barycentric=(float(1 - uv.sum()), float(uv[0]), float(uv[1])),
+        )
+
+
+def spatial_index(blob: Blob) -> SpatialIndex:
+    """
+    The spatial index of a GLB blob, built once and cached with the blob.
+    """
+    return blob_cache.representation(
+        blob, "spatial_index", lambda blob: SpatialIndex(scene_geometry(GLB(blob.data)))
+    )
@@ -0,0 +1,379 @@
+"""
+Process-wide deduplicating cache for model sources.
+
+Every distinct model is stored once, keyed by the SHA-256 digest of its
+content, together with the representations derived from it (the base64
+data URI, the gzip encoding served over HTTP). Files are additionally
+indexed by path, mtime and size so re-opening an unchanged file skips both
+the read and the hash. All viewers in all sessions share the same immutable
+objects, and least recently used entries are evicted once the byte budget
+is exceeded. Blobs that did not come from a file can be spilled to disk, so
+they survive eviction like files do, until the last user unspills them.
+With a :class:`~.store.ModelStore`,
+GLB files are memory-mapped from a copy shared by all processes of the
+host instead of read into each.
+"""
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .store import ModelStore, _alive
+
+DEFAULT_MAX_BYTES = 512 * 1024**2
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("PANEL_MODEL_VIEWER_CACHE", Path.home() / ".cache" / "panel_model_viewer")
+)
+
+
+@dataclass(frozen=True)
+class Blob:
+    """
+    An immutable model payload identified by its content digest. The data
+    of blobs mapped from a model store is a read-only memoryview.
+    """
+
+    digest: str
+    data: bytes | memoryview = field(repr=False)
+    mime: str = "model/gltf-binary"
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+@dataclass
+class _Entry:
+    blob: Blob
+    representations: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return self.blob.size + sum(_sizeof(r) for r in self.representations.values())
+
+
+class BlobCache:
+    """
+    Thread-safe LRU cache of model blobs with a byte budget.
+
+    Parameters
+    ----------
+    max_bytes: int
+        Budget for the blobs and their representations. The most recently
+        used entry is always kept, even if it alone exceeds the budget.
+    store: ModelStore, optional
+        Store GLB files are mapped from, shared with other processes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, store: ModelStore | None = None):
+        self._max_bytes = max_bytes
+        self.store = store
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._paths: dict[tuple[str, int, int], str] = {}
+        self._origins: dict[str, tuple[Path, str]] = {}
+        # Users of spilled blobs, which are deleted once none is left
+        self._spilled: dict[str, int] = {}
+        self._swept: set[Path] = set()
+        self._lock = threading.RLock()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int) -> None:
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(
+        self,
+        path: Path,
+        mime: str = "model/gltf-binary",
+        read: Callable[[Path], bytes] = Path.read_bytes,
+    ) -> Blob:
+        """
+        Return the blob for a file, reading it with ``read`` only if it is
+        not cached or has changed on disk.
+        """
+        path = Path(path).absolute()
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._paths.get(key)
+            if digest is not None and digest in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(digest)
+                return self._entries[digest].blob
+        blob = self._map(path, mime, read) if self.store is not None else None
+        if blob is None:
+            blob = self.put(read(path), mime)
+        with self._lock:
+            self._paths[key] = blob.digest
+            self._origins[blob.digest] = (path, mime)
+        return blob
+
+    def _map(self, path: Path, mime: str, read: Callable[[Path], bytes]) -> Blob | None:
+        """
+        The blob of a GLB file mapped from the store, which another process
+        may have filled already. None if the file cannot be mapped.
+        """
+        store = self.store
+        if store is None or mime != "model/gltf-binary":
+            # Other formats are parsed from bytes
+            return None
+        digest = store.lookup(path)
+        for _ in range(2):
+            digest = digest or store.add(path, read)
+            with self._lock:
+                entry = self._entries.get(digest)
+                if entry is not None:
+                    self.hits += 1
+                    self._entries.move_to_end(digest)
+                    return entry.blob
+            view = store.open(digest)
+            if view is not None:
+                break
+            # Deleted by another process since it was added, store it again
+            digest = None
+        else:
+            return None
+        blob = Blob(digest, view, mime)
+        weakref.finalize(blob, store.release, digest).atexit = False
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                # Mapped by another thread meanwhile
+                return entry.blob
+            self.misses += 1
+            self._entries[digest] = _Entry(blob)
+            self._nbytes += blob.size
+            self._evict()
+        return blob
+
+    def put(self, data: bytes | bytearray, mime: str = "model/gltf-binary") -> Blob:
+        """
+        Return the cached blob with the same content as ``data``, adding
+        it if it is not cached yet.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(digest)
+                return entry.blob
+            self.misses += 1
+            blob = Blob(digest, bytes(data), mime)
+            self._entries[digest] = _Entry(blob)
+            self._nbytes += blob.size
+            self._evict()
+            return blob
+
+    def get(self, digest: str) -> Blob | None:
+        """
+        Look up a blob by digest. Evicted blobs that were loaded from a
+        file are transparently re-read if the file content is unchanged.
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                return entry.blob
+            origin = self._origins.get(digest)
+        if origin is None or not origin[0].is_file():
+            return None
+        blob = self.load(*origin)
+        return blob if blob.digest == digest else None
+
+    def spill(self, blob: Blob, directory: Path | None = None) -> bool:
+        """
+        Make sure a blob can be re-read after eviction, writing it to
+        ``directory`` (default ``$PANEL_MODEL_VIEWER_CACHE/spill``) unless
+        it was loaded from a file. Every successful call must be matched by
+        :meth:`unspill`. Returns False if writing failed.
+        """
+        with self._lock:
+            if blob.digest in self._spilled:
+                self._spilled[blob.digest] += 1
+                return True
+            if blob.digest in self._origins:
+                return True
+        directory = Path(directory or DEFAULT_CACHE_DIR / "spill").absolute()
+        # Files are per process, so no other process deletes them
+        path = directory / f"{blob.digest}.{os.getpid()}"
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._sweep(directory)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(blob.data)
+            os.replace(tmp, path)
+            stat = path.stat()
+        except OSError:
+            return False
+        with self._lock:
+            if blob.digest in self._spilled:
+                # Spilled by another thread meanwhile, to the same file
+                self._spilled[blob.digest] += 1
+                return True
+            self._spilled[blob.digest] = 1
+            self._paths[(str(path), stat.st_mtime_ns, stat.st_size)] = blob.digest
+            self._origins[blob.digest] = (path, blob.mime)
+        return True
+
+    def unspill(self, digest: str) -> None:
+        """
+        Return a use taken by :meth:`spill`, deleting the spilled file once
+        no use is left. The blob stays cached until it is evicted.
+        """
+        with self._lock:
+            count = self._spilled.get(digest, 0) - 1
+            if count < 0:
+                return
+            if count:
+                self._spilled[digest] = count
+                return
+            del self._spilled[digest]
+            path, _ = self._origins.pop(digest)
+            for key in [k for k in self._paths if k[0] == str(path)]:
+                del self._paths[key]
+        path.unlink(missing_ok=True)
+
+    def _sweep(self, directory: Path) -> None:
+        # Delete what processes that died left behind, once per directory
+        if directory in self._swept:
+            return
+        self._swept.add(directory)
+        for path in directory.iterdir():
+            pid = path.suffix[1:]
+            if pid.isdigit() and not _alive(int(pid)):
+                path.unlink(missing_ok=True)
+
+    def representation(self, blob: Blob, kind: str, build: Callable[[Blob], Any]) -> Any:
+        """
+        Return a derived representation of a blob, building and caching it
+        on first use. str and bytes representations count towards the byte
+        budget with their length, other values with their ``nbytes``
+        attribute if they have one.
+        """
+        with self._lock:
+            entry = self._entries.get(blob.digest)
+            if entry is not None and kind in entry.representations:
+                self.hits += 1
+                self._entries.move_to_end(blob.digest)
+                return entry.representations[kind]
+            self.misses += 1
+        value = build(blob)
+        with self._lock:
+            entry = self._entries.get(blob.digest)
+            if entry is None:
+                entry = self._entries[blob.digest] = _Entry(blob)
+                self._nbytes += blob.size
+            elif kind in entry.representations:
+                return entry.representations[kind]
+            entry.representations[kind] = value
+            self._nbytes += _sizeof(value)
+            self._entries.move_to_end(blob.digest)
+            self._evict()
+        return value
+
+    def derive(
+        self,
+        blob: Blob,
+        key: str,
+        transform: Callable[[bytes], bytes],
+        mime: str | None = None,
+    ) -> Blob:
+        """
+        Return the blob produced by ``transform`` from ``blob``, computing
+        it only if no result for this ``key`` is cached. The result has the
+        mime type of the source unless ``mime`` is given.
+        """
+        mime = mime or blob.mime
+
+        def build(blob: Blob) -> str:
+            return self.put(transform(_bytes(blob)), mime).digest
+
+        derived = self.get(self.representation(blob, f"derived:{key}", build))
+        if derived is None:
+            # The result was evicted while its source was still cached
+            derived = self.put(transform(_bytes(blob)), mime)
+        return derived
+
+    def data_uri(self, blob: Blob) -> str:
+        """
+        Return the shared base64 data URI for a blob.
+        """
+        return self.representation(blob, "data_uri", _encode_data_uri)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._nbytes,
+                "max_bytes": self._max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            spilled = [self._origins[digest][0] for digest in self._spilled]
+            self._spilled.clear()
+            self._entries.clear()
+            self._paths.clear()
+            self._origins.clear()
+            self._nbytes = 0
+            self.hits = self.misses = self.evictions = 0
+        for path in spilled:
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        while self._nbytes > self._max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._nbytes -= entry.nbytes
+            self.evictions += 1
+
+
+def _bytes(blob: Blob) -> bytes:
+    # Transforms take bytes, copy blobs mapped from a model store
+    return blob.data if isinstance(blob.data, bytes) else bytes(blob.data)
+
+
+def _sizeof(value: Any) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    nbytes = getattr(value, "nbytes", 0)
+    return nbytes if isinstance(nbytes, int) else 0
+
+
+def _encode_data_uri(blob: Blob) -> str:
+    return f"data:{blob.mime};base64,{base64.b64encode(blob.data).decode('utf-8')}"
+
+
+blob_cache = BlobCache(store=ModelStore.from_env())
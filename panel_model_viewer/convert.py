@@ -0,0 +1,541 @@
+"""
+Conversion of NumPy meshes and STL, OBJ and PLY files to GLB.
+
+Readers parse whole files with ``np.frombuffer`` and regular expressions
+rather than per-vertex Python loops, and ``mesh_to_glb`` packs the arrays
+with ``GLBWriter`` into a single preallocated buffer. Files are detected by
+their content, with the file name as a hint, so ModelViewer accepts them
+wherever it accepts GLB.
+
+Only geometry, vertex colors and texture coordinates are converted.
+Materials, groups and textures referenced by the files are ignored.
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .cache import Blob, BlobCache, blob_cache
+from .gltf import (
+    ARRAY_BUFFER,
+    ELEMENT_ARRAY_BUFFER,
+    GLB_MAGIC,
+    MODE_TRIANGLES,
+    GLBWriter,
+    _index_dtype,
+)
+
+GLB_MIME = "model/gltf-binary"
+STL_MIME = "model/stl"
+OBJ_MIME = "model/obj"
+PLY_MIME = "model/x-ply"
+
+SUFFIXES = {".glb": GLB_MIME, ".stl": STL_MIME, ".obj": OBJ_MIME, ".ply": PLY_MIME}
+
+# Bytes read from files with an unknown suffix to detect their format
+SNIFF_BYTES = 4096
+
+
+class ConversionError(ValueError):
+    """
+    Raised when a mesh file cannot be converted.
+    """
+
+
+@dataclass
+class Mesh:
+    """
+    An indexed triangle mesh.
+
+    Attributes
+    ----------
+    vertices: np.ndarray
+        Positions of shape (n, 3).
+    faces: np.ndarray
+        Vertex indices of shape (m, 3), counter-clockwise when seen from
+        the front.
+    normals: np.ndarray | None
+        Unit normals of shape (n, 3). Without normals the model is shaded
+        flat.
+    colors: np.ndarray | None
+        RGB or RGBA colors of shape (n, 3) or (n, 4), uint8 or floats in
+        [0, 1].
+    uvs: np.ndarray | None
+        Texture coordinates of shape (n, 2), with v pointing down as in
+        glTF.
+    """
+
+    vertices: np.ndarray
+    faces: np.ndarray
+    normals: np.ndarray | None = None
+    colors: np.ndarray | None = None
+    uvs: np.ndarray | None = None
+
+    def to_glb(self) -> bytes:
+        return mesh_to_glb(self.vertices, self.faces, self.normals, self.colors, self.uvs)
+
+
+def mesh_to_glb(vertices, faces, normals=None, colors=None, uvs=None) -> bytes:
+    """
+    Write a triangle mesh as a GLB with one primitive and a double-sided
+    material, see Mesh for the arrays.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    if vertices.ndim != 2 or vertices.shape[1] != 3:
+        raise ConversionError(f"vertices must have shape (n, 3), got {vertices.shape}")
+    n = len(vertices)
+    faces = np.asarray(faces)
+    if faces.size and (faces.ndim != 2 or faces.shape[1] != 3):
+        raise ConversionError(f"faces must have shape (m, 3), got {faces.shape}")
+    if faces.size and not np.issubdtype(faces.dtype, np.integer):
+        raise ConversionError("faces must be integer vertex indices")
+    if faces.size and (faces.min() < 0 or faces.max() >= n):
+        raise ConversionError(f"faces reference vertices outside of 0..{n - 1}")
+
+    writer = GLBWriter(
+        {
+            "asset": {"version": "2.0", "generator": "panel-model-viewer"},
+            "scene": 0,
+            "scenes": [{"nodes": [0]}],
+            "nodes": [{"mesh": 0}],
+            "materials": [
+                {"pbrMetallicRoughness": {"metallicFactor": 0.0}, "doubleSided": True}
+            ],
+        }
+    )
+    attributes = {
+        "POSITION": writer.add_accessor(vertices, target=ARRAY_BUFFER, minmax=True)
+    }
+    for name, values, width in (("NORMAL", normals, (3,)), ("TEXCOORD_0", uvs, (2,))):
+        if values is not None:
+            values = np.asarray(values, dtype=np.float32)
+            if values.shape != (n, *width):
+                raise ConversionError(f"{name} must have shape {(n, *width)}, got {values.shape}")
+            attributes[name] = writer.add_accessor(values, target=ARRAY_BUFFER)
+    if colors is not None:
+        colors = np.asarray(colors)
+        if colors.ndim != 2 or colors.shape[0] != n or colors.shape[1] not in (3, 4):
+            raise ConversionError(f"colors must have shape ({n}, 3) or ({n}, 4)")
+        if colors.dtype == np.uint8:
+            # Pad to RGBA, keeping rows 4-byte aligned without a stride
+            if colors.shape[1] == 3:
+                colors = np.concatenate([colors, np.full((n, 1), 255, np.uint8)], axis=1)
+            attributes["COLOR_0"] = writer.add_accessor(
+                colors, normalized=True, target=ARRAY_BUFFER
+            )
+        else:
+            attributes["COLOR_0"] = writer.add_accessor(
+                np.clip(colors, 0, 1).astype(np.float32), target=ARRAY_BUFFER
+            )
+    primitive = {"attributes": attributes, "material": 0, "mode": MODE_TRIANGLES}
+    if faces.size:
+        indices = faces.astype(_index_dtype(n)).reshape(-1)
+        primitive["indices"] = writer.add_accessor(indices, target=ELEMENT_ARRAY_BUFFER)
+    writer.json["meshes"] = [{"primitives": [primitive]}]
+    return writer.to_bytes()
+
+
+def sniff_mime(data: bytes, name: str | None = None, size: int | None = None) -> str:
+    """
+    The mime type of a model from its leading bytes, or from the suffix of
+    ``name`` if the content is ambiguous. ``size`` is the total size when
+    ``data`` is only the start of the model. Unknown content is assumed to
+    be GLB.
+    """
+    head = bytes(data[:SNIFF_BYTES])
+    size = len(data) if size is None else size
+    if head.startswith(GLB_MAGIC):
+        return GLB_MIME
+    if head.startswith(b"ply") and head[3:4] in (b"\n", b"\r"):
+        return PLY_MIME
+    if len(head) >= 84 and size == 84 + 50 * int.from_bytes(head[80:84], "little"):
+        # Binary STL headers may begin with "solid", check the size first
+        return STL_MIME
+    if re.match(rb"\s*solid\b", head) and b"facet" in head:
+        return STL_MIME
+    if name is not None and Path(name).suffix.lower() in SUFFIXES:
+        return SUFFIXES[Path(name).suffix.lower()]
+    if re.search(rb"^\s*v\s+[-+.\d]", head, re.M):
+        return OBJ_MIME
+    return GLB_MIME
+
+
+def path_mime(path: Path) -> str:
+    """
+    The mime type of a model file, from its suffix or its content.
+    """
+    mime = SUFFIXES.get(path.suffix.lower())
+    if mime is not None:
+        return mime
+    with path.open("rb") as fh:
+        return sniff_mime(fh.read(SNIFF_BYTES), path.name, path.stat().st_size)
+
+
+def as_glb(blob: Blob, cache: BlobCache = blob_cache) -> Blob:
+    """
+    The GLB blob of a model blob, converted once per model and cached.
+    GLB blobs and blobs of unknown type are returned unchanged.
+    """
+    reader = READERS.get(blob.mime)
+    if reader is None:
+        return blob
+    return cache.derive(blob, "glb", lambda data: reader(data).to_glb(), mime=GLB_MIME)
+
+
+def read_stl(data: bytes) -> Mesh:
+    """
+    Read a binary or ASCII STL file. Coincident vertices are merged and
+    normals are dropped, so the model is shaded flat per facet.
+    """
+    count = int.from_bytes(data[80:84], "little") if len(data) >= 84 else -1
+    if len(data) == 84 + 50 * count:
+        record: np.dtype = np.dtype(
+            [("normal", "<f4", 3), ("corners", "<f4", (3, 3)), ("attr", "<u2")]
+        )
+        corners = np.frombuffer(data, dtype=record, count=count, offset=84)["corners"]
+    else:
+        values = re.findall(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)", data)
+        if not values and not re.match(rb"\s*solid\b", data):
+            raise ConversionError("Not an STL file")
+        try:
+            corners = np.array(values, dtype=np.float32)
+        except ValueError as e:
+            raise ConversionError(f"Invalid STL vertex: {e}") from None
+        if len(corners) % 3:
+            raise ConversionError("STL facets must have three vertices")
+    vertices, inverse = _weld(corners.reshape(-1, 3))
+    return Mesh(vertices, inverse.reshape(-1, 3))
+
+
+def read_obj(data: bytes) -> Mesh:
+    """
+    Read the vertices, texture coordinates, normals and polygonal faces of
+    a Wavefront OBJ file. Polygons are triangulated as fans. Vertices with
+    six components carry RGB colors.
+    """
+    vertices = _obj_values(rb"v", data, 3)
+    colors = _obj_values(rb"v", data, 6)
+    uvs = _obj_values(rb"vt", data, 2)
+    normals = _obj_values(rb"vn", data, 3)
+    faces = re.findall(rb"^[ \t]*f[ \t]+([^\r\n#]*)", data, re.M)
+    if not len(vertices):
+        raise ConversionError("OBJ file has no vertices")
+    if len(colors) != len(vertices):
+        colors = None
+    else:
+        colors = colors[:, 3:]
+
+    text = b"\n".join(faces)
+    tokens = text.split()
+    counts = _token_counts(text, len(faces))
+    if not tokens:
+        return Mesh(vertices, np.zeros((0, 3), dtype=np.int64), colors=colors)
+    width = tokens[0].count(b"/") + 1
+    # v, v/vt, v//vn or v/vt/vn, with 0 standing in for a missing index
+    joined = b" ".join(tokens).replace(b"//", b"/0/").replace(b"/", b" ")
+    try:
+        corners = np.array(joined.split(), dtype=np.int64)
+    except ValueError as e:
+        raise ConversionError(f"Invalid OBJ face: {e}") from None
+    if len(corners) != len(tokens) * width:
+        raise ConversionError("OBJ faces mix different vertex formats")
+    corners = corners.reshape(-1, width)
+    if (corners < 0).any():
+        corners = _resolve_relative(data, faces, counts, corners)
+
+    columns = [(vertices, corners[:, 0] - 1)]
+    if width > 1 and corners[:, 1].all():
+        columns.append((uvs, corners[:, 1] - 1))
+    if width > 2 and corners[:, 2].all():
+        columns.append((normals, corners[:, 2] - 1))
+    for values, index in columns:
+        if len(index) and (index.min() < 0 or index.max() >= len(values)):
+            raise ConversionError("OBJ face references a missing vertex")
+
+    triangles = _fan(counts)
+    if len(columns) == 1:
+        return Mesh(vertices, corners[triangles, 0] - 1, colors=colors)
+    # Corners with different uv or normal indices become separate vertices
+    keys = np.stack([index for _, index in columns], axis=1)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    mesh = Mesh(
+        vertices[unique[:, 0]],
+        inverse[triangles],
+        colors=colors[unique[:, 0]] if colors is not None else None,
+    )
+    for (values, _), column in zip(columns[1:], unique.T[1:], strict=True):
+        if values is normals:
+            mesh.normals = normals[column]
+        else:
+            # OBJ texture coordinates have v pointing up
+            mesh.uvs = uvs[column] * [1, -1] + [0, 1]
+    return mesh
+
+
+# PLY property types
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+# Bytes of binary PLY lists of varying length scanned at a time
+PLY_LIST_CHUNK = 1 << 16
+
+
+def read_ply(data: bytes) -> Mesh:
+    """
+    Read the vertex and face elements of an ASCII or binary PLY file,
+    with normals, colors and texture coordinates where present. Polygons
+    are triangulated as fans.
+    """
+    end = re.search(rb"end_header\r?\n", data)
+    if not data.startswith(b"ply") or end is None:
+        raise ConversionError("Not a PLY file")
+    header = data[: end.start()].decode("ascii", "replace").splitlines()
+    fmt, elements = None, []
+    for line in header[1:]:
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == "format":
+            fmt = words[1]
+        elif words[0] == "element":
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == "property" and elements:
+            elements[-1][2].append(words[1:])
+    if fmt not in ("ascii", "binary_little_endian", "binary_big_endian"):
+        raise ConversionError(f"Unsupported PLY format {fmt!r}")
+
+    body, values = data[end.end() :], {}
+    if fmt == "ascii":
+        lines = body.splitlines()
+        start = 0
+        for name, count, properties in elements:
+            values[name] = _ply_ascii(lines[start : start + count], count, properties)
+            start += count
+    else:
+        order = "<" if fmt == "binary_little_endian" else ">"
+        offset = 0
+        for name, count, properties in elements:
+            values[name], offset = _ply_binary(body, offset, count, properties, order)
+
+    vertex = values.get("vertex") or {}
+    if not {"x", "y", "z"} <= set(vertex):
+        raise ConversionError("PLY file has no vertex positions")
+
+    def columns(*names):
+        for group in names:
+            if set(group) <= set(vertex):
+                return np.stack([vertex[k] for k in group], axis=1)
+        return None
+
+    positions = np.stack([vertex[k] for k in ("x", "y", "z")], axis=1)
+    mesh = Mesh(positions.astype(np.float32), np.zeros((0, 3), dtype=np.int64))
+    mesh.normals = columns(("nx", "ny", "nz"))
+    colors = columns(
+        ("red", "green", "blue", "alpha"), ("red", "green", "blue"),
+        ("r", "g", "b", "a"), ("r", "g", "b"),
+    )
+    if colors is not None:
+        mesh.colors = colors if colors.dtype == np.uint8 else colors.astype(np.float32)
+    uvs = columns(("s", "t"), ("u", "v"), ("texture_u", "texture_v"))
+    if uvs is not None:
+        # PLY texture coordinates have v pointing up
+        mesh.uvs = uvs * [1, -1] + [0, 1]
+    face = values.get("face", {})
+    polygons = face.get("vertex_indices", face.get("vertex_index"))
+    if polygons is not None:
+        indices, counts = polygons
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(mesh.vertices)):
+            raise ConversionError("PLY face references a missing vertex")
+        mesh.faces = indices.astype(np.int64)[_fan(counts)]
+    return mesh
+
+
+READERS = {STL_MIME: read_stl, OBJ_MIME: read_obj, PLY_MIME: read_ply}
+
+
+def read_mesh(source: str | Path | bytes) -> Mesh:
+    """
+    Read an STL, OBJ or PLY file or buffer.
+    """
+    if isinstance(source, (str, Path)):
+        data = Path(source).read_bytes()
+        mime = sniff_mime(data, str(source))
+    else:
+        data = bytes(source)
+        mime = sniff_mime(data)
+    if mime not in READERS:
+        raise ConversionError(f"Unsupported mesh format {mime}")
+    return READERS[mime](data)
+
+
+def _weld(corners: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Merge bitwise identical rows, returning the unique rows and the index
+    of each input row among them.
+    """
+    rows = np.ascontiguousarray(corners)
+    keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).reshape(-1)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return rows[first], inverse.reshape(-1)
+
+
+def _fan(counts: np.ndarray) -> np.ndarray:
+    """
+    Triangle corners of polygons with ``counts`` corners each, stored one
+    after another, as fans around their first corner.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    triangles = np.maximum(counts - 2, 0)
+    polygon = np.repeat(np.arange(len(counts)), triangles)
+    step = np.arange(len(polygon)) - np.repeat(np.cumsum(triangles) - triangles, triangles) + 1
+    first = starts[polygon]
+    return np.stack([first, first + step, first + step + 1], axis=1)
+
+
+def _token_counts(text: bytes, lines: int) -> np.ndarray:
+    """
+    The number of whitespace separated tokens on each line of ``text``.
+    """
+    buffer = np.frombuffer(text + b"\n", dtype=np.uint8)
+    newline = buffer == ord("\n")
+    separator = newline | (buffer == ord(" ")) | (buffer == ord("\t")) | (buffer == ord("\r"))
+    start = ~separator & np.concatenate([[True], separator[:-1]])
+    line = np.cumsum(newline) - newline
+    return np.bincount(line[start], minlength=lines)[:lines]
+
+
+def _obj_values(keyword: bytes, data: bytes, width: int) -> np.ndarray:
+    """
+    The first ``width`` numbers of every line starting with ``keyword``
+    that has at least that many.
+    """
+    number = rb"[ \t]+(\S+)"
+    pattern = rb"^[ \t]*" + keyword + number * width
+    try:
+        return np.array(re.findall(pattern, data, re.M), dtype=np.float32).reshape(-1, width)
+    except ValueError as e:
+        raise ConversionError(f"Invalid OBJ {keyword.decode()} value: {e}") from None
+
+
+def _resolve_relative(data, faces, counts, corners) -> np.ndarray:
+    """
+    Turn negative OBJ indices, counted back from the last element defined
+    before the face, into absolute ones.
+    """
+    defined = [
+        np.array([m.start() for m in re.finditer(rb"^[ \t]*" + k + rb"[ \t]", data, re.M)])
+        for k in (rb"v", rb"vt", rb"vn")
+    ]
+    lines = np.array([m.start() for m in re.finditer(rb"^[ \t]*f[ \t]", data, re.M)])
+    position = np.repeat(lines, counts)
+    corners = corners.copy()
+    for column in range(corners.shape[1]):
+        relative = corners[:, column] < 0
+        before = np.searchsorted(defined[column], position[relative])
+        corners[relative, column] += before + 1
+    return corners
+
+
+def _ply_ascii(lines: list[bytes], count: int, properties: list[list[str]]) -> dict:
+    if not count:
+        return {}
+    if all(p[0] != "list" for p in properties):
+        try:
+            table = np.array(b" ".join(lines).split(), dtype=np.float64)
+            table = table.reshape(count, len(properties))
+        except ValueError as e:
+            raise ConversionError(f"Invalid PLY data: {e}") from None
+        return {
+            p[1]: table[:, i].astype(PLY_TYPES[p[0]]) for i, p in enumerate(properties)
+        }
+    if len(properties) != 1:
+        raise ConversionError("PLY elements may only have a single list property")
+    text = b"\n".join(lines)
+    counts = _token_counts(text, count) - 1
+    tokens = np.array(text.split(), dtype=np.int64)
+    is_count = np.zeros(len(tokens), dtype=bool)
+    is_count[np.cumsum(counts + 1) - counts - 1] = True
+    if (tokens[is_count] != counts).any():
+        raise ConversionError("PLY list lengths do not match their data")
+    return {properties[0][3]: (tokens[~is_count], counts)}
+
+
+def _ply_binary(body, offset, count, properties, order) -> tuple[dict, int]:
+    if all(p[0] != "list" for p in properties):
+        dtype: np.dtype = np.dtype([(p[1], order + PLY_TYPES[p[0]]) for p in properties])
+        if offset + count * dtype.itemsize > len(body):
+            raise ConversionError("PLY data is truncated")
+        table = np.frombuffer(body, dtype=dtype, count=count, offset=offset)
+        return {name: table[name] for name in dtype.names or ()}, offset + count * dtype.itemsize
+    if len(properties) != 1:
+        raise ConversionError("PLY elements may only have a single list property")
+    _, count_type, item_type, name = properties[0]
+    count_dtype = np.dtype(order + PLY_TYPES[count_type])
+    item_dtype = np.dtype(order + PLY_TYPES[item_type])
+    if not count:
+        return {name: (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))}, offset
+    # Assume every list has the length of the first, the usual case, and
+    # fall back to locating the lists one after another if they do not
+    n = int(np.frombuffer(body, dtype=count_dtype, count=1, offset=offset)[0])
+    record: np.dtype = np.dtype([("count", count_dtype), ("items", item_dtype, (n,))])
+    if offset + count * record.itemsize <= len(body):
+        table = np.frombuffer(body, dtype=record, count=count, offset=offset)
+        if (table["count"] == n).all():
+            counts = np.full(count, n, dtype=np.int64)
+            return {name: (table["items"].reshape(-1), counts)}, offset + count * record.itemsize
+    items, counts, offset = _ply_lists(body, offset, count, count_dtype, item_dtype)
+    return {name: (items, counts)}, offset
+
+
+def _ply_lists(body, offset, count, count_dtype, item_dtype) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Read ``count`` binary PLY lists of varying length from ``offset``.
+    Returns their items one after another, their lengths and the offset
+    after the last list.
+
+    Each list starts where the previous one ends. For every byte of a
+    chunk the start of the next list is computed as if a list started
+    there, and repeatedly composing that map with itself follows the
+    chain from the first list in a logarithmic number of array steps.
+    """
+    data = np.frombuffer(body, dtype=np.uint8)
+    size, step = count_dtype.itemsize, item_dtype.itemsize
+    starts, counts, remaining = [], [], count
+    while remaining:
+        window = data[offset : offset + PLY_LIST_CHUNK]
+        if len(window) < size:
+            raise ConversionError("PLY data is truncated")
+        lengths = np.ascontiguousarray(sliding_window_view(window, size)).view(count_dtype)
+        lengths = lengths.ravel().astype(np.int64)
+        end = len(lengths)
+        following = np.arange(end) + size + lengths * step
+        # Lists continuing past the chunk, or invalid ones, end the chain
+        jump = np.where((lengths >= 0) & (following < end), following, end)
+        jump = np.append(jump, end).astype(np.int32)
+        chain = np.zeros(1, dtype=np.int32)
+        while chain[-1] != end and len(chain) < remaining:
+            chain = np.concatenate([chain, jump[chain]])
+            jump = jump[jump]
+        chain = chain[chain != end][:remaining]
+        if (lengths[chain] < 0).any():
+            raise ConversionError("PLY list has a negative length")
+        starts.append(chain.astype(np.int64) + offset)
+        counts.append(lengths[chain])
+        remaining -= len(chain)
+        offset += int(following[chain[-1]])
+    if offset > len(body):
+        raise ConversionError("PLY data is truncated")
+    starts, counts = np.concatenate(starts), np.concatenate(counts)
+    index = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    first = np.repeat(starts + size, counts) + index * step
+    items = data[first[:, None] + np.arange(step)].view(item_dtype).ravel()
+    return items, counts, offset
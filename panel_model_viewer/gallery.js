@@ -0,0 +1,211 @@
+// Live <model-viewer> elements of all galleries on the page, least
+// recently visible first. Every live element keeps its scene's buffers and
+// textures on the GPU and takes part in the render loop, so the number of
+// live elements is capped page-wide.
+const live = (window.__panelModelViewerLive ??= new Map());
+
+function release(tile) {
+    const entry = live.get(tile);
+    if (!entry) return;
+    live.delete(tile);
+    entry.viewer.remove();
+}
+
+// Make room for one more live element. Returns false if every live
+// element is visible.
+function makeRoom(max) {
+    for (const [tile, entry] of live) {
+        if (live.size < max) break;
+        if (!entry.visible) release(tile);
+    }
+    return live.size < max;
+}
+
+export function render({ model, el }) {
+    const container = document.createElement("div");
+    container.style.overflowY = "auto";
+    container.style.width = "100%";
+    container.style.height = "100%";
+
+    const grid = document.createElement("div");
+    grid.style.display = "grid";
+    grid.style.gap = "8px";
+    container.appendChild(grid);
+
+    // Scrolling near the sentinel requests the next page
+    const sentinel = document.createElement("div");
+    sentinel.style.height = "1px";
+    container.appendChild(sentinel);
+    el.appendChild(container);
+
+    let tiles = [];
+    // Visible tiles waiting for a free live slot
+    const waiting = new Set();
+
+    function layout() {
+        grid.style.gridTemplateColumns = `repeat(auto-fill, ${model.item_width}px)`;
+        for (const tile of tiles) sizeTile(tile);
+    }
+
+    function sizeTile(tile) {
+        tile.style.width = `${model.item_width}px`;
+        tile.style.height = `${model.item_height}px`;
+        tile.style.containIntrinsicSize = `${model.item_width}px ${model.item_height}px`;
+    }
+
+    function createTile(item, index) {
+        const tile = document.createElement("div");
+        tile.style.position = "relative";
+        // Let the browser skip layout and paint of far away tiles
+        tile.style.contentVisibility = "auto";
+        tile.item = item;
+        sizeTile(tile);
+        if (item.poster) {
+            const img = document.createElement("img");
+            img.src = item.poster;
+            img.alt = item.alt;
+            img.loading = "lazy";
+            img.decoding = "async";
+            img.style.width = "100%";
+            img.style.height = "100%";
+            img.style.objectFit = "contain";
+            tile.appendChild(img);
+        } else if (item.error) {
+            // The source failed to load on the server, show why instead
+            const placeholder = document.createElement("div");
+            placeholder.textContent = item.alt;
+            placeholder.title = item.error;
+            placeholder.style.display = "flex";
+            placeholder.style.alignItems = "center";
+            placeholder.style.justifyContent = "center";
+            placeholder.style.width = "100%";
+            placeholder.style.height = "100%";
+            placeholder.style.border = "1px dashed currentColor";
+            placeholder.style.opacity = "0.6";
+            tile.appendChild(placeholder);
+        }
+        tile.addEventListener("click", () => model.send_msg({ type: "select", index }));
+        return tile;
+    }
+
+    function activate(tile) {
+        const entry = live.get(tile);
+        if (entry) {
+            // Move to the most recently visible end
+            live.delete(tile);
+            live.set(tile, entry);
+            entry.visible = true;
+            return;
+        }
+        if (!makeRoom(model.max_contexts)) {
+            waiting.add(tile);
+            return;
+        }
+        waiting.delete(tile);
+        const viewer = document.createElement("model-viewer");
+        viewer.style.position = "absolute";
+        viewer.style.inset = "0";
+        viewer.style.width = "100%";
+        viewer.style.height = "100%";
+        viewer.alt = tile.item.alt;
+        if (tile.item.poster) viewer.setAttribute("poster", tile.item.poster);
+        viewer.setAttribute("camera-controls", "");
+        if (model.auto_rotate) viewer.setAttribute("auto-rotate", "");
+        viewer.setAttribute("src", tile.item.src);
+        tile.appendChild(viewer);
+        live.set(tile, { viewer, visible: true });
+    }
+
+    function deactivate(tile) {
+        waiting.delete(tile);
+        const entry = live.get(tile);
+        if (entry) entry.visible = false;
+        // A slot may now be free for a visible tile
+        for (const next of waiting) {
+            if (!makeRoom(model.max_contexts)) break;
+            activate(next);
+        }
+    }
+
+    const tileObserver = new IntersectionObserver(
+        (entries) => {
+            for (const entry of entries) {
+                if (entry.isIntersecting) activate(entry.target);
+                else deactivate(entry.target);
+            }
+        },
+        { root: container, rootMargin: "100px" }
+    );
+
+    function requestPage() {
+        model.send_msg({ type: "page" });
+    }
+
+    const pageObserver = new IntersectionObserver(
+        (entries) => {
+            if (entries.some((entry) => entry.isIntersecting)) requestPage();
+        },
+        { root: container, rootMargin: "400px" }
+    );
+    pageObserver.observe(sentinel);
+
+    function clear() {
+        for (const tile of tiles) {
+            tileObserver.unobserve(tile);
+            waiting.delete(tile);
+            release(tile);
+        }
+        tiles = [];
+        grid.replaceChildren();
+    }
+
+    // Pages arrive once each, starting at the index of their first item.
+    // Items this view already shows are skipped, e.g. when another view
+    // asked for all of them.
+    function appendItems(start, items) {
+        if (start > tiles.length) {
+            // A page went missing, ask for everything again
+            model.send_msg({ type: "sync" });
+            return;
+        }
+        const added = items
+            .slice(tiles.length - start)
+            .map((item, i) => createTile(item, tiles.length + i));
+        for (const tile of added) {
+            grid.appendChild(tile);
+            // Failed items never become live viewers
+            if (tile.item.src) tileObserver.observe(tile);
+        }
+        tiles = tiles.concat(added);
+        // The observer does not fire again while the sentinel stays in view
+        if (added.length) {
+            const bounds = container.getBoundingClientRect();
+            if (sentinel.getBoundingClientRect().top < bounds.bottom + 400) requestPage();
+        }
+    }
+
+    layout();
+
+    model.on("msg:custom", (msg) => {
+        if (msg.type === "items") appendItems(msg.start, msg.items);
+        else if (msg.type === "reset") clear();
+    });
+    model.on("item_width", layout);
+    model.on("item_height", layout);
+    model.on("auto_rotate", () => {
+        for (const tile of tiles) {
+            const entry = live.get(tile);
+            if (!entry) continue;
+            if (model.auto_rotate) entry.viewer.setAttribute("auto-rotate", "");
+            else entry.viewer.removeAttribute("auto-rotate");
+        }
+    });
+    model.on("max_contexts", () => makeRoom(model.max_contexts + 1));
+    model.on("remove", () => {
+        tileObserver.disconnect();
+        pageObserver.disconnect();
+        clear();
+    });
+    // Items resolved before this view was rendered
+    model.send_msg({ type: "sync" });
+}
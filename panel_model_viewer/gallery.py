@@ -0,0 +1,177 @@
+import io
+from functools import partial
+from pathlib import Path
+
+import param
+from panel.io.state import state
+
+from . import assets
+from .cache import Blob, blob_cache
+from .convert import as_glb, path_mime, sniff_mime
+from .gltf import GLBError
+from .poster import poster_for
+from .runtime import ModelViewerRuntime
+from .viewer import SOURCE_TYPES, _dispatch, _loader
+
+
+class ModelGallery(ModelViewerRuntime):
+    """
+    A scrolling grid of models for large catalogs.
+
+    Items show a poster until they scroll into view and only up to
+    max_contexts of them are live <model-viewer> elements at a time; the
+    least recently visible one is torn down to make room for the next.
+    Sources are resolved on the server a page at a time, as the user
+    scrolls towards the end of the grid.
+
+    >>> ModelGallery(objects=sorted(Path("models").glob("*.glb")), height=600)
+    """
+
+    objects = param.List(
+        default=[],
+        doc="""
+        Sources of the models, URLs, paths, bytes or binary file-like
+        objects as accepted by ModelViewer.src.""",
+    )
+
+    page_size = param.Integer(
+        default=24, bounds=(1, None), doc="Number of items resolved and sent at a time."
+    )
+
+    max_contexts = param.Integer(
+        default=8,
+        bounds=(1, None),
+        doc="""
+        Maximum number of live viewers. The limit applies to the whole page,
+        across all galleries.""",
+    )
+
+    item_width = param.Integer(default=240, bounds=(16, None), doc="Width of an item in pixels.")
+
+    item_height = param.Integer(default=240, bounds=(16, None), doc="Height of an item in pixels.")
+
+    auto_poster = param.Boolean(
+        default=True,
+        doc="""
+        Render posters of local GLB sources on the server, shown for items
+        that are not live. Without posters, inactive items are blank.""",
+    )
+
+    auto_rotate = param.Boolean(default=False, doc="Enable auto-rotation of live viewers.")
+
+    transport = param.Selector(
+        default="http",
+        objects=["data_uri", "http"],
+        doc="""
+        How local sources reach the browser, see ModelViewer.transport.
+        'http' needs the asset route, under panel serve the
+        panel_model_viewer.assets plugin.""",
+    )
+
+    items = param.List(
+        default=[],
+        doc="""
+        The resolved items sent to the browser so far, as dicts with src,
+        poster, alt and error. Items whose source failed to load have no
+        src and the error message instead. Views receive each page once,
+        as a message, rather than the whole list on every page.""",
+    )
+
+    selected = param.Integer(default=None, doc="Index of the last clicked item.")
+
+    _esm = Path(__file__).parent / "gallery.js"
+
+    # Included once for all components by ModelViewerRuntime
+    __javascript_modules__ = []
+
+    _property_mapping = {"objects": None, "items": None}
+
+    def __init__(self, **params):
+        self._page_token = 0
+        self._page_pending = False
+        super().__init__(**params)
+        self.param.watch(self._reset, ["objects", "auto_poster", "transport"])
+        self._load_page()
+
+    def _reset(self, *events):
+        self._page_token += 1
+        self._page_pending = False
+        self.items = []
+        self._send_msg({"type": "reset"})
+        self._load_page()
+
+    def _handle_msg(self, data):
+        if data.get("type") == "sync":
+            # A new view needs the items sent before it was rendered
+            self._send_msg({"type": "items", "start": 0, "items": self.items})
+        elif data.get("type") == "page":
+            self._load_page()
+        elif data.get("type") == "select":
+            self.selected = data["index"]
+
+    def _load_page(self):
+        """
+        Resolve the next page of objects on the loader thread pool.
+        """
+        start = len(self.items)
+        if self._page_pending or start >= len(self.objects):
+            return
+        self._page_pending = True
+        token, doc = self._page_token, state.curdoc
+        sources = list(enumerate(self.objects[start : start + self.page_size], start))
+
+        def done(future):
+            if token != self._page_token:
+                return
+            self._page_pending = False
+            if future.exception() is not None:
+                self.param.warning(f"Loading gallery items failed: {future.exception()}")
+                return
+            # URLs depend on the session, build them on its event loop
+            items = []
+            for src, poster, alt, error in future.result():
+                if error is not None:
+                    self.param.warning(f"Loading gallery item {alt!r} failed: {error}")
+                elif not isinstance(src, str):
+                    src = assets.blob_src(src, self.transport)
+                if poster is not None:
+                    poster = assets.blob_src(poster, self.transport)
+                items.append({"src": src, "poster": poster, "alt": alt, "error": error})
+            self.items = self.items + items
+            self._send_msg({"type": "items", "start": start, "items": items})
+
+        future = _loader.submit(self._resolve_page, sources)
+        future.add_done_callback(lambda f: _dispatch(doc, partial(done, f)))
+
+    def _resolve_page(self, sources) -> list[tuple]:
+        # A failing source becomes a placeholder instead of failing the page
+        resolved = []
+        for index, source in sources:
+            try:
+                resolved.append((*self._resolve(index, source), None))
+            except Exception as e:
+                resolved.append((None, None, self._alt(index, source), str(e)))
+        return resolved
+
+    def _resolve(self, index: int, source) -> tuple[str | Blob, Blob | None, str]:
+        alt = self._alt(index, source)
+        if isinstance(source, str):
+            return source, None, alt
+        if not isinstance(source, SOURCE_TYPES):
+            raise TypeError(f"Unsupported gallery source {source!r}")
+        if isinstance(source, Path):
+            blob = blob_cache.load(source, path_mime(source))
+        else:
+            data = source.read() if isinstance(source, io.IOBase) else source
+            blob = blob_cache.put(data, sniff_mime(data))
+        blob = as_glb(blob)
+        return blob, self._poster(blob) if self.auto_poster else None, alt
+
+    def _alt(self, index: int, source) -> str:
+        return source.name if isinstance(source, Path) else f"Model {index + 1}"
+
+    def _poster(self, blob: Blob) -> Blob | None:
+        try:
+            return poster_for(blob, self.item_width, self.item_height)
+        except (GLBError, KeyError, IndexError, ValueError):
+            return None
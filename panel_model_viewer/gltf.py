@@ -0,0 +1,855 @@
+"""
+Pure Python/NumPy reader for glTF-binary (GLB) files.
+
+The reader parses the JSON chunk and exposes accessors as zero-copy NumPy
+views into the BIN chunk. Files are memory-mapped, so inspecting even very
+large models only touches the pages that are actually read.
+"""
+
+import json
+import mmap
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+COMPONENT_DTYPES: dict[int, np.dtype] = {
+    5120: np.dtype(np.int8),
+    5121: np.dtype(np.uint8),
+    5122: np.dtype(np.int16),
+    5123: np.dtype(np.uint16),
+    5125: np.dtype(np.uint32),
+    5126: np.dtype(np.float32),
+}
+
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+COMPONENT_TYPES = {dtype: component for component, dtype in COMPONENT_DTYPES.items()}
+
+VECTOR_TYPES = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4", 16: "MAT4"}
+
+MODE_TRIANGLES, MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN = 4, 5, 6
+
+ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER = 34962, 34963
+
+# Extensions that move geometry out of plain accessors
+UNSUPPORTED_EXTENSIONS = ("KHR_draco_mesh_compression", "EXT_meshopt_compression")
+
+
+@dataclass
+class TextureInfo:
+    """
+    Dimensions of an image embedded in or referenced by a model.
+    """
+
+    index: int
+    mime: str | None
+    width: int | None
+    height: int | None
+
+    @property
+    def gpu_bytes(self) -> int:
+        # RGBA8 with a full mip chain
+        if self.width is None or self.height is None:
+            return 0
+        return self.width * self.height * 4 * 4 // 3
+
+
+@dataclass
+class ModelInfo:
+    """
+    Summary statistics of a glTF model, computed without rendering it.
+    """
+
+    vertex_count: int
+    triangle_count: int
+    bounds_min: tuple[float, float, float] | None
+    bounds_max: tuple[float, float, float] | None
+    textures: list[TextureInfo] = field(default_factory=list)
+    animations: list[str] = field(default_factory=list)
+    materials: list[str] = field(default_factory=list)
+    variants: list[str] = field(default_factory=list)
+    geometry_bytes: int = 0
+    file_bytes: int = 0
+
+    @property
+    def texture_bytes(self) -> int:
+        return sum(t.gpu_bytes for t in self.textures)
+
+    @property
+    def gpu_bytes(self) -> int:
+        """
+        Estimated GPU memory for vertex/index buffers and mipmapped RGBA8
+        textures.
+        """
+        return self.geometry_bytes + self.texture_bytes
+
+    @property
+    def center(self) -> tuple[float, float, float] | None:
+        if self.bounds_min is None or self.bounds_max is None:
+            return None
+        x, y, z = ((lo + hi) / 2 for lo, hi in zip(self.bounds_min, self.bounds_max, strict=True))
+        return x, y, z
+
+    @property
+    def radius(self) -> float | None:
+        """
+        Radius of the sphere enclosing the bounding box.
+        """
+        if self.bounds_min is None or self.bounds_max is None:
+            return None
+        return float(np.linalg.norm(np.subtract(self.bounds_max, self.bounds_min)) / 2)
+
+    def camera_target(self) -> str | None:
+        """
+        The bounding box center in model-viewer's camera-target syntax.
+        """
+        if self.center is None:
+            return None
+        return " ".join(f"{c:.6g}m" for c in self.center)
+
+    def camera_orbit(self, theta: float = 0, phi: float = 75, fov: float = 30) -> str | None:
+        """
+        A camera-orbit that fits the bounding sphere into a field of view
+        of ``fov`` degrees.
+        """
+        if not self.radius:
+            return None
+        distance = self.radius / np.sin(np.radians(fov) / 2)
+        return f"{theta:g}deg {phi:g}deg {distance:.6g}m"
+
+
+class GLBError(ValueError):
+    """
+    Raised for data that is not a valid GLB file.
+    """
+
+
+class GLB:
+    """
+    A parsed GLB file.
+
+    Parameters
+    ----------
+    data: bytes | memoryview | mmap.mmap
+        The complete file contents. Accessors are views into this buffer,
+        which must outlive them.
+    """
+
+    def __init__(self, data):
+        self._buffer = data
+        view = memoryview(data)
+        if len(view) < 20:
+            raise GLBError("Data is too short to be a GLB file")
+        magic, version, length = struct.unpack_from("<4sII", view, 0)
+        if magic != GLB_MAGIC:
+            raise GLBError("Data does not start with the glTF magic")
+        if version != 2:
+            raise GLBError(f"Unsupported glTF version {version}")
+        self.json: dict = {}
+        self.bin: memoryview | None = None
+        offset, length = 12, min(length, len(view))
+        while offset + 8 <= length:
+            chunk_length, chunk_type = struct.unpack_from("<II", view, offset)
+            chunk = view[offset + 8 : offset + 8 + chunk_length]
+            if chunk_type == CHUNK_JSON:
+                try:
+                    document = json.loads(bytes(chunk))
+                except ValueError:
+                    raise GLBError("GLB JSON chunk is not valid JSON") from None
+                if not isinstance(document, dict):
+                    raise GLBError("GLB JSON chunk is not an object")
+                self.json = document
+            elif chunk_type == CHUNK_BIN and self.bin is None:
+                self.bin = chunk
+            offset += 8 + chunk_length
+        if not self.json:
+            raise GLBError("GLB file has no JSON chunk")
+        self.nbytes = length
+
+    @classmethod
+    def open(cls, path: str | Path) -> "GLB":
+        """
+        Memory-map a GLB file.
+        """
+        with open(path, "rb") as fh:
+            data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(data)
+
+    def close(self) -> None:
+        """
+        Release the memory map. Accessor views must not be used afterwards.
+        """
+        self.bin = None
+        if isinstance(self._buffer, mmap.mmap):
+            try:
+                self._buffer.close()
+            except BufferError:
+                # Accessor views are still alive, the map is released with them
+                pass
+
+    def __enter__(self) -> "GLB":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def buffer_view(self, index: int) -> memoryview:
+        view = self.json["bufferViews"][index]
+        if view.get("buffer", 0) != 0 or self.bin is None:
+            raise GLBError("Only the embedded BIN buffer is supported")
+        start = view.get("byteOffset", 0)
+        return self.bin[start : start + view["byteLength"]]
+
+    def accessor(self, index: int) -> np.ndarray:
+        """
+        Return accessor data as an array of shape (count,) or
+        (count, components).
+
+        Dense accessors are read-only views into the BIN chunk; sparse and
+        buffer-less accessors are materialized.
+        """
+        accessor = self.json["accessors"][index]
+        dtype = COMPONENT_DTYPES[accessor["componentType"]]
+        ncomp = TYPE_SIZES[accessor["type"]]
+        count = accessor["count"]
+        if "bufferView" in accessor:
+            view = self.json["bufferViews"][accessor["bufferView"]]
+            stride = view.get("byteStride") or dtype.itemsize * ncomp
+            array = np.ndarray(
+                shape=(count, ncomp),
+                dtype=dtype,
+                buffer=self.buffer_view(accessor["bufferView"]),
+                offset=accessor.get("byteOffset", 0),
+                strides=(stride, dtype.itemsize),
+            )
+        else:
+            array = np.zeros((count, ncomp), dtype=dtype)
+        if "sparse" in accessor:
+            array = self._apply_sparse(array.copy(), accessor["sparse"])
+        return array[:, 0] if ncomp == 1 else array
+
+    def _apply_sparse(self, array: np.ndarray, sparse: dict) -> np.ndarray:
+        count = sparse["count"]
+        indices, values = sparse["indices"], sparse["values"]
+        index_dtype = COMPONENT_DTYPES[indices["componentType"]]
+        idx = np.frombuffer(
+            self.buffer_view(indices["bufferView"]),
+            dtype=index_dtype,
+            count=count,
+            offset=indices.get("byteOffset", 0),
+        )
+        vals = np.frombuffer(
+            self.buffer_view(values["bufferView"]),
+            dtype=array.dtype,
+            count=count * array.shape[1],
+            offset=values.get("byteOffset", 0),
+        )
+        array[idx] = vals.reshape(count, array.shape[1])
+        return array
+
+    def float_accessor(self, index: int) -> np.ndarray:
+        """
+        Return accessor data as float32, undoing normalized integer
+        quantization.
+        """
+        accessor = self.json["accessors"][index]
+        return dequantize(self.accessor(index), accessor.get("normalized", False))
+
+    def image(self, index: int) -> memoryview | None:
+        """
+        The encoded bytes of an image stored in the BIN chunk.
+        """
+        image = self.json.get("images", [])[index]
+        if "bufferView" not in image:
+            return None
+        return self.buffer_view(image["bufferView"])
+
+    def mesh_instances(self) -> list[tuple[int, int, np.ndarray]]:
+        """
+        Return (node, mesh, world matrix) for every node of the default
+        scene that instantiates a mesh.
+        """
+        nodes = self.json.get("nodes", [])
+        scenes = self.json.get("scenes", [])
+        if scenes:
+            roots = scenes[self.json.get("scene", 0)].get("nodes", [])
+        else:
+            children = {c for node in nodes for c in node.get("children", [])}
+            roots = [i for i in range(len(nodes)) if i not in children]
+        instances = []
+        stack = [(i, np.eye(4)) for i in roots]
+        while stack:
+            index, parent = stack.pop()
+            node = nodes[index]
+            world = parent @ node_matrix(node)
+            if "mesh" in node:
+                instances.append((index, node["mesh"], world))
+            stack.extend((child, world) for child in node.get("children", []))
+        return instances
+
+    def info(self) -> ModelInfo:
+        """
+        Compute summary statistics from the JSON chunk and image headers
+        without reading any vertex data.
+        """
+        accessors = self.json.get("accessors", [])
+        meshes = self.json.get("meshes", [])
+        instances = self.mesh_instances()
+
+        vertex_count = triangle_count = 0
+        geometry: set[int] = set()
+        lo, hi = np.full(3, np.inf), np.full(3, -np.inf)
+        for _, mesh_index, world in instances:
+            for prim in meshes[mesh_index].get("primitives", []):
+                position = accessors[prim["attributes"]["POSITION"]]
+                vertex_count += position["count"]
+                triangle_count += _triangle_count(prim, accessors)
+                geometry.update(prim["attributes"].values())
+                if "indices" in prim:
+                    geometry.add(prim["indices"])
+                if "min" in position and "max" in position:
+                    normalized = position.get("normalized", False)
+                    dtype = COMPONENT_DTYPES[position["componentType"]]
+                    corners = _box_corners(
+                        dequantize(np.array(position["min"], dtype=dtype), normalized),
+                        dequantize(np.array(position["max"], dtype=dtype), normalized),
+                    )
+                    points = corners @ world[:3, :3].T + world[:3, 3]
+                    lo, hi = np.minimum(lo, points.min(0)), np.maximum(hi, points.max(0))
+
+        geometry_bytes = sum(
+            accessors[i]["count"]
+            * TYPE_SIZES[accessors[i]["type"]]
+            * COMPONENT_DTYPES[accessors[i]["componentType"]].itemsize
+            for i in geometry
+        )
+        textures = [self._texture_info(i) for i in range(len(self.json.get("images", [])))]
+        animations = [
+            anim.get("name") or f"animation_{i}"
+            for i, anim in enumerate(self.json.get("animations", []))
+        ]
+        materials = [
+            material.get("name") or f"material_{i}"
+            for i, material in enumerate(self.json.get("materials", []))
+        ]
+        extension = self.json.get("extensions", {}).get("KHR_materials_variants", {})
+        variants = [
+            variant.get("name") or f"variant_{i}"
+            for i, variant in enumerate(extension.get("variants", []))
+        ]
+        has_bounds = bool(np.isfinite(lo).all())
+        return ModelInfo(
+            vertex_count=vertex_count,
+            triangle_count=triangle_count,
+            bounds_min=_vec3(lo) if has_bounds else None,
+            bounds_max=_vec3(hi) if has_bounds else None,
+            textures=textures,
+            animations=animations,
+            materials=materials,
+            variants=variants,
+            geometry_bytes=geometry_bytes,
+            file_bytes=self.nbytes,
+        )
+
+    def _texture_info(self, index: int) -> TextureInfo:
+        image = self.json["images"][index]
+        data = self.image(index)
+        size = image_size(bytes(data[:65536])) if data is not None else None
+        mime = image.get("mimeType")
+        width, height = size if size else (None, None)
+        return TextureInfo(index, mime, width, height)
+
+
+@dataclass
+class SceneGeometry:
+    """
+    All triangles of the default scene in world space.
+
+    Vertex arrays are indexed by ``faces``. Missing texture coordinates are
+    zero and missing vertex colors white; ``normals`` is None unless every
+    primitive has them. The per-face arrays record where each triangle came
+    from.
+    """
+
+    positions: np.ndarray
+    normals: np.ndarray | None
+    uvs: np.ndarray
+    colors: np.ndarray
+    faces: np.ndarray
+    face_mesh: np.ndarray
+    face_primitive: np.ndarray
+    face_index: np.ndarray
+    face_material: np.ndarray
+
+    @property
+    def triangles(self) -> np.ndarray:
+        """
+        Triangle corner positions of shape (faces, 3, 3).
+        """
+        return self.positions[self.faces]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (
+            self.positions, self.normals, self.uvs, self.colors, self.faces,
+            self.face_mesh, self.face_primitive, self.face_index, self.face_material,
+        )
+        return sum(a.nbytes for a in arrays if a is not None)
+
+
+def scene_geometry(glb: GLB) -> SceneGeometry:
+    """
+    Collect the triangles of every mesh instance, transformed to world
+    space. Skinned meshes are taken in their bind pose.
+    """
+    meshes = glb.json.get("meshes", [])
+    parts: dict[str, list] = {k: [] for k in SceneGeometry.__dataclass_fields__}
+    offset = 0
+    for _, mesh_index, world in glb.mesh_instances():
+        for p, prim in enumerate(meshes[mesh_index].get("primitives", [])):
+            attributes = prim["attributes"]
+            positions = glb.float_accessor(attributes["POSITION"])
+            n = len(positions)
+            indices = glb.accessor(prim["indices"]) if "indices" in prim else np.arange(n)
+            faces = _triangulate(indices, prim.get("mode", MODE_TRIANGLES))
+            if not len(faces):
+                continue
+            parts["positions"].append(positions @ world[:3, :3].T + world[:3, 3])
+            if "NORMAL" in attributes:
+                normals = glb.float_accessor(attributes["NORMAL"]) @ np.linalg.inv(world[:3, :3])
+                norm = np.linalg.norm(normals, axis=1, keepdims=True)
+                parts["normals"].append(normals / np.where(norm > 0, norm, 1))
+            if "TEXCOORD_0" in attributes:
+                parts["uvs"].append(glb.float_accessor(attributes["TEXCOORD_0"]))
+            else:
+                parts["uvs"].append(np.zeros((n, 2)))
+            colors = np.ones((n, 4))
+            if "COLOR_0" in attributes:
+                values = glb.float_accessor(attributes["COLOR_0"])
+                colors[:, : values.shape[1]] = values
+            parts["colors"].append(colors)
+            parts["faces"].append(faces + offset)
+            parts["face_mesh"].append(np.full(len(faces), mesh_index))
+            parts["face_primitive"].append(np.full(len(faces), p))
+            parts["face_index"].append(np.arange(len(faces)))
+            parts["face_material"].append(np.full(len(faces), prim.get("material", -1)))
+            offset += n
+
+    def join(key, width, dtype):
+        if not parts[key]:
+            return np.zeros((0, width) if width else 0, dtype=dtype)
+        return np.concatenate(parts[key]).astype(dtype)
+
+    complete = len(parts["normals"]) == len(parts["positions"]) > 0
+    return SceneGeometry(
+        positions=join("positions", 3, np.float32),
+        normals=join("normals", 3, np.float32) if complete else None,
+        uvs=join("uvs", 2, np.float32),
+        colors=join("colors", 4, np.float32),
+        faces=join("faces", 3, np.int64),
+        face_mesh=join("face_mesh", 0, np.int64),
+        face_primitive=join("face_primitive", 0, np.int64),
+        face_index=join("face_index", 0, np.int64),
+        face_material=join("face_material", 0, np.int64),
+    )
+
+
+def node_matrix(node: dict) -> np.ndarray:
+    """
+    Local transform of a node as a 4x4 matrix.
+    """
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=float).reshape(4, 4).T
+    x, y, z, w = node.get("rotation", (0, 0, 0, 1))
+    rotation = np.array(
+        [
+            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+        ]
+    )
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.asarray(node.get("scale", (1, 1, 1)), dtype=float)
+    matrix[:3, 3] = node.get("translation", (0, 0, 0))
+    return matrix
+
+
+def dequantize(array: np.ndarray, normalized: bool) -> np.ndarray:
+    """
+    Convert accessor data to float32, mapping normalized integers to
+    [0, 1] or [-1, 1] as specified by glTF.
+    """
+    if not normalized or array.dtype.kind == "f":
+        return array.astype(np.float32, copy=False)
+    scale = np.float32(np.iinfo(array.dtype).max)
+    values = array.astype(np.float32) / scale
+    return np.maximum(values, -1) if array.dtype.kind == "i" else values
+
+
+def _vec3(values: np.ndarray) -> tuple[float, float, float]:
+    x, y, z = (float(v) for v in values)
+    return x, y, z
+
+
+def quantize(array: np.ndarray, dtype) -> np.ndarray:
+    """
+    Quantize floats in [0, 1] or [-1, 1] to normalized integers.
+    """
+    dtype = np.dtype(dtype)
+    scale = np.iinfo(dtype.type).max
+    return np.round(np.clip(array, -1 if dtype.kind == "i" else 0, 1) * scale).astype(dtype)
+
+
+class GLBWriter:
+    """
+    Assembles a GLB file from a JSON document and NumPy arrays.
+
+    Buffer views are 4-byte aligned and vertex attributes are padded to a
+    4-byte stride, as required by the glTF specification. The BIN chunk is
+    written into a single preallocated buffer.
+
+    Parameters
+    ----------
+    document: dict
+        The glTF JSON. Its buffers, bufferViews and accessors are replaced
+        by the ones added to the writer.
+    """
+
+    def __init__(self, document: dict):
+        self.json = {
+            k: v for k, v in document.items() if k not in ("buffers", "bufferViews", "accessors")
+        }
+        self.json["bufferViews"] = []
+        self.json["accessors"] = []
+        self._parts: list[tuple[int, np.ndarray]] = []
+        self._length = 0
+
+    def add_buffer_view(
+        self, data, target: int | None = None, byte_stride: int | None = None
+    ) -> int:
+        data = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+        data = data.reshape(-1).view(np.uint8)
+        offset = _align(self._length)
+        self._parts.append((offset, data))
+        self._length = offset + data.nbytes
+        view = {"buffer": 0, "byteOffset": offset, "byteLength": data.nbytes}
+        if target is not None:
+            view["target"] = target
+        if byte_stride is not None:
+            view["byteStride"] = byte_stride
+        self.json["bufferViews"].append(view)
+        return len(self.json["bufferViews"]) - 1
+
+    def add_accessor(
+        self,
+        array: np.ndarray,
+        normalized: bool = False,
+        target: int | None = None,
+        minmax: bool = False,
+        type: str | None = None,
+    ) -> int:
+        """
+        Add an accessor for an array of shape (count,) or (count, n).
+        """
+        array = np.asarray(array)
+        if array.dtype == np.float64:
+            array = array.astype(np.float32)
+        elif array.dtype.kind in "iu" and array.dtype not in COMPONENT_TYPES:
+            array = array.astype(np.uint32)
+        count = array.shape[0]
+        ncomp = int(np.prod(array.shape[1:], dtype=int))
+        rows = np.ascontiguousarray(array).reshape(count, ncomp)
+        stride = None
+        if target == ARRAY_BUFFER and rows.dtype.itemsize * ncomp % 4:
+            row_bytes = rows.dtype.itemsize * ncomp
+            stride = _align(row_bytes)
+            padded = np.zeros((count, stride), dtype=np.uint8)
+            padded[:, :row_bytes] = rows.view(np.uint8).reshape(count, row_bytes)
+            rows = padded
+        accessor = {
+            "bufferView": self.add_buffer_view(rows, target, stride),
+            "componentType": COMPONENT_TYPES[array.dtype],
+            "count": count,
+            "type": type or VECTOR_TYPES[ncomp],
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if minmax and count:
+            values = array.reshape(count, ncomp)
+            cast = float if array.dtype.kind == "f" else int
+            accessor["min"] = [cast(v) for v in values.min(0)]
+            accessor["max"] = [cast(v) for v in values.max(0)]
+        self.json["accessors"].append(accessor)
+        return len(self.json["accessors"]) - 1
+
+    def to_bytes(self) -> bytes:
+        document = dict(self.json)
+        if self._length:
+            document["buffers"] = [{"byteLength": self._length}]
+        else:
+            document.pop("bufferViews")
+        payload = json.dumps(document, separators=(",", ":")).encode()
+        json_length = _align(len(payload))
+        bin_length = _align(self._length)
+        total = 12 + 8 + json_length + (8 + bin_length if self._length else 0)
+        out = bytearray(total)
+        struct.pack_into("<4sII", out, 0, GLB_MAGIC, 2, total)
+        struct.pack_into("<II", out, 12, json_length, CHUNK_JSON)
+        out[20 : 20 + json_length] = payload.ljust(json_length, b" ")
+        if self._length:
+            start = 20 + json_length
+            struct.pack_into("<II", out, start, bin_length, CHUNK_BIN)
+            body = np.frombuffer(out, dtype=np.uint8, offset=start + 8, count=bin_length)
+            for offset, data in self._parts:
+                body[offset : offset + data.nbytes] = data
+        return bytes(out)
+
+
+@dataclass
+class Primitive:
+    """
+    Decoded vertex data of a mesh primitive, see ``read_primitive``.
+    """
+
+    attributes: dict[str, np.ndarray]
+    normalized: dict[str, bool]
+    indices: np.ndarray | None
+    targets: list[dict[str, np.ndarray]] = field(default_factory=list)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.attributes["POSITION"])
+
+    def select(self, keep: np.ndarray, indices: np.ndarray | None) -> "Primitive":
+        """
+        Return a primitive with the vertices ``keep`` and new indices.
+        """
+        return Primitive(
+            attributes={k: v[keep] for k, v in self.attributes.items()},
+            normalized=dict(self.normalized),
+            indices=indices,
+            targets=[{k: v[keep] for k, v in t.items()} for t in self.targets],
+        )
+
+
+def read_primitive(glb: GLB, prim: dict) -> Primitive:
+    """
+    Copy the arrays of a primitive out of the BIN chunk.
+    """
+    accessors = glb.json["accessors"]
+    attributes = {k: np.array(glb.accessor(i)) for k, i in prim["attributes"].items()}
+    normalized = {
+        k: accessors[i].get("normalized", False) for k, i in prim["attributes"].items()
+    }
+    indices = np.array(glb.accessor(prim["indices"])) if "indices" in prim else None
+    targets = [
+        {k: np.array(glb.accessor(i)) for k, i in target.items()}
+        for target in prim.get("targets", [])
+    ]
+    return Primitive(attributes, normalized, indices, targets)
+
+
+def repack(
+    glb: GLB,
+    document: dict | None = None,
+    primitives: dict[tuple[int, int], Primitive] | None = None,
+    images: dict[int, bytes] | None = None,
+) -> bytes:
+    """
+    Write a new GLB that only contains the accessors and buffer views that
+    are still referenced.
+
+    Parameters
+    ----------
+    glb: GLB
+        The source file, providing the data of accessors and images that
+        are copied unchanged.
+    document: dict | None
+        A modified copy of ``glb.json`` to write instead of the original.
+    primitives: dict | None
+        Replacement data for primitives, keyed by (mesh, primitive) index.
+    images: dict | None
+        Replacement encoded bytes for images, keyed by image index.
+    """
+    if any(ext in glb.json.get("extensionsUsed", []) for ext in UNSUPPORTED_EXTENSIONS):
+        raise GLBError("Compressed geometry is not supported")
+    document = json.loads(json.dumps(document if document is not None else glb.json))
+    primitives = primitives or {}
+    images = images or {}
+    writer = GLBWriter(document)
+    accessors = glb.json.get("accessors", [])
+    copied: dict[int, int] = {}
+
+    def copy(index: int, target: int | None = None) -> int:
+        if index not in copied:
+            accessor = accessors[index]
+            new = writer.add_accessor(
+                glb.accessor(index),
+                normalized=accessor.get("normalized", False),
+                target=target,
+                type=accessor["type"],
+            )
+            for key in ("min", "max", "name"):
+                if key in accessor:
+                    writer.json["accessors"][new][key] = accessor[key]
+            copied[index] = new
+        return copied[index]
+
+    for m, mesh in enumerate(document.get("meshes", [])):
+        for p, prim in enumerate(mesh.get("primitives", [])):
+            data = primitives.get((m, p))
+            if data is None:
+                prim["attributes"] = {
+                    k: copy(i, ARRAY_BUFFER) for k, i in prim["attributes"].items()
+                }
+                if "indices" in prim:
+                    prim["indices"] = copy(prim["indices"], ELEMENT_ARRAY_BUFFER)
+                if "targets" in prim:
+                    prim["targets"] = [
+                        {k: copy(i, ARRAY_BUFFER) for k, i in t.items()} for t in prim["targets"]
+                    ]
+                continue
+            prim["attributes"] = {
+                k: writer.add_accessor(
+                    v,
+                    normalized=data.normalized.get(k, False),
+                    target=ARRAY_BUFFER,
+                    minmax=k == "POSITION",
+                )
+                for k, v in data.attributes.items()
+            }
+            if data.indices is not None:
+                indices = data.indices.astype(_index_dtype(data.vertex_count))
+                prim["indices"] = writer.add_accessor(indices, target=ELEMENT_ARRAY_BUFFER)
+            else:
+                prim.pop("indices", None)
+            if data.targets:
+                prim["targets"] = [
+                    {
+                        k: writer.add_accessor(v, target=ARRAY_BUFFER, minmax=k == "POSITION")
+                        for k, v in t.items()
+                    }
+                    for t in data.targets
+                ]
+    for skin in document.get("skins", []):
+        if "inverseBindMatrices" in skin:
+            skin["inverseBindMatrices"] = copy(skin["inverseBindMatrices"])
+    for animation in document.get("animations", []):
+        for sampler in animation.get("samplers", []):
+            sampler["input"] = copy(sampler["input"])
+            sampler["output"] = copy(sampler["output"])
+    for index, image in enumerate(document.get("images", [])):
+        if index in images:
+            image.pop("uri", None)
+            image["bufferView"] = writer.add_buffer_view(images[index])
+        elif "bufferView" in image:
+            image["bufferView"] = writer.add_buffer_view(glb.image(index))
+    return writer.to_bytes()
+
+
+def image_size(data: bytes) -> tuple[int, int] | None:
+    """
+    Read the dimensions from a PNG, JPEG or WebP header.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:2] == b"\xff\xd8":
+        offset = 2
+        while offset + 9 < len(data):
+            if data[offset] != 0xFF:
+                offset += 1
+                continue
+            marker = data[offset + 1]
+            length = struct.unpack(">H", data[offset + 2 : offset + 4])[0]
+            # SOF0-SOF15, excluding DHT, JPG and DAC
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[offset + 5 : offset + 9])
+                return width, height
+            offset += 2 + length
+        return None
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        kind = data[12:16]
+        if kind == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if kind == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if kind == b"VP8X":
+            width = int.from_bytes(data[24:27], "little") + 1
+            height = int.from_bytes(data[27:30], "little") + 1
+            return width, height
+    return None
+
+
+def image_mime(data: bytes) -> str | None:
+    """
+    The mime type of PNG, JPEG or WebP data, None for anything else.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def inspect(source: str | Path | bytes) -> ModelInfo:
+    """
+    Compute the ModelInfo of a GLB file or buffer.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return GLB(source).info()
+    with GLB.open(source) as glb:
+        return glb.info()
+
+
+def _align(n: int) -> int:
+    return (n + 3) & ~3
+
+
+def _index_dtype(vertex_count: int) -> np.dtype:
+    return np.dtype(np.uint16) if vertex_count < 65535 else np.dtype(np.uint32)
+
+
+def _triangulate(indices: np.ndarray, mode: int) -> np.ndarray:
+    indices = indices.astype(np.int64)
+    if mode == MODE_TRIANGLES:
+        return indices[: len(indices) // 3 * 3].reshape(-1, 3)
+    count = max(len(indices) - 2, 0)
+    i = np.arange(count)
+    if mode == MODE_TRIANGLE_STRIP:
+        # Every other triangle of a strip is flipped to keep the winding
+        odd = i % 2 == 1
+        a = np.where(odd, indices[i + 1], indices[i])
+        b = np.where(odd, indices[i], indices[i + 1])
+        return np.stack([a, b, indices[i + 2]], axis=1)
+    if mode == MODE_TRIANGLE_FAN:
+        return np.stack([np.full(count, indices[0]), indices[i + 1], indices[i + 2]], axis=1)
+    return np.zeros((0, 3), dtype=np.int64)
+
+
+def _triangle_count(prim: dict, accessors: list[dict]) -> int:
+    mode = prim.get("mode", MODE_TRIANGLES)
+    if "indices" in prim:
+        count = accessors[prim["indices"]]["count"]
+    else:
+        count = accessors[prim["attributes"]["POSITION"]]["count"]
+    if mode == MODE_TRIANGLES:
+        return count // 3
+    if mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+        return max(count - 2, 0)
+    return 0
+
+
+def _box_corners(lo, hi) -> np.ndarray:
+    lo, hi = np.asarray(lo[:3], dtype=float), np.asarray(hi[:3], dtype=float)
+    mask = np.array([[i >> k & 1 for k in range(3)] for i in range(8)], dtype=bool)
+    return np.where(mask, hi, lo)
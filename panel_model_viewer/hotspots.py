@@ -0,0 +1,94 @@
+"""
+Columnar hotspots: many annotations pinned to a model.
+
+Hotspots are held as NumPy columns and reach the browser as typed arrays
+in binary WebSocket frames. Replacing them sends only the rows that were
+added, moved or relabeled and the ids that were removed, so large sets can
+be updated several times per second.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+MAX_ID = 2**31 - 1
+
+
+@dataclass(frozen=True)
+class Hotspots:
+    """
+    A set of hotspots with unique integer ids, positions in model
+    coordinates, optional surface normals and labels.
+
+    Hotspots with a zero normal are never culled; others are hidden while
+    their normal faces away from the camera.
+    """
+
+    ids: np.ndarray
+    positions: np.ndarray
+    normals: np.ndarray
+    labels: np.ndarray
+
+    @classmethod
+    def from_arrays(cls, positions, normals=None, labels=None, ids=None) -> "Hotspots":
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        n = len(positions)
+        normals = (
+            np.zeros((n, 3), dtype=np.float32)
+            if normals is None
+            else np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+        )
+        labels = np.asarray([""] * n if labels is None else labels, dtype=str).reshape(-1)
+        ids = np.arange(n) if ids is None else np.asarray(ids).reshape(-1)
+        if not len(normals) == len(labels) == len(ids) == n:
+            raise ValueError("positions, normals, labels and ids must have the same length")
+        if n and (not np.issubdtype(ids.dtype, np.integer) or ids.min() < 0 or ids.max() > MAX_ID):
+            raise ValueError(f"Hotspot ids must be integers between 0 and {MAX_ID}")
+        if len(np.unique(ids)) != n:
+            raise ValueError("Hotspot ids must be unique")
+        return cls(ids.astype(np.int32), positions, normals, labels)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def message(self) -> dict:
+        """
+        A message that replaces all hotspots in the browser.
+        """
+        every = np.ones(len(self), dtype=bool)
+        return {**self._upsert(every, every), "reset": True, "remove": self.ids[:0]}
+
+    def diff(self, new: "Hotspots") -> dict | None:
+        """
+        A message that turns these hotspots into ``new`` in the browser, or
+        None if nothing changed.
+        """
+        match = np.full(len(new), -1)
+        if len(self):
+            order = np.argsort(self.ids)
+            slot = order[np.searchsorted(self.ids[order], new.ids).clip(0, len(self) - 1)]
+            match = np.where(self.ids[slot] == new.ids, slot, -1)
+        found = match >= 0
+        old = match[found]
+        moved, relabeled = ~found, ~found
+        moved[found] = (self.positions[old] != new.positions[found]).any(axis=1) | (
+            self.normals[old] != new.normals[found]
+        ).any(axis=1)
+        relabeled[found] = self.labels[old] != new.labels[found]
+        removed = self.ids[~np.isin(self.ids, new.ids)]
+        if not (moved.any() or relabeled.any() or len(removed)):
+            return None
+        return {**new._upsert(moved, relabeled), "reset": False, "remove": removed}
+
+    def _upsert(self, moved: np.ndarray, relabeled: np.ndarray) -> dict:
+        return {
+            "type": "hotspots",
+            "ids": self.ids[moved],
+            "positions": self.positions[moved].ravel(),
+            "normals": self.normals[moved].ravel(),
+            "label_ids": self.ids[relabeled],
+            "labels": self.labels[relabeled].tolist(),
+        }
+
+
+EMPTY = Hotspots.from_arrays(np.zeros((0, 3)))
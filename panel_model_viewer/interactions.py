@@ -0,0 +1,58 @@
+"""
+Batched pointer interaction streams.
+
+With ModelViewer.stream_interactions the browser records pointer moves,
+presses, releases and exits over the viewer into fixed-size binary
+records, at most one move per animation frame, and sends them in batches.
+A batch arrives as one structured array of INTERACTION_DTYPE, so
+heatmaps, dwell times and drag paths are computed with NumPy rather than
+per-event callbacks.
+"""
+
+import numpy as np
+
+# Event kinds, in the order of their codes
+KINDS = ("move", "down", "up", "leave")
+
+MOVE, DOWN, UP, LEAVE = range(len(KINDS))
+
+# Packed little-endian layout of a record, mirrored by viewer.js
+INTERACTION_DTYPE: np.dtype = np.dtype(
+    [
+        # Milliseconds since the Unix epoch
+        ("time", "<f8"),
+        ("kind", "u1"),
+        # Pressed mouse buttons as a bit mask, non-zero while dragging
+        ("buttons", "u1"),
+        # Pointer position as fractions of the viewer width and height
+        ("x", "<f4"),
+        ("y", "<f4"),
+        # Model surface under the pointer in world coordinates, NaN when
+        # the pointer is off the model or surfaces are not resolved
+        ("position", "<f4", (3,)),
+    ]
+)
+
+
+def decode_interactions(data: bytes | memoryview) -> np.ndarray:
+    """
+    The structured array of INTERACTION_DTYPE records in ``data``.
+    """
+    if len(data) % INTERACTION_DTYPE.itemsize:
+        raise ValueError(
+            f"Interaction data of {len(data)} bytes is not a multiple of the "
+            f"{INTERACTION_DTYPE.itemsize} byte record size"
+        )
+    return np.frombuffer(data, dtype=INTERACTION_DTYPE).copy()
+
+
+def drag_paths(batch: np.ndarray) -> list[np.ndarray]:
+    """
+    Split the moves with a pressed button in ``batch`` into one array per
+    drag, in order. Drags that span batches are split at their boundary.
+    """
+    dragging = (batch["kind"] == MOVE) & (batch["buttons"] != 0)
+    # A drag ends at any event that is not a pressed move
+    starts = np.flatnonzero(dragging & ~np.concatenate([[False], dragging[:-1]]))
+    stops = np.flatnonzero(dragging & ~np.concatenate([dragging[1:], [False]])) + 1
+    return [batch[start:stop] for start, stop in zip(starts, stops, strict=True)]
@@ -0,0 +1,159 @@
+"""
+Level-of-detail generation by vertex clustering.
+
+Each mesh is overlaid with a uniform grid; all vertices that fall into the
+same cell collapse into one, whose position is the cell average and whose
+other attributes come from the first vertex in the cell. Triangles that
+become degenerate or duplicated are dropped. Coarser grids give coarser
+levels. Generated levels are cached on disk by content digest, so they are
+computed once per model and survive server restarts.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import param
+
+from .cache import DEFAULT_CACHE_DIR, Blob, blob_cache
+from .gltf import GLB, MODE_TRIANGLES, Primitive, dequantize, read_primitive, repack
+
+
+def cluster_vertices(prim: Primitive, origin: np.ndarray, cell: float) -> Primitive:
+    """
+    Collapse the vertices of a primitive onto a grid with the given cell
+    size.
+    """
+    normalized = prim.normalized.get("POSITION", False)
+    positions = dequantize(prim.attributes["POSITION"], normalized)
+    cells = np.floor((positions - origin) / cell).astype(np.int64)
+    cells -= cells.min(axis=0)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+
+    indices = prim.indices if prim.indices is not None else np.arange(prim.vertex_count)
+    triangles = inverse[indices].reshape(-1, 3)
+    a, b, c = triangles.T
+    triangles = triangles[(a != b) & (b != c) & (a != c)]
+    _, unique = np.unique(np.sort(triangles, axis=1), axis=0, return_index=True)
+    triangles = triangles[np.sort(unique)]
+    if not len(triangles):
+        # Keep a single triangle, a primitive must not be empty
+        return _compact(prim.select(np.arange(prim.vertex_count), indices[:3]))
+
+    clustered = prim.select(first, triangles.ravel())
+    if not normalized:
+        counts = np.bincount(inverse, minlength=len(first))[:, None]
+        sums = np.stack(
+            [np.bincount(inverse, weights=positions[:, i], minlength=len(first)) for i in range(3)],
+            axis=1,
+        )
+        clustered.attributes["POSITION"] = (sums / counts).astype(np.float32)
+    return _compact(clustered)
+
+
+def decimate(data: bytes | memoryview, resolution: int) -> bytes:
+    """
+    Simplify every triangle mesh of a GLB on a grid with ``resolution``
+    cells along the longest side of the mesh bounds.
+    """
+    glb = GLB(data)
+    document = json.loads(json.dumps(glb.json))
+    primitives: dict[tuple[int, int], Primitive] = {}
+    for m, mesh in enumerate(document.get("meshes", [])):
+        prims = {
+            p: read_primitive(glb, prim)
+            for p, prim in enumerate(mesh.get("primitives", []))
+            if prim.get("mode", MODE_TRIANGLES) == MODE_TRIANGLES and not prim.get("targets")
+        }
+        if not prims:
+            continue
+        positions = [
+            dequantize(d.attributes["POSITION"], d.normalized.get("POSITION", False))
+            for d in prims.values()
+        ]
+        lo = np.min([p.min(axis=0) for p in positions], axis=0)
+        hi = np.max([p.max(axis=0) for p in positions], axis=0)
+        cell = float((hi - lo).max()) / resolution
+        if cell == 0:
+            continue
+        for p, prim in prims.items():
+            primitives[(m, p)] = cluster_vertices(prim, lo, cell)
+    return repack(glb, document, primitives)
+
+
+class LevelOfDetail(param.Parameterized):
+    """
+    Generates and caches simplified versions of a model.
+
+    >>> ModelViewer(src=Path("model.glb"), transport="http", lod=LevelOfDetail())
+    """
+
+    resolutions = param.List(
+        default=[16, 64, 256],
+        item_type=int,
+        doc="Grid resolutions of the generated levels, from coarse to fine.",
+    )
+
+    min_reduction = param.Number(
+        default=0.8,
+        bounds=(0, 1),
+        doc="""
+        Levels with more than this fraction of the triangles of the next
+        finer level are skipped.""",
+    )
+
+    cache_dir = param.Foldername(
+        default=None,
+        check_exists=False,
+        doc="""
+        Directory for generated levels. Defaults to the lod folder in
+        $PANEL_MODEL_VIEWER_CACHE or ~/.cache/panel_model_viewer.""",
+    )
+
+    def levels(self, blob: Blob) -> list[tuple[int | None, int, Blob]]:
+        """
+        Return (resolution, triangle count, blob) for each useful level,
+        from coarse to fine. The original model is the last level, with a
+        resolution of None. Which levels are useful is cached with the
+        blob, so later calls do not parse the levels again.
+        """
+
+        def build(blob: Blob) -> list[tuple[int | None, int]]:
+            counts = [(None, GLB(blob.data).info().triangle_count)]
+            for resolution in sorted(self.resolutions, reverse=True):
+                triangles = GLB(self._level(blob, resolution).data).info().triangle_count
+                if triangles <= counts[0][1] * self.min_reduction:
+                    counts.insert(0, (resolution, triangles))
+            return counts
+
+        options = f"{sorted(self.resolutions)},{self.min_reduction},{self.cache_dir}"
+        counts = blob_cache.representation(blob, f"lod:{options}", build)
+        return [
+            (resolution, triangles, blob if resolution is None else self._level(blob, resolution))
+            for resolution, triangles in counts
+        ]
+
+    def _level(self, blob: Blob, resolution: int) -> Blob:
+        directory = Path(self.cache_dir) if self.cache_dir else DEFAULT_CACHE_DIR / "lod"
+        path = directory / f"{blob.digest}-{resolution}.glb"
+        if not path.is_file():
+            directory.mkdir(parents=True, exist_ok=True)
+            # Write atomically, other processes may generate the same level
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(decimate(blob.data, resolution))
+            os.replace(tmp, path)
+        return blob_cache.load(path, blob.mime)
+
+
+def _compact(prim: Primitive) -> Primitive:
+    indices = prim.indices if prim.indices is not None else np.arange(prim.vertex_count)
+    used = np.unique(indices)
+    remap = np.zeros(prim.vertex_count, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return prim.select(used, remap[indices])
@@ -0,0 +1,120 @@
+"""
+Per-session accounting of model payloads held in Bokeh documents.
+
+A local model inlined as a base64 data URI is part of the document of
+every session that shows it until the viewer releases it, see
+``ModelViewer.release_src``. The ledger records how many bytes each
+viewer holds that way, per session, so a session can be kept within
+``ModelViewer.max_session_bytes`` and the totals can be inspected at
+``/model_viewer_assets/memory``.
+"""
+
+import hashlib
+import json
+import threading
+import weakref
+
+from tornado.web import RequestHandler
+
+from .cache import blob_cache
+
+# Key of viewers that do not belong to a server session, e.g. in a notebook
+NO_SESSION = ""
+
+
+def session_id(doc) -> str:
+    """
+    The id of the session a document belongs to, NO_SESSION outside a server.
+    """
+    context = getattr(doc, "session_context", None)
+    return context.id if context is not None else NO_SESSION
+
+
+class SessionLedger:
+    """
+    Thread-safe record of the payload bytes held by the viewers of each
+    session. Viewers are referenced weakly and sessions are forgotten when
+    they are destroyed.
+    """
+
+    def __init__(self):
+        self._sessions: dict[str, weakref.WeakKeyDictionary] = {}
+        self._lock = threading.Lock()
+
+    def record(self, doc, viewer, nbytes: int) -> None:
+        """
+        Set the bytes ``viewer`` holds in the session of ``doc``.
+        """
+        key = session_id(doc)
+        with self._lock:
+            viewers = self._sessions.get(key)
+            if viewers is None:
+                viewers = self._sessions[key] = weakref.WeakKeyDictionary()
+                if key != NO_SESSION:
+                    doc.on_session_destroyed(lambda _: self.forget(key))
+            viewers[viewer] = nbytes
+
+    def held(self, doc, exclude=None) -> int:
+        """
+        Bytes held by the viewers of the session of ``doc``, other than
+        ``exclude``.
+        """
+        with self._lock:
+            viewers = self._sessions.get(session_id(doc), {})
+            return sum(n for viewer, n in list(viewers.items()) if viewer is not exclude)
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        Viewer count and bytes held per session. Session ids are hashed,
+        they grant access to the session.
+        """
+        with self._lock:
+            sessions = {key: list(viewers.values()) for key, viewers in self._sessions.items()}
+        return {
+            "bytes": sum(sum(held) for held in sessions.values()),
+            "sessions": [
+                {
+                    "session": hashlib.sha256(key.encode()).hexdigest()[:12] if key else None,
+                    "viewers": len(held),
+                    "bytes": sum(held),
+                }
+                for key, held in sessions.items()
+                if held
+            ],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+
+session_ledger = SessionLedger()
+
+
+class MemoryStatsHandler(RequestHandler):
+    """
+    Reports the shared blob cache, its model store and the per-session
+    ledger as JSON.
+
+    /model_viewer_assets/memory
+    """
+
+    def get(self) -> None:  # ty: ignore[invalid-method-override]
+        from .viewer import ModelViewer
+
+        self.set_header("Content-Type", "application/json")
+        self.set_header("Cache-Control", "no-store")
+        self.write(
+            json.dumps(
+                {
+                    "cache": blob_cache.stats(),
+                    "store": blob_cache.store.stats() if blob_cache.store else None,
+                    "max_session_bytes": ModelViewer.max_session_bytes,
+                    **session_ledger.stats(),
+                }
+            )
+        )
@@ -0,0 +1,194 @@
+"""
+Server-side mesh optimization for GLB files.
+
+All steps are vectorized with NumPy:
+
+- welding merges vertices whose attributes are bitwise identical,
+- reordering sorts triangles along a Morton curve through their centroids
+  and renumbers vertices by first use, which keeps both the post-transform
+  vertex cache and vertex fetches local,
+- quantization stores positions as normalized int16, normals and tangents
+  as normalized int8 and texture coordinates as normalized uint16
+  (KHR_mesh_quantization),
+- repacking drops accessors and buffer views that are no longer used.
+"""
+
+import json
+
+import numpy as np
+import param
+
+from .gltf import GLB, MODE_TRIANGLES, Primitive, dequantize, read_primitive, repack
+from .gltf import quantize as quantize_normalized
+from .pipeline import Stage
+
+QUANTIZATION_EXTENSION = "KHR_mesh_quantization"
+
+
+def weld_vertices(prim: Primitive) -> Primitive:
+    """
+    Merge vertices that are identical in every attribute and morph target.
+    """
+    n = prim.vertex_count
+    columns = [*prim.attributes.values(), *(a for t in prim.targets for a in t.values())]
+    rows = np.concatenate(
+        [np.ascontiguousarray(c).reshape(n, -1).view(np.uint8).reshape(n, -1) for c in columns],
+        axis=1,
+    )
+    keys = np.ascontiguousarray(rows).view(np.dtype((np.void, rows.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    # Keep the vertices in order of first occurrence
+    order = np.argsort(first)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    indices = prim.indices if prim.indices is not None else np.arange(n)
+    return prim.select(first[order], remap[inverse.ravel()[indices]])
+
+
+def reorder_for_cache(prim: Primitive) -> Primitive:
+    """
+    Sort triangles spatially and renumber vertices by first use. Vertices
+    that no triangle references are dropped.
+    """
+    indices = prim.indices if prim.indices is not None else np.arange(prim.vertex_count)
+    triangles = indices.reshape(-1, 3)
+    positions = dequantize(prim.attributes["POSITION"], prim.normalized.get("POSITION", False))
+    codes = morton_codes(positions[triangles].mean(axis=1))
+    triangles = triangles[np.argsort(codes, kind="stable")]
+    used, first = np.unique(triangles.ravel(), return_index=True)
+    order = used[np.argsort(first)]
+    remap = np.zeros(prim.vertex_count, dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return prim.select(order, remap[triangles.ravel()])
+
+
+def morton_codes(points: np.ndarray) -> np.ndarray:
+    """
+    30-bit Morton codes of points, quantized to a 1024^3 grid over their
+    bounding box.
+    """
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    extent = np.where(hi > lo, hi - lo, 1)
+    cells = ((points - lo) / extent * 1023).astype(np.uint32)
+    codes = np.zeros(len(points), dtype=np.uint32)
+    for axis in range(3):
+        v = cells[:, axis]
+        v = (v * 0x00010001) & 0xFF0000FF
+        v = (v * 0x00000101) & 0x0F00F00F
+        v = (v * 0x00000011) & 0xC30C30C3
+        v = (v * 0x00000005) & 0x49249249
+        codes |= v << axis
+    return codes
+
+
+def quantize_attributes(prim: Primitive) -> bool:
+    """
+    Quantize normals, tangents and texture coordinates in place. Returns
+    whether anything was quantized.
+    """
+    changed = False
+    for name, values in prim.attributes.items():
+        if values.dtype != np.float32 or prim.targets:
+            continue
+        if name in ("NORMAL", "TANGENT"):
+            prim.attributes[name] = quantize_normalized(values, np.int8)
+        elif name.startswith("TEXCOORD_") and values.min() >= 0 and values.max() <= 1:
+            prim.attributes[name] = quantize_normalized(values, np.uint16)
+        else:
+            continue
+        prim.normalized[name] = changed = True
+    return changed
+
+
+def quantize_positions(document: dict, mesh: int, prims: list[Primitive]) -> bool:
+    """
+    Quantize the positions of a mesh to normalized int16 and move the mesh
+    onto child nodes that carry the dequantization transform.
+    """
+    positions = [p.attributes["POSITION"] for p in prims]
+    if any(p.dtype != np.float32 for p in positions):
+        return False
+    lo = np.min([p.min(axis=0) for p in positions], axis=0)
+    hi = np.max([p.max(axis=0) for p in positions], axis=0)
+    # A uniform scale leaves normals unaffected by the node transform
+    center, scale = (lo + hi) / 2, float((hi - lo).max() / 2)
+    if scale == 0:
+        return False
+    for prim, values in zip(prims, positions, strict=True):
+        prim.attributes["POSITION"] = quantize_normalized((values - center) / scale, np.int16)
+        prim.normalized["POSITION"] = True
+    nodes = document.get("nodes", [])
+    for node in [n for n in nodes if n.get("mesh") == mesh]:
+        del node["mesh"]
+        node.setdefault("children", []).append(len(nodes))
+        nodes.append(
+            {
+                "mesh": mesh,
+                "translation": [float(c) for c in center],
+                "scale": [scale] * 3,
+            }
+        )
+    return True
+
+
+def optimize(data: bytes, weld: bool = True, reorder: bool = True, quantize: bool = True) -> bytes:
+    """
+    Optimize the triangle meshes of a GLB file, see the module docstring.
+    """
+    glb = GLB(data)
+    document = json.loads(json.dumps(glb.json))
+    nodes = document.get("nodes", [])
+    # Skinned and instanced meshes ignore or override the node transform
+    fixed = {n["mesh"] for n in nodes if "mesh" in n and ("skin" in n or "extensions" in n)}
+
+    primitives: dict[tuple[int, int], Primitive] = {}
+    quantized = False
+    for m, mesh in enumerate(document.get("meshes", [])):
+        prims = []
+        for p, prim in enumerate(mesh.get("primitives", [])):
+            if prim.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES:
+                continue
+            decoded = read_primitive(glb, prim)
+            if weld:
+                decoded = weld_vertices(decoded)
+            if reorder and decoded.indices is not None and len(decoded.indices):
+                decoded = reorder_for_cache(decoded)
+            if quantize:
+                quantized |= quantize_attributes(decoded)
+            primitives[(m, p)] = decoded
+            prims.append(decoded)
+        if (
+            quantize
+            and prims
+            and len(prims) == len(mesh["primitives"])
+            and m not in fixed
+            and not any(p.targets for p in prims)
+        ):
+            quantized |= quantize_positions(document, m, prims)
+
+    if quantized:
+        for key in ("extensionsUsed", "extensionsRequired"):
+            extensions = document.setdefault(key, [])
+            if QUANTIZATION_EXTENSION not in extensions:
+                extensions.append(QUANTIZATION_EXTENSION)
+    return repack(glb, document, primitives)
+
+
+class MeshOptimizer(Stage):
+    """
+    Pipeline stage that welds, reorders and quantizes mesh data.
+
+    >>> ModelViewer(src=Path("model.glb"), pipeline=[MeshOptimizer()])
+    """
+
+    weld = param.Boolean(default=True, doc="Merge bitwise identical vertices.")
+
+    reorder = param.Boolean(default=True, doc="Reorder indices for vertex-cache locality.")
+
+    quantize = param.Boolean(
+        default=True, doc="Quantize vertex attributes using KHR_mesh_quantization."
+    )
+
+    def transform(self, data: bytes) -> bytes:
+        return optimize(data, weld=self.weld, reorder=self.reorder, quantize=self.quantize)
+
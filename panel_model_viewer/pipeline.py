@@ -0,0 +1,55 @@
+"""
+Transformations applied to GLB sources before they are served.
+
+A pipeline is a list of stages. Each stage turns GLB bytes into new GLB
+bytes, and its output is cached in the shared blob cache by input digest
+and stage options, so every distinct model is processed once per process.
+"""
+
+import param
+
+from .cache import Blob, BlobCache, blob_cache
+
+
+class Stage(param.Parameterized):
+    """
+    Base class for pipeline stages.
+
+    Subclasses implement ``transform`` and declare their options as
+    parameters, which make up the cache key.
+    """
+
+    __abstract = True
+
+    def transform(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def __call__(self, data: bytes) -> bytes:
+        return self.transform(data)
+
+    def for_viewer(self, viewer) -> "Stage":
+        """
+        Return the stage to use for a particular viewer, e.g. with options
+        derived from its size. By default the stage itself.
+        """
+        return self
+
+    @property
+    def cache_key(self) -> str:
+        options = ",".join(
+            f"{k}={v!r}" for k, v in sorted(self.param.values().items()) if k != "name"
+        )
+        return f"{type(self).__name__}({options})"
+
+
+def run_pipeline(
+    blob: Blob, stages: list[Stage], viewer=None, cache: BlobCache = blob_cache
+) -> Blob:
+    """
+    Apply the stages in order, reusing cached results.
+    """
+    for stage in stages:
+        if viewer is not None:
+            stage = stage.for_viewer(viewer)
+        blob = cache.derive(blob, stage.cache_key, stage.transform)
+    return blob
@@ -0,0 +1,291 @@
+"""
+Server-side poster thumbnails from a NumPy software rasterizer.
+
+The default scene is projected from an orbit camera that frames its
+bounding sphere, the same framing ``ModelInfo.camera_orbit`` gives the
+browser. Triangles are rasterized in vectorized chunks: every triangle
+expands to the pixels of its screen bounding box, edge functions keep the
+covered ones and a depth test against a global z-buffer resolves
+visibility. Visible pixels are shaded with the base color factor, base
+color texture and vertex colors of their material and a Lambert term,
+rendered at a higher resolution and downsampled to antialias.
+
+Alpha modes, texture transforms and all other material properties are
+ignored, which is plenty for a placeholder shown while the model loads.
+"""
+
+import io
+import re
+
+import numpy as np
+from PIL import Image
+
+from .cache import Blob, BlobCache, blob_cache
+from .gltf import GLB, SceneGeometry, scene_geometry
+
+POSTER_MIME = "image/webp"
+
+# Upper bound on the candidate pixels tested per rasterization chunk
+CHUNK_PIXELS = 1 << 22
+
+AMBIENT = 0.35
+
+_ANGLE = re.compile(r"^\s*(-?[\d.]+)(deg|rad)\s+(-?[\d.]+)(deg|rad)")
+
+
+def orbit_angles(orbit: str | None, default: tuple[float, float] = (0, 75)) -> tuple[float, float]:
+    """
+    Theta and phi in degrees from a model-viewer camera-orbit string.
+    Falls back to ``default`` for missing orbits and unsupported units.
+    """
+    match = _ANGLE.match(orbit or "")
+    if match is None:
+        return default
+    theta, theta_unit, phi, phi_unit = match.groups()
+    try:
+        angles = [float(theta), float(phi)]
+    except ValueError:
+        return default
+    units = (theta_unit, phi_unit)
+    theta, phi = (np.degrees(a) if u == "rad" else a for a, u in zip(angles, units, strict=True))
+    return float(theta), float(phi)
+
+
+def look_at(eye: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    World to camera matrix for a camera at ``eye`` looking at ``target``
+    with +Y up. The camera looks along -Z.
+    """
+    forward = target - eye
+    forward /= np.linalg.norm(forward)
+    up = np.array([0.0, 1.0, 0.0])
+    if abs(forward @ up) > 0.999:
+        up = np.array([0.0, 0.0, -1.0 if forward[1] < 0 else 1.0])
+    right = np.cross(forward, up)
+    right /= np.linalg.norm(right)
+    view = np.eye(4)
+    view[:3, :3] = np.stack([right, np.cross(right, forward), -forward])
+    view[:3, 3] = -view[:3, :3] @ eye
+    return view
+
+
+def rasterize(
+    screen: np.ndarray, faces: np.ndarray, width: int, height: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Resolve the nearest triangle per pixel.
+
+    Parameters
+    ----------
+    screen: np.ndarray
+        Vertex positions of shape (n, 3) as pixel x, pixel y and a depth
+        that is linear in screen space, smaller is closer.
+    faces: np.ndarray
+        Vertex indices of shape (faces, 3).
+
+    Returns
+    -------
+    The index of the visible face per pixel, -1 for the background, and
+    the screen-space barycentric weights of the second and third vertex.
+    """
+    corners = screen[faces]
+    x0, y0, x1, y1 = (
+        np.clip(np.floor(corners[:, :, 0].min(axis=1) - 0.5), 0, width).astype(np.int64),
+        np.clip(np.floor(corners[:, :, 1].min(axis=1) - 0.5), 0, height).astype(np.int64),
+        np.clip(np.ceil(corners[:, :, 0].max(axis=1) - 0.5), -1, width - 1).astype(np.int64),
+        np.clip(np.ceil(corners[:, :, 1].max(axis=1) - 0.5), -1, height - 1).astype(np.int64),
+    )
+    w, h = np.maximum(x1 - x0 + 1, 0), np.maximum(y1 - y0 + 1, 0)
+    a, b, c = corners[:, 0], corners[:, 1], corners[:, 2]
+    area = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    counts = np.where(area != 0, w * h, 0)
+
+    depth = np.full(width * height, np.inf)
+    face = np.full(width * height, -1, dtype=np.int64)
+    bary = np.zeros((width * height, 2))
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(faces):
+        limit = ends[start] - counts[start] + CHUNK_PIXELS
+        stop = max(int(np.searchsorted(ends, limit, side="right")), start + 1)
+        ids = np.arange(start, stop)[counts[start:stop] > 0]
+        start = stop
+        if not len(ids):
+            continue
+        tri = np.repeat(ids, counts[ids])
+        offsets = np.arange(len(tri)) - np.repeat(np.cumsum(counts[ids]) - counts[ids], counts[ids])
+        px = x0[tri] + offsets % w[tri]
+        py = y0[tri] + offsets // w[tri]
+        sx, sy = px + 0.5, py + 0.5
+        ta, tb, tc = a[tri], b[tri], c[tri]
+        # Barycentric weights from edge functions, normalized by the signed
+        # area so that either winding gives positive weights inside
+        l1 = ((sx - ta[:, 0]) * (tc[:, 1] - ta[:, 1]) - (sy - ta[:, 1]) * (tc[:, 0] - ta[:, 0]))
+        l2 = ((tb[:, 0] - ta[:, 0]) * (sy - ta[:, 1]) - (tb[:, 1] - ta[:, 1]) * (sx - ta[:, 0]))
+        l1, l2 = l1 / area[tri], l2 / area[tri]
+        inside = (l1 >= 0) & (l2 >= 0) & (l1 + l2 <= 1)
+        tri, l1, l2 = tri[inside], l1[inside], l2[inside]
+        pixel = py[inside] * width + px[inside]
+        za, zb, zc = ta[inside, 2], tb[inside, 2], tc[inside, 2]
+        z = za + l1 * (zb - za) + l2 * (zc - za)
+        # Nearest candidate per pixel within the chunk, then against the buffer
+        order = np.lexsort((z, pixel))
+        pixel, first = np.unique(pixel[order], return_index=True)
+        nearest = order[first]
+        closer = z[nearest] < depth[pixel]
+        pixel, nearest = pixel[closer], nearest[closer]
+        depth[pixel] = z[nearest]
+        face[pixel] = tri[nearest]
+        bary[pixel] = np.stack([l1[nearest], l2[nearest]], axis=1)
+    return face.reshape(height, width), bary.reshape(height, width, 2)
+
+
+def render_poster(
+    data: bytes,
+    width: int = 512,
+    height: int = 512,
+    theta: float = 0,
+    phi: float = 75,
+    fov: float = 30,
+    supersample: int = 2,
+) -> Image.Image:
+    """
+    Render a GLB model to an RGBA image with a transparent background.
+
+    The camera orbits the bounding box center at ``theta`` and ``phi``
+    degrees, like model-viewer's camera-orbit, at the distance that fits
+    the bounding sphere into ``fov`` degrees along the shorter side.
+    """
+    glb = GLB(data)
+    geometry = scene_geometry(glb)
+    W, H = width * supersample, height * supersample
+    rgba = np.zeros((H, W, 4))
+    if len(geometry.faces):
+        lo, hi = geometry.positions.min(axis=0), geometry.positions.max(axis=0)
+        center, radius = (lo + hi) / 2, max(float(np.linalg.norm(hi - lo)) / 2, 1e-9)
+        t, p = np.radians(theta), np.radians(phi)
+        direction = np.array([np.sin(p) * np.sin(t), np.cos(p), np.sin(p) * np.cos(t)])
+        eye = center + direction * radius / np.sin(np.radians(fov) / 2)
+        view = look_at(eye, center)
+
+        camera = geometry.positions @ view[:3, :3].T + view[:3, 3]
+        distance = -camera[:, 2]
+        # The bounding sphere is in front of the camera, but guard anyway
+        front = np.flatnonzero((distance[geometry.faces] > 1e-6 * radius).all(axis=1))
+        focal = min(W, H) / 2 / np.tan(np.radians(fov) / 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            screen = np.stack(
+                [
+                    W / 2 + focal * camera[:, 0] / distance,
+                    H / 2 - focal * camera[:, 1] / distance,
+                    -1 / distance,
+                ],
+                axis=1,
+            )
+        face, bary = rasterize(screen, geometry.faces[front], W, H)
+        covered = face >= 0
+        rgb = _shade(glb, geometry, front[face[covered]], bary[covered], distance, direction)
+        rgba[covered, :3] = rgb
+        rgba[covered, 3] = 1
+
+    image = Image.fromarray(np.round(rgba * 255).astype(np.uint8), "RGBA")
+    if supersample > 1:
+        # Filter with premultiplied alpha so edges do not pick up the background
+        image = image.convert("RGBa").resize((width, height), Image.Resampling.LANCZOS)
+        image = image.convert("RGBA")
+    return image
+
+
+def encode_poster(image: Image.Image, quality: int = 80) -> bytes:
+    out = io.BytesIO()
+    image.save(out, "WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+
+def poster_for(
+    blob: Blob,
+    width: int = 512,
+    height: int = 512,
+    theta: float = 0,
+    phi: float = 75,
+    cache: BlobCache = blob_cache,
+) -> Blob:
+    """
+    The WebP poster of a GLB blob, rendered once per model and view.
+    """
+
+    def render(data: bytes) -> bytes:
+        return encode_poster(render_poster(data, width, height, theta, phi))
+
+    key = f"poster({width}x{height},{theta:g},{phi:g})"
+    return cache.derive(blob, key, render, mime=POSTER_MIME)
+
+
+def _shade(
+    glb: GLB,
+    geometry: SceneGeometry,
+    face: np.ndarray,
+    bary: np.ndarray,
+    distance: np.ndarray,
+    light: np.ndarray,
+) -> np.ndarray:
+    """
+    Color of the pixels showing ``face`` at the barycentric weights
+    ``bary``, lit in linear RGB and returned in sRGB.
+    """
+    corners = geometry.faces[face]
+    # Perspective-correct weights from the screen-space ones
+    weights = np.column_stack([1 - bary.sum(axis=1), bary]) / distance[corners]
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    def interpolate(values):
+        v = values[corners]
+        return weights[:, :1] * v[:, 0] + weights[:, 1:2] * v[:, 1] + weights[:, 2:] * v[:, 2]
+
+    if geometry.normals is not None:
+        normals = interpolate(geometry.normals)
+    else:
+        a, b, c = (geometry.positions[corners[:, i]] for i in range(3))
+        normals = np.cross(b - a, c - a)
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+    # Light from the camera, double-sided
+    lambert = AMBIENT + (1 - AMBIENT) * np.abs(normals @ light)
+
+    colors = interpolate(geometry.colors)[:, :3]
+    uvs = interpolate(geometry.uvs)
+    materials = glb.json.get("materials", [])
+    material = geometry.face_material[face]
+    for index in np.unique(material):
+        pixels = material == index
+        pbr = materials[index].get("pbrMetallicRoughness", {}) if index >= 0 else {}
+        colors[pixels] *= np.asarray(pbr.get("baseColorFactor", [1, 1, 1, 1]))[:3]
+        texture = _texture(glb, pbr.get("baseColorTexture", {}).get("index"))
+        if texture is not None:
+            th, tw = texture.shape[:2]
+            u, v = uvs[pixels, 0], uvs[pixels, 1]
+            x = (np.floor((u - np.floor(u)) * tw).astype(np.int64)).clip(0, tw - 1)
+            y = (np.floor((v - np.floor(v)) * th).astype(np.int64)).clip(0, th - 1)
+            colors[pixels] *= texture[y, x]
+    linear = np.clip(colors * lambert[:, None], 0, 1)
+    return linear ** (1 / 2.2)
+
+
+def _texture(glb: GLB, index: int | None) -> np.ndarray | None:
+    """
+    A texture as linear RGB floats, or None if it cannot be decoded.
+    """
+    if index is None:
+        return None
+    texture = glb.json.get("textures", [])[index]
+    source = texture.get("source")
+    for extension in texture.get("extensions", {}).values():
+        source = extension.get("source", source)
+    data = glb.image(source) if source is not None else None
+    if data is None:
+        return None
+    try:
+        image = Image.open(io.BytesIO(bytes(data))).convert("RGB")
+    except (OSError, ValueError):
+        return None
+    return (np.asarray(image, dtype=np.float32) / 255) ** 2.2
+
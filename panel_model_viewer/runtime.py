@@ -0,0 +1,120 @@
+"""
+The self-hosted <model-viewer> runtime.
+
+The runtime ships with the package, so pages never depend on a CDN.
+``scripts/build_runtime.py`` names it after its content digest and writes
+brotli and gzip variants next to it, once at build time. Components that
+render <model-viewer> elements derive from :class:`ModelViewerRuntime`,
+so Panel includes the runtime once per page under a single URL, served
+from its component resource route. On ``pn.serve`` servers, which
+``install_routes`` patches, :class:`RuntimeHandler` takes over that URL
+and adds immutable caching and the precompressed variants. ``panel serve``
+matches its own route first, even with ``--plugins
+panel_model_viewer.assets``, so it keeps serving the plain file.
+"""
+
+import gzip
+import hashlib
+import re
+from functools import cache
+from pathlib import Path
+
+from panel.custom import JSComponent
+from panel.io.resources import COMPONENT_PATH
+from tornado.web import HTTPError, RequestHandler
+
+STATIC = Path(__file__).parent / "static"
+
+# Content-Encoding and suffix of the precompressed variants, preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_PATTERN = "model-viewer.*.min.js"
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def build(source: Path, directory: Path = STATIC) -> Path:
+    """
+    Write the runtime in ``source`` to ``directory`` under a fingerprinted
+    name, together with its brotli and gzip variants, and remove earlier
+    builds. Needs the brotli package, from the dev dependencies.
+    """
+    import brotli
+
+    data = Path(source).read_bytes()
+    target = Path(directory) / f"model-viewer.{fingerprint(data)}.min.js"
+    for stale in Path(directory).glob(f"{_PATTERN}*"):
+        if not stale.name.startswith(target.name):
+            stale.unlink()
+    target.write_bytes(data)
+    target.with_name(target.name + ".gz").write_bytes(gzip.compress(data, 9, mtime=0))
+    target.with_name(target.name + ".br").write_bytes(brotli.compress(data, quality=11))
+    return target
+
+
+def runtime_file(directory: Path = STATIC) -> Path | None:
+    """
+    The built runtime in ``directory``, None if it has not been built.
+    """
+    return next(iter(sorted(Path(directory).glob(_PATTERN))), None)
+
+
+class ModelViewerRuntime(JSComponent):
+    """
+    Base class of components that render <model-viewer> elements.
+
+    Panel gives a module a URL per class listing it, and the browser would
+    evaluate each URL separately. The runtime is therefore only listed
+    here, and subclasses list no modules of their own.
+    """
+
+    __javascript_modules__ = [f"static/{path.name}" for path in [runtime_file()] if path]
+
+    def __init__(self, **params):
+        from .assets import install_routes
+
+        # Before the page that includes the runtime is served
+        install_routes()
+        super().__init__(**params)
+
+
+class RuntimeHandler(RequestHandler):
+    """
+    Serves the built runtime with immutable caching, preferring the
+    precompressed variant the client accepts.
+    """
+
+    def get(self, name: str) -> None:  # ty: ignore[invalid-method-override]
+        from .assets import accepted_encodings
+
+        path = STATIC / name
+        if path != runtime_file():
+            raise HTTPError(404, "Unknown runtime")
+        self.set_header("Content-Type", "text/javascript; charset=utf-8")
+        self.set_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.set_header("Vary", "Accept-Encoding")
+        accepted = accepted_encodings(self.request.headers.get("Accept-Encoding", ""))
+        for coding, suffix in ENCODINGS:
+            variant = path.with_name(path.name + suffix)
+            if coding in accepted and variant.is_file():
+                self.set_header("Content-Encoding", coding)
+                path = variant
+                break
+        self.write(_read(path))
+
+
+@cache
+def _read(path: Path) -> bytes:
+    return path.read_bytes()
+
+
+# The URL Panel's resource mechanism gives the runtime
+ROUTES = [
+    (
+        rf"/{COMPONENT_PATH}{re.escape(__name__)}/ModelViewerRuntime/__javascript_modules__/"
+        r"static/(model-viewer\.[0-9a-f]{16}\.min\.js)",
+        RuntimeHandler,
+    )
+]
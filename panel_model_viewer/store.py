@@ -0,0 +1,215 @@
+"""
+Model store shared by the worker processes of a host.
+
+With ``panel serve --num-procs N`` every worker reads and holds its own
+copy of every model. Given a store, :class:`~.cache.BlobCache` instead
+copies GLB files loaded from a Path once into the store directory, keyed
+by content digest, and every process memory-maps that copy read-only, so
+the pages are shared through the page cache. On a tmpfs such as
+``/dev/shm`` the store lives in memory. An index by path, mtime and size
+lets a worker map a model another one stored without reading or hashing
+the file. The store of :data:`~.cache.blob_cache` is the directory in
+``PANEL_MODEL_VIEWER_STORE``, if set.
+
+The store only saves memory with the 'http' transport, which serves
+models straight from the mapped copy, and which viewers default to while
+:data:`~.cache.blob_cache` has a store. The 'data_uri' transport still
+builds a base64 copy of every model in every worker.
+
+Every process mapping a model leaves a reference marker. When the last
+blob of a model in a process is garbage collected its marker is removed,
+and the model is deleted once no live process references it. Models
+added ahead of time with :meth:`ModelStore.add`, e.g. by a step run
+before the workers fork, stay until a process has mapped and released
+them or :meth:`ModelStore.collect` is called.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import weakref
+from collections.abc import Callable
+from pathlib import Path
+
+STORE_ENV = "PANEL_MODEL_VIEWER_STORE"
+
+_DIGEST_LENGTH = 64
+
+_stores: "weakref.WeakSet[ModelStore]" = weakref.WeakSet()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _write_atomic(path: Path, data) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class ModelStore:
+    """
+    Content-addressed models in a directory shared between processes.
+
+    Parameters
+    ----------
+    directory: str | Path
+        Where models, the path index and reference markers are kept,
+        created if missing.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self._paths = self.directory / "paths"
+        self._refs = self.directory / "refs"
+        for d in (self.directory, self._paths, self._refs):
+            d.mkdir(parents=True, exist_ok=True)
+        self._mapped: dict[str, int] = {}
+        self._lock = threading.Lock()
+        _stores.add(self)
+
+    @classmethod
+    def from_env(cls) -> "ModelStore | None":
+        """
+        The store in the directory named by PANEL_MODEL_VIEWER_STORE, None
+        if it is not set.
+        """
+        directory = os.environ.get(STORE_ENV)
+        return cls(directory) if directory else None
+
+    def lookup(self, path: Path) -> str | None:
+        """
+        The digest of the stored copy of an unchanged file, if any.
+        """
+        try:
+            digest = self._index(path).read_text()
+        except OSError:
+            return None
+        return digest if (self.directory / digest).is_file() else None
+
+    def add(self, path: Path, read: Callable[[Path], bytes] = Path.read_bytes) -> str:
+        """
+        Store the content of a file unless it is stored already, and return
+        its digest.
+        """
+        path = Path(path).absolute()
+        index = self._index(path)
+        data = read(path)
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.directory / digest
+        if data and not target.is_file():
+            _write_atomic(target, data)
+        _write_atomic(index, digest.encode())
+        return digest
+
+    def open(self, digest: str) -> memoryview | None:
+        """
+        Map a stored model read-only and take a reference to it for this
+        process, to be returned with :meth:`release`. None if it is not
+        stored.
+        """
+        with self._lock:
+            count = self._mapped.get(digest, 0)
+            if not count:
+                self._marker(digest).touch()
+            self._mapped[digest] = count + 1
+        try:
+            with open(self.directory / digest, "rb") as fh:
+                return memoryview(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError):
+            # Deleted by another process in the meantime, or empty
+            self.release(digest)
+            return None
+
+    def release(self, digest: str) -> None:
+        """
+        Return a reference taken by :meth:`open`, deleting the model once
+        no live process references it.
+        """
+        with self._lock:
+            count = self._mapped.get(digest, 0) - 1
+            if count > 0:
+                self._mapped[digest] = count
+                return
+            self._mapped.pop(digest, None)
+            self._marker(digest).unlink(missing_ok=True)
+            if not self.references(digest):
+                (self.directory / digest).unlink(missing_ok=True)
+
+    def references(self, digest: str) -> int:
+        """
+        The number of live processes referencing a model. Markers of
+        processes that died are removed.
+        """
+        count = 0
+        for marker in self._refs.glob(f"{digest}.*"):
+            if _alive(int(marker.suffix[1:])):
+                count += 1
+            else:
+                marker.unlink(missing_ok=True)
+        return count
+
+    def collect(self) -> int:
+        """
+        Delete all models no live process references and return how many.
+        """
+        removed = 0
+        for path in self.directory.iterdir():
+            if len(path.name) == _DIGEST_LENGTH and not self.references(path.name):
+                path.unlink(missing_ok=True)
+                removed += 1
+        for index in self._paths.iterdir():
+            try:
+                if not (self.directory / index.read_text()).is_file():
+                    index.unlink(missing_ok=True)
+            except OSError:
+                pass
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        models = [p for p in self.directory.iterdir() if len(p.name) == _DIGEST_LENGTH]
+        with self._lock:
+            mapped = len(self._mapped)
+        return {
+            "models": len(models),
+            "bytes": sum(p.stat().st_size for p in models if p.is_file()),
+            "mapped": mapped,
+        }
+
+    def _after_fork(self) -> None:
+        # Workers forked by --num-procs inherit the mappings of the parent
+        self._lock = threading.Lock()
+        for digest in self._mapped:
+            self._marker(digest).touch()
+
+    def _index(self, path: Path) -> Path:
+        path = Path(path).absolute()
+        stat = path.stat()
+        key = f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}"
+        return self._paths / hashlib.sha256(key.encode()).hexdigest()
+
+    def _marker(self, digest: str) -> Path:
+        return self._refs / f"{digest}.{os.getpid()}"
+
+
+def _after_fork() -> None:
+    for store in _stores:
+        store._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,127 @@
+"""
+Incremental vertex attribute updates for live meshes.
+
+Instead of replacing the whole model, changed vertex attributes are sent
+as binary buffers and patched into the geometry the browser has already
+loaded, leaving the camera and everything else untouched. Every update
+is one of:
+
+- a full frame with all values of the attribute,
+- a delta with the indices and new values of the vertices that changed,
+- a quantized delta with the changes as int16 multiples of a scale.
+
+The stream remembers what the browser holds after each update, so deltas
+are always taken against it and quantization errors do not accumulate.
+"""
+
+import numpy as np
+
+ENCODINGS = ("auto", "full", "delta", "quantized")
+
+# Vertex attributes that can be streamed, by their names in three.js
+ATTRIBUTES = {"positions": "position", "normals": "normal", "colors": "color", "uvs": "uv"}
+
+QUANTIZED_MAX = np.iinfo(np.int16).max
+
+
+class GeometryStream:
+    """
+    Encodes vertex attribute updates against the last frame sent.
+    """
+
+    def __init__(self):
+        self._frames: dict[tuple[int, str], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def clear(self) -> None:
+        self._frames.clear()
+
+    def encode(self, primitive: int, name: str, values, encoding: str = "auto") -> dict | None:
+        """
+        The update that turns the browser's copy of attribute ``name`` of
+        ``primitive`` into ``values``, or None if nothing changed.
+
+        The first update of an attribute is always a full frame. 'auto'
+        sends a delta if it is smaller than a full frame.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}, got {encoding!r}")
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim != 2:
+            raise ValueError(f"{name} must have shape (n, k), got {values.shape}")
+        key = (primitive, name)
+        previous = self._frames.get(key)
+        if previous is not None and previous.shape != values.shape:
+            raise ValueError(
+                f"{name} changed shape from {previous.shape} to {values.shape}, "
+                "reassign src to change the topology"
+            )
+        update = {"name": name, "width": values.shape[1]}
+        if previous is None or encoding == "full":
+            return self._full(key, values, update)
+
+        changed = np.flatnonzero((values != previous).any(axis=1))
+        if not len(changed):
+            return None
+        if encoding == "auto":
+            if len(changed) * (1 + values.shape[1]) >= values.size:
+                return self._full(key, values, update)
+            encoding = "delta"
+        # Slicing is much cheaper than fancy indexing when everything moved
+        rows = slice(None) if len(changed) == len(values) else changed
+        if encoding == "delta":
+            frame = self._frames[key] = values.copy()
+            return {
+                **update,
+                "encoding": "delta",
+                "indices": changed.astype(np.uint32),
+                "values": frame[rows].ravel(),
+            }
+
+        delta = values[rows] - previous[rows].astype(np.float64)
+        scale = float(np.abs(delta).max()) / QUANTIZED_MAX
+        quantized = np.rint(delta / scale).astype(np.int16)
+        # Track exactly what the browser computes, in float64 rounded to
+        # float32. Frames are replaced, messages may still hold the old one.
+        frame = self._frames[key] = previous.copy()
+        frame[rows] = previous[rows] + quantized * scale
+        return {
+            **update,
+            "encoding": "quantized",
+            "indices": changed.astype(np.uint32),
+            "values": quantized.ravel(),
+            "scale": scale,
+        }
+
+    def _full(self, key: tuple[int, str], values: np.ndarray, update: dict) -> dict:
+        frame = self._frames[key] = values.copy()
+        return {**update, "encoding": "full", "values": frame.ravel()}
+
+    def sync_messages(self) -> list[dict]:
+        """
+        Full frames of every streamed attribute, for a browser view that
+        has not seen the earlier updates.
+        """
+        primitives = sorted({primitive for primitive, _ in self._frames})
+        return [
+            geometry_message(
+                primitive,
+                [
+                    {
+                        "name": name,
+                        "width": frame.shape[1],
+                        "encoding": "full",
+                        "values": frame.ravel(),
+                    }
+                    for (p, name), frame in self._frames.items()
+                    if p == primitive
+                ],
+            )
+            for primitive in primitives
+        ]
+
+
+def geometry_message(primitive: int, updates: list[dict]) -> dict:
+    return {"type": "geometry", "primitive": primitive, "attributes": updates}
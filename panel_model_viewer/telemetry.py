@@ -0,0 +1,225 @@
+"""
+Aggregation of the performance statistics browsers report.
+
+With ``ModelViewer.collect_stats`` the browser measures how a viewer
+performs on the user's machine: time to the poster and to the loaded
+model, bytes transferred, the GPU renderer and a histogram of frame
+times. It sends them in batches every ``stats_interval_ms``. Each batch
+becomes the viewer's ``stats`` and is added to :data:`stats_aggregator`,
+which keeps them per model and renderer for the whole process. Its
+summary is served in the Prometheus text format at
+``/model_viewer_assets/metrics``.
+"""
+
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Any, TypeGuard
+
+import numpy as np
+from tornado.web import RequestHandler
+
+# Upper bounds of the frame time histogram buckets in milliseconds. The
+# browser counts frames into the same buckets, plus one for longer frames.
+FRAME_BUCKETS_MS = (4.0, 8.0, 12.0, 16.7, 20.0, 25.0, 33.3, 50.0, 66.7, 100.0, 250.0, 1000.0)
+
+# Timings and sizes reported once per loaded model
+SAMPLES = ("load_ms", "poster_ms", "bytes")
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+MAX_RENDERER_LENGTH = 120
+
+
+def frame_percentiles(counts, quantiles=QUANTILES) -> dict[float, float]:
+    """
+    Frame time percentiles in milliseconds of a frame time histogram,
+    interpolated linearly within buckets. Frames in the overflow bucket
+    count as the largest bound.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return {q: math.nan for q in quantiles}
+    edges = np.array((0.0, *FRAME_BUCKETS_MS, FRAME_BUCKETS_MS[-1]))
+    cumulative = np.cumsum(counts)
+    result = {}
+    for q in quantiles:
+        i = int(np.searchsorted(cumulative, q * total))
+        before = cumulative[i - 1] if i else 0.0
+        fraction = (q * total - before) / counts[i] if counts[i] else 0.0
+        result[q] = float(edges[i] + fraction * (edges[i + 1] - edges[i]))
+    return result
+
+
+def _number(value) -> TypeGuard[int | float]:
+    return isinstance(value, (int, float)) and math.isfinite(value) and value >= 0
+
+
+def validate_report(report: dict) -> dict:
+    """
+    The well-formed fields of a report sent by the browser: any of
+    load_ms, poster_ms and bytes, the renderer, and the frame time
+    histogram ``frames`` with the summed frame time ``frame_total_ms``.
+    """
+    clean: dict[str, Any] = {
+        key: float(report[key]) for key in SAMPLES if _number(report.get(key))
+    }
+    renderer = report.get("renderer")
+    if isinstance(renderer, str) and renderer:
+        clean["renderer"] = renderer[:MAX_RENDERER_LENGTH]
+    frames, total = report.get("frames"), report.get("frame_total_ms")
+    if (
+        isinstance(frames, list)
+        and len(frames) == len(FRAME_BUCKETS_MS) + 1
+        and all(_number(count) for count in frames)
+        and sum(frames)
+        and _number(total)
+    ):
+        clean["frames"] = [int(count) for count in frames]
+        clean["frame_total_ms"] = float(total)
+    return clean
+
+
+class _Group:
+    def __init__(self, samples: int):
+        self.samples = {key: deque(maxlen=samples) for key in SAMPLES}
+        self.frames = np.zeros(len(FRAME_BUCKETS_MS) + 1, dtype=np.int64)
+        self.frame_total_ms = 0.0
+        self.reports = 0
+
+
+class StatsAggregator:
+    """
+    Thread-safe, process-wide summary of browser reports per model and
+    renderer.
+
+    Parameters
+    ----------
+    samples: int
+        Number of most recent load, poster and byte samples kept per group.
+    max_groups: int
+        Number of model and renderer combinations kept; the least recently
+        reported ones are dropped beyond it.
+    """
+
+    def __init__(self, samples: int = 1024, max_groups: int = 512):
+        self.samples = samples
+        self.max_groups = max_groups
+        self._groups: OrderedDict[tuple[str, str], _Group] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, model: str, report: dict) -> None:
+        """
+        Add a validated report about ``model``.
+        """
+        key = (model, report.get("renderer", "unknown"))
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group(self.samples)
+                while len(self._groups) > self.max_groups:
+                    self._groups.popitem(last=False)
+            self._groups.move_to_end(key)
+            group.reports += 1
+            for name in SAMPLES:
+                if name in report:
+                    group.samples[name].append(report[name])
+            if "frames" in report:
+                group.frames += report["frames"]
+                group.frame_total_ms += report["frame_total_ms"]
+
+    def summary(self, quantiles=QUANTILES) -> list[dict]:
+        """
+        Percentiles of the samples and frame times of every group.
+        """
+        with self._lock:
+            groups = [
+                (key, group.reports, {k: list(v) for k, v in group.samples.items()},
+                 group.frames.copy(), group.frame_total_ms)
+                for key, group in self._groups.items()
+            ]
+        summaries = []
+        for (model, renderer), reports, samples, frames, frame_total_ms in groups:
+            summary = {"model": model, "renderer": renderer, "reports": reports}
+            for name, values in samples.items():
+                if values:
+                    percentiles = np.percentile(values, [q * 100 for q in quantiles])
+                    summary[name] = {"count": len(values), **_named(quantiles, percentiles)}
+            if frames.sum():
+                summary["frame_ms"] = {
+                    "count": int(frames.sum()),
+                    "sum": frame_total_ms,
+                    **_named(quantiles, frame_percentiles(frames, quantiles).values()),
+                }
+            summaries.append(summary)
+        return summaries
+
+    def prometheus(self) -> str:
+        """
+        The summary in the Prometheus text exposition format.
+        """
+        lines = []
+        metrics = {
+            "load_ms": ("model_viewer_load_seconds", 1e-3),
+            "poster_ms": ("model_viewer_poster_seconds", 1e-3),
+            "bytes": ("model_viewer_transfer_bytes", 1),
+        }
+        summaries = self.summary()
+        for key, (metric, scale) in metrics.items():
+            lines.append(f"# TYPE {metric} summary")
+            for summary in summaries:
+                if key not in summary:
+                    continue
+                labels = _labels(summary)
+                for q in QUANTILES:
+                    value = summary[key][f"p{q * 100:g}"] * scale
+                    lines.append(f'{metric}{{{labels},quantile="{q:g}"}} {value:g}')
+                lines.append(f"{metric}_count{{{labels}}} {summary[key]['count']}")
+        lines.append("# TYPE model_viewer_frame_seconds histogram")
+        with self._lock:
+            groups = [
+                (key, group.frames.copy(), group.frame_total_ms)
+                for key, group in self._groups.items()
+            ]
+        bounds = [f"{bound / 1000:g}" for bound in FRAME_BUCKETS_MS] + ["+Inf"]
+        for (model, renderer), frames, frame_total_ms in groups:
+            if not frames.sum():
+                continue
+            labels = _labels({"model": model, "renderer": renderer})
+            for le, count in zip(bounds, np.cumsum(frames), strict=True):
+                lines.append(f'model_viewer_frame_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f"model_viewer_frame_seconds_sum{{{labels}}} {frame_total_ms / 1000:g}")
+            lines.append(f"model_viewer_frame_seconds_count{{{labels}}} {frames.sum()}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+
+
+def _named(quantiles, values) -> dict[str, float]:
+    return {f"p{q * 100:g}": float(v) for q, v in zip(quantiles, values, strict=True)}
+
+
+def _labels(summary: dict) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return f'model="{escape(summary["model"])}",renderer="{escape(summary["renderer"])}"'
+
+
+stats_aggregator = StatsAggregator()
+
+
+class MetricsHandler(RequestHandler):
+    """
+    Serves the aggregated browser statistics for scraping.
+
+    /model_viewer_assets/metrics
+    """
+
+    def get(self) -> None:  # ty: ignore[invalid-method-override]
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.set_header("Cache-Control", "no-store")
+        self.write(stats_aggregator.prometheus())
@@ -0,0 +1,138 @@
+"""
+Texture downscaling and recompression for GLB files.
+
+Embedded PNG and JPEG images are decoded with Pillow, downscaled to a
+maximum dimension and re-encoded as WebP (EXT_texture_webp) or JPEG.
+Images with transparency are never turned into JPEG; they stay PNG. An
+image is only replaced if the result is smaller or had to be resized.
+"""
+
+import io
+import json
+
+import param
+from PIL import Image
+
+from .gltf import GLB, repack
+from .pipeline import Stage
+
+WEBP_EXTENSION = "EXT_texture_webp"
+
+# Assumed devicePixelRatio when deriving a texture budget from viewer size
+BUDGET_PIXEL_RATIO = 2
+
+
+def recompress_image(
+    data: bytes, max_size: int | None, format: str, quality: int
+) -> tuple[bytes, str] | None:
+    """
+    Downscale and re-encode a single image. Returns the new bytes and mime
+    type, or None if the original should be kept.
+    """
+    image = Image.open(io.BytesIO(data))
+    resized = max_size is not None and max(image.size) > max_size
+    if resized:
+        scale = max_size / max(image.size)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.Resampling.LANCZOS)
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    if has_alpha and image.mode != "RGBA":
+        image = image.convert("RGBA")
+    elif not has_alpha and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    if has_alpha and image.getchannel("A").getextrema()[0] == 255:
+        # Fully opaque alpha channel
+        image, has_alpha = image.convert("RGB"), False
+
+    out = io.BytesIO()
+    if format == "webp":
+        image.save(out, "WEBP", quality=quality, method=4)
+        mime = "image/webp"
+    elif not has_alpha:
+        image.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+        mime = "image/jpeg"
+    else:
+        image.save(out, "PNG", optimize=True)
+        mime = "image/png"
+    encoded = out.getvalue()
+    if not resized and len(encoded) >= len(data):
+        return None
+    return encoded, mime
+
+
+def compress_textures(
+    data: bytes, max_size: int | None = 2048, format: str = "webp", quality: int = 80
+) -> bytes:
+    """
+    Recompress the embedded images of a GLB file, see the module docstring.
+    """
+    glb = GLB(data)
+    document = json.loads(json.dumps(glb.json))
+    images: dict[int, bytes] = {}
+    for index, image in enumerate(document.get("images", [])):
+        encoded = glb.image(index)
+        if image.get("mimeType") not in ("image/png", "image/jpeg") or encoded is None:
+            continue
+        result = recompress_image(bytes(encoded), max_size, format, quality)
+        if result is not None:
+            images[index], image["mimeType"] = result
+
+    webp = {i for i in images if document["images"][i]["mimeType"] == "image/webp"}
+    if webp:
+        for texture in document.get("textures", []):
+            if texture.get("source") in webp:
+                extensions = texture.setdefault("extensions", {})
+                extensions[WEBP_EXTENSION] = {"source": texture.pop("source")}
+        for key in ("extensionsUsed", "extensionsRequired"):
+            extensions = document.setdefault(key, [])
+            if WEBP_EXTENSION not in extensions:
+                extensions.append(WEBP_EXTENSION)
+    if not images:
+        return data
+    return repack(glb, document, images=images)
+
+
+class TextureCompressor(Stage):
+    """
+    Pipeline stage that downscales and recompresses embedded textures.
+
+    >>> ModelViewer.pipeline = [TextureCompressor(max_size=1024)]
+    """
+
+    max_size = param.Integer(
+        default=2048,
+        bounds=(1, None),
+        allow_None=True,
+        doc="Maximum width or height of a texture, None to keep the size.",
+    )
+
+    format = param.Selector(
+        default="webp",
+        objects=["webp", "jpeg"],
+        doc="""
+        Target encoding. 'jpeg' keeps images with transparency as PNG.""",
+    )
+
+    quality = param.Integer(default=80, bounds=(1, 100), doc="Encoder quality.")
+
+    viewer_budget = param.Boolean(
+        default=False,
+        doc="""
+        Limit max_size further for viewers with a fixed width and height,
+        to the power of two covering their size at a devicePixelRatio of 2.""",
+    )
+
+    def transform(self, data: bytes) -> bytes:
+        return compress_textures(data, self.max_size, self.format, self.quality)
+
+    def for_viewer(self, viewer) -> "TextureCompressor":
+        sizes = [s for s in (viewer.width, viewer.height) if s]
+        if not self.viewer_budget or len(sizes) < 2:
+            return self
+        budget = 1 << (max(sizes) * BUDGET_PIXEL_RATIO - 1).bit_length()
+        if self.max_size is not None and budget >= self.max_size:
+            return self
+        return TextureCompressor(
+            max_size=budget, format=self.format, quality=self.quality, viewer_budget=False
+        )
@@ -1,68 +1,1040 @@
+// URLs already requested by prefetch, shared by all viewers on the page
+const prefetched = new Set();
+
+function prefetch(urls) {
+    for (const url of urls) {
+        const href = new URL(url, document.baseURI).href;
+        if (prefetched.has(href)) continue;
+        prefetched.add(href);
+        // Reading the body puts the response into the HTTP cache that
+        // model-viewer's loader hits when src switches to this URL.
+        fetch(href, { priority: "low" })
+            .then((response) => response.arrayBuffer())
+            .catch(() => prefetched.delete(href));
+    }
+}
+
+// src of a released local model, whose payload is requested from Python
+// by views that have not loaded it yet
+const SRC_HANDLE = "model-viewer-asset:";
+
+// Grid cells of a level of detail may cover this many rendered pixels
+// before the next finer level becomes visibly better
+const PIXELS_PER_CELL = 4;
+
+function selectLevel(levels, el) {
+    const size = Math.max(el.clientWidth, el.clientHeight) * (window.devicePixelRatio || 1);
+    const index = levels.findIndex(
+        (level) => level.resolution == null || level.resolution * PIXELS_PER_CELL >= size
+    );
+    return index < 0 ? levels.length - 1 : index;
+}
+
+// Params mirrored to <model-viewer> attributes, booleans as present/absent
+const ATTRIBUTES = {
+    alt: "alt",
+    poster: "poster",
+    camera_target: "camera-target",
+    camera_orbit: "camera-orbit",
+    field_of_view: "field-of-view",
+    camera_controls: "camera-controls",
+    variant_name: "variant-name",
+};
+
+// Styles of the element that the style param overrides
+const BASE_STYLE = { display: "block", width: "100%", height: "100%" };
+
+// Keys of next that were removed or changed since previous
+function diff(previous, next) {
+    const removed = Object.keys(previous).filter((key) => !(key in next));
+    const changed = Object.entries(next).filter(([key, value]) => previous[key] !== value);
+    return { removed, changed };
+}
+
+// Camera changes smaller than this (radians, or relative to the orbit
+// radius for distances) are not sent to Python
+const CAMERA_EPSILON = 1e-3;
+
+function cameraState(viewer) {
+    const orbit = viewer.getCameraOrbit();
+    const target = viewer.getCameraTarget();
+    return [
+        orbit.theta,
+        orbit.phi,
+        orbit.radius,
+        target.x,
+        target.y,
+        target.z,
+        (viewer.getFieldOfView() * Math.PI) / 180,
+    ];
+}
+
+function cameraChanged(a, b) {
+    if (!a) return true;
+    const scale = Math.max(Math.abs(b[2]), 1e-9);
+    return a.some((value, i) => {
+        const distance = i >= 2 && i <= 5;
+        return Math.abs(value - b[i]) / (distance ? scale : 1) > CAMERA_EPSILON;
+    });
+}
+
+function formatNumber(value) {
+    return String(Number(value.toPrecision(6)));
+}
+
+// model-viewer's default rotation-per-second
+const DEFAULT_ROTATION_SPEED = (32 * Math.PI) / 180;
+
+function parseAngle(value) {
+    const match = /^\s*(-?[\d.]+)\s*(deg|rad)?\s*$/.exec(value || "");
+    if (!match) return null;
+    const angle = parseFloat(match[1]);
+    return match[2] === "deg" ? (angle * Math.PI) / 180 : angle;
+}
+
+// The camera of a <model-viewer> in world space: it orbits the target and
+// looks at it with +Y up. focal is in CSS pixels of the element height.
+function cameraBasis(viewer) {
+    const { theta, phi, radius } = viewer.getCameraOrbit();
+    const target = viewer.getCameraTarget();
+    const forward = [
+        -Math.sin(phi) * Math.sin(theta),
+        -Math.cos(phi),
+        -Math.sin(phi) * Math.cos(theta),
+    ];
+    const eye = [
+        target.x - radius * forward[0],
+        target.y - radius * forward[1],
+        target.z - radius * forward[2],
+    ];
+    const length = Math.hypot(forward[0], forward[2]);
+    const right = length > 1e-9 ? [-forward[2] / length, 0, forward[0] / length] : [1, 0, 0];
+    const up = [
+        right[1] * forward[2] - right[2] * forward[1],
+        right[2] * forward[0] - right[0] * forward[2],
+        right[0] * forward[1] - right[1] * forward[0],
+    ];
+    const focal = viewer.clientHeight / 2 / Math.tan((viewer.getFieldOfView() * Math.PI) / 360);
+    return { eye, forward, right, up, focal, radius };
+}
+
+// Hotspots are kept in columnar typed arrays, indexed by id. Removal moves
+// the last row into the gap, so updates never shift the whole store.
+class HotspotStore {
+    constructor() {
+        this.rows = new Map();
+        this.ids = new Int32Array(0);
+        this.positions = new Float32Array(0);
+        this.normals = new Float32Array(0);
+        this.labels = [];
+        this.size = 0;
+    }
+
+    clear() {
+        this.rows.clear();
+        this.labels = [];
+        this.size = 0;
+    }
+
+    reserve(size) {
+        if (size <= this.ids.length) return;
+        const capacity = Math.max(size, 2 * this.ids.length, 64);
+        const grow = (array, width) => {
+            const grown = new array.constructor(capacity * width);
+            grown.set(array.subarray(0, this.size * width));
+            return grown;
+        };
+        this.ids = grow(this.ids, 1);
+        this.positions = grow(this.positions, 3);
+        this.normals = grow(this.normals, 3);
+    }
+
+    remove(ids) {
+        for (const id of ids) {
+            const row = this.rows.get(id);
+            if (row === undefined) continue;
+            this.rows.delete(id);
+            const last = --this.size;
+            if (row !== last) {
+                this.ids[row] = this.ids[last];
+                this.positions.copyWithin(row * 3, last * 3, last * 3 + 3);
+                this.normals.copyWithin(row * 3, last * 3, last * 3 + 3);
+                this.labels[row] = this.labels[last];
+                this.rows.set(this.ids[row], row);
+            }
+            this.labels.pop();
+        }
+    }
+
+    upsert(ids, positions, normals) {
+        this.reserve(this.size + ids.length);
+        for (let i = 0; i < ids.length; i++) {
+            let row = this.rows.get(ids[i]);
+            if (row === undefined) {
+                row = this.size++;
+                this.rows.set(ids[i], row);
+                this.ids[row] = ids[i];
+                this.labels[row] = "";
+            }
+            this.positions.set(positions.subarray(i * 3, i * 3 + 3), row * 3);
+            this.normals.set(normals.subarray(i * 3, i * 3 + 3), row * 3);
+        }
+    }
+
+    relabel(ids, labels) {
+        for (let i = 0; i < ids.length; i++) {
+            const row = this.rows.get(ids[i]);
+            if (row !== undefined) this.labels[row] = labels[i];
+        }
+    }
+}
+
+const HOTSPOT_RADIUS = 4;
+
+// Draws all hotspots in front of the camera as markers on one canvas and
+// labels the nearest of them with a pool of reused elements. Hotspots
+// whose normal faces away from the camera are culled as occluded.
+function createHotspotLayer(viewer, model) {
+    const store = new HotspotStore();
+    const layer = document.createElement("div");
+    layer.style.cssText = "position: absolute; inset: 0; pointer-events: none; overflow: hidden";
+    const canvas = document.createElement("canvas");
+    canvas.style.cssText = "position: absolute; inset: 0; width: 100%; height: 100%";
+    layer.appendChild(canvas);
+    const pool = [];
+    let depths = new Float32Array(0);
+    let frame = null;
+
+    function label(index) {
+        if (index < pool.length) return pool[index];
+        const element = document.createElement("div");
+        element.style.cssText =
+            "position: absolute; left: 0; top: 0; padding: 1px 4px; font: 11px sans-serif;" +
+            "background: rgba(255, 255, 255, 0.85); border-radius: 3px; white-space: nowrap";
+        layer.appendChild(element);
+        pool.push(element);
+        return element;
+    }
+
+    function draw() {
+        frame = null;
+        const width = viewer.clientWidth;
+        const height = viewer.clientHeight;
+        const ratio = window.devicePixelRatio || 1;
+        if (canvas.width !== Math.round(width * ratio) || canvas.height !== Math.round(height * ratio)) {
+            canvas.width = Math.round(width * ratio);
+            canvas.height = Math.round(height * ratio);
+        }
+        const context = canvas.getContext("2d");
+        context.setTransform(ratio, 0, 0, ratio, 0, 0);
+        context.clearRect(0, 0, width, height);
+        let labelled = 0;
+        if (store.size && width && height) {
+            const { eye, forward, right, up, focal, radius } = cameraBasis(viewer);
+            const near = radius * 1e-3;
+            if (depths.length < store.size * 3) depths = new Float32Array(store.ids.length * 3);
+
+            const { positions, normals } = store;
+            const candidates = [];
+            context.beginPath();
+            for (let row = 0; row < store.size; row++) {
+                const i = row * 3;
+                const vx = positions[i] - eye[0];
+                const vy = positions[i + 1] - eye[1];
+                const vz = positions[i + 2] - eye[2];
+                const depth = vx * forward[0] + vy * forward[1] + vz * forward[2];
+                if (depth < near) continue;
+                if (normals[i] * vx + normals[i + 1] * vy + normals[i + 2] * vz > 0) continue;
+                const x = width / 2 + (focal * (vx * right[0] + vz * right[2])) / depth;
+                const y = height / 2 - (focal * (vx * up[0] + vy * up[1] + vz * up[2])) / depth;
+                if (x < 0 || y < 0 || x > width || y > height) continue;
+                context.moveTo(x + HOTSPOT_RADIUS, y);
+                context.arc(x, y, HOTSPOT_RADIUS, 0, 2 * Math.PI);
+                if (store.labels[row]) {
+                    depths[i] = depth;
+                    depths[i + 1] = x;
+                    depths[i + 2] = y;
+                    candidates.push(row);
+                }
+            }
+            context.fillStyle = "rgba(255, 255, 255, 0.9)";
+            context.strokeStyle = "rgba(0, 0, 0, 0.6)";
+            context.fill();
+            context.stroke();
+
+            const limit = model.max_hotspot_labels;
+            if (candidates.length > limit) candidates.sort((a, b) => depths[a * 3] - depths[b * 3]);
+            for (const row of candidates.slice(0, limit)) {
+                const element = label(labelled++);
+                if (element.textContent !== store.labels[row]) element.textContent = store.labels[row];
+                const x = depths[row * 3 + 1] + HOTSPOT_RADIUS + 2;
+                const y = depths[row * 3 + 2] - 8;
+                element.style.transform = `translate(${x}px, ${y}px)`;
+                element.style.display = "";
+            }
+        }
+        for (const element of pool.slice(labelled)) element.style.display = "none";
+    }
+
+    function schedule() {
+        if (frame === null) frame = requestAnimationFrame(draw);
+    }
+
+    function update(msg) {
+        if (msg.reset) store.clear();
+        store.remove(msg.remove);
+        store.upsert(msg.ids, msg.positions, msg.normals);
+        store.relabel(msg.label_ids, msg.labels);
+        schedule();
+    }
+
+    viewer.addEventListener("camera-change", schedule);
+    viewer.addEventListener("load", schedule);
+    return { layer, update, schedule, remove: () => cancelAnimationFrame(frame) };
+}
+
+// The three.js scene of a <model-viewer>. It is not public API, so it is
+// looked up by the name of the symbol it is stored under.
+function threeScene(viewer) {
+    const symbol = Object.getOwnPropertySymbols(viewer).find((s) => s.description === "scene");
+    return symbol ? viewer[symbol] : null;
+}
+
+// Mesh primitives of the loaded model in depth-first order, which
+// matches the order of nodes and primitives in the glTF file
+function sceneMeshes(scene) {
+    const root = scene.currentGLTF?.scene ?? scene;
+    const meshes = [];
+    root.traverse((object) => {
+        if (object.isMesh) meshes.push(object);
+    });
+    return meshes;
+}
+
+// A float attribute with width components per vertex that can be
+// patched in place. Quantized, normalized and interleaved attributes are
+// converted on first use.
+function floatAttribute(geometry, name, width) {
+    const attribute = geometry.getAttribute(name);
+    if (
+        attribute &&
+        attribute.itemSize === width &&
+        attribute.array instanceof Float32Array &&
+        !attribute.normalized &&
+        !attribute.isInterleavedBufferAttribute
+    ) {
+        return attribute;
+    }
+    const position = geometry.getAttribute("position");
+    const count = position.count;
+    const array = new Float32Array(count * width);
+    if (attribute) {
+        const getters = [attribute.getX, attribute.getY, attribute.getZ, attribute.getW];
+        const components = Math.min(width, attribute.itemSize);
+        for (let i = 0; i < count; i++) {
+            for (let c = 0; c < components; c++) array[i * width + c] = getters[c].call(attribute, i);
+        }
+    }
+    // The BufferAttribute class of the three.js build model-viewer uses
+    const plain = position.isInterleavedBufferAttribute ? position.clone() : position;
+    const patched = new plain.constructor(array, width);
+    geometry.setAttribute(name, patched);
+    return patched;
+}
+
+// Apply a geometry message of GeometryStream. Returns false if the
+// loaded model does not have the primitive or its vertex count differs.
+function applyGeometry(viewer, msg) {
+    const scene = threeScene(viewer);
+    const mesh = scene && sceneMeshes(scene)[msg.primitive];
+    if (!mesh) return false;
+    if (!mesh.userData.panelStreamed) {
+        // Geometry is shared with other elements showing the same model
+        mesh.geometry = mesh.geometry.clone();
+        mesh.userData.panelStreamed = true;
+    }
+    const geometry = mesh.geometry;
+    const count = geometry.getAttribute("position").count;
+    for (const update of msg.attributes) {
+        const { name, width, encoding, values } = update;
+        const expected = encoding === "full" ? count * width : update.indices.length * width;
+        if (values.length !== expected || (encoding !== "full" && update.indices.some((i) => i >= count))) {
+            console.warn(`ModelViewer: ${name} update does not match the model, ignoring it`);
+            return false;
+        }
+        const attribute = floatAttribute(geometry, name, width);
+        const array = attribute.array;
+        if (encoding === "full") {
+            array.set(values);
+        } else {
+            const { indices, scale } = update;
+            for (let j = 0; j < indices.length; j++) {
+                const row = indices[j] * width;
+                for (let c = 0; c < width; c++) {
+                    if (encoding === "delta") array[row + c] = values[j * width + c];
+                    else array[row + c] += values[j * width + c] * scale;
+                }
+            }
+        }
+        attribute.needsUpdate = true;
+        if (name === "position") {
+            geometry.computeBoundingBox();
+            geometry.computeBoundingSphere();
+        } else if (name === "color" && !mesh.material.vertexColors) {
+            mesh.material.vertexColors = true;
+            mesh.material.needsUpdate = true;
+        }
+    }
+    scene.queueRender?.();
+    return true;
+}
+
+// Material properties that can be edited and how to read their original
+// values from a model-viewer Material
+const MATERIAL_PROPERTIES = {
+    base_color: (pbr) => [...pbr.baseColorFactor],
+    metallic: (pbr) => pbr.metallicFactor,
+    roughness: (pbr) => pbr.roughnessFactor,
+    base_color_texture: (pbr) => pbr.baseColorTexture?.texture ?? null,
+};
+
+// A material by name, or by index for unnamed ones named material_<index>
+function findMaterial(scene, name) {
+    const material = scene.getMaterialByName(name);
+    if (material) return material;
+    const match = /^material_(\d+)$/.exec(name);
+    return match ? scene.materials[Number(match[1])] ?? null : null;
+}
+
+// Streamed interactions are packed into records that match
+// interactions.INTERACTION_DTYPE in Python: time f8, kind u1, buttons u1,
+// x and y f4 and the surface position as 3 x f4, little-endian without
+// padding.
+const INTERACTION_RECORD = 30;
+const INTERACTION_KINDS = { pointermove: 0, pointerdown: 1, pointerup: 2, pointerleave: 3 };
+
+class InteractionBuffer {
+    constructor() {
+        this.view = new DataView(new ArrayBuffer(0));
+        this.size = 0;
+    }
+
+    push(time, kind, buttons, x, y, position) {
+        const offset = this.size * INTERACTION_RECORD;
+        if (offset + INTERACTION_RECORD > this.view.byteLength) {
+            const grown = new Uint8Array(Math.max(2 * this.view.byteLength, 64 * INTERACTION_RECORD));
+            grown.set(new Uint8Array(this.view.buffer));
+            this.view = new DataView(grown.buffer);
+        }
+        const view = this.view;
+        view.setFloat64(offset, time, true);
+        view.setUint8(offset + 8, kind);
+        view.setUint8(offset + 9, Math.min(buttons, 255));
+        view.setFloat32(offset + 10, x, true);
+        view.setFloat32(offset + 14, y, true);
+        view.setFloat32(offset + 18, position ? position.x : NaN, true);
+        view.setFloat32(offset + 22, position ? position.y : NaN, true);
+        view.setFloat32(offset + 26, position ? position.z : NaN, true);
+        this.size++;
+    }
+
+    // The buffered records as one ArrayBuffer, emptying the buffer
+    take() {
+        const data = this.view.buffer.slice(0, this.size * INTERACTION_RECORD);
+        this.size = 0;
+        return data;
+    }
+}
+
+// Upper bounds of the frame time histogram buckets in milliseconds,
+// matching telemetry.FRAME_BUCKETS_MS in Python, plus an overflow bucket
+const FRAME_BUCKETS_MS = [4, 8, 12, 16.7, 20, 25, 33.3, 50, 66.7, 100, 250, 1000];
+// Gaps longer than this are pauses, e.g. a background tab, not frames
+const FRAME_GAP_MS = 5000;
+
+class FrameHistogram {
+    constructor() {
+        this.reset();
+    }
+
+    reset() {
+        this.counts = new Array(FRAME_BUCKETS_MS.length + 1).fill(0);
+        this.total = 0;
+        this.size = 0;
+        this.last = null;
+    }
+
+    frame(now) {
+        const elapsed = this.last === null ? null : now - this.last;
+        this.last = now;
+        if (elapsed === null || elapsed > FRAME_GAP_MS) return;
+        const index = FRAME_BUCKETS_MS.findIndex((bound) => elapsed <= bound);
+        this.counts[index < 0 ? FRAME_BUCKETS_MS.length : index]++;
+        this.total += elapsed;
+        this.size++;
+    }
+
+    // The frames counted so far, starting a new histogram
+    take() {
+        const frames = { frames: this.counts, frame_total_ms: this.total };
+        const last = this.last;
+        this.reset();
+        this.last = last;
+        return frames;
+    }
+}
+
+let gpuRendererName = null;
+
+// The unmasked GPU renderer, read once per page from a throwaway context
+function gpuRenderer() {
+    if (gpuRendererName !== null) return gpuRendererName;
+    gpuRendererName = "unknown";
+    try {
+        const gl = document.createElement("canvas").getContext("webgl");
+        if (gl) {
+            const info = gl.getExtension("WEBGL_debug_renderer_info");
+            gpuRendererName = gl.getParameter(info ? info.UNMASKED_RENDERER_WEBGL : gl.RENDERER);
+            gl.getExtension("WEBGL_lose_context")?.loseContext();
+        }
+    } catch (error) {
+        console.warn("ModelViewer: reading the GPU renderer failed", error);
+    }
+    return gpuRendererName;
+}
+
 export function render({ model, el }) {
     const viewer = document.createElement("model-viewer");
-    viewer.style.display = "block";
-    viewer.style.width = "100%";
-    viewer.style.height = "100%";
-
-    // Bind attributes
-    viewer.alt = model.alt;
-    if (model.src) viewer.setAttribute("src", model.src);
-    if (model.poster) viewer.setAttribute("poster", model.poster);
 
-    if (model.auto_rotate) viewer.setAttribute("auto-rotate", "");
-    if (model.camera_controls) viewer.setAttribute("camera-controls", "");
+    // Param changes are collected and applied together in the next
+    // animation frame. style and html_attrs are diffed against what was
+    // applied last, so only changed keys touch the DOM and removed keys
+    // are reset.
+    const applied = { style: {}, html_attrs: {} };
+    // Camera values sent to Python that have not come back as param
+    // changes yet, by param name
+    const synced = {};
+    const pending = new Set();
+    let patchFrame = null;
 
-    // Apply usage css
-    for (const [key, value] of Object.entries(model.style)) {
-        viewer.style[key] = value;
+    function patch(names) {
+        for (const name of names) {
+            if (name === "style") {
+                const style = { ...BASE_STYLE, ...model.style };
+                const { removed, changed } = diff(applied.style, style);
+                for (const key of removed) viewer.style[key] = "";
+                for (const [key, value] of changed) viewer.style[key] = value;
+                applied.style = style;
+            } else if (name === "html_attrs") {
+                const { removed, changed } = diff(applied.html_attrs, model.html_attrs);
+                for (const key of removed) viewer.removeAttribute(key);
+                for (const [key, value] of changed) viewer.setAttribute(key, value);
+                applied.html_attrs = { ...model.html_attrs };
+            } else if (synced[name]?.delete(model[name])) {
+                // Our own camera update, the element is already there
+            } else {
+                synced[name]?.clear();
+                const value = model[name];
+                if (value === false || value == null || value === "") {
+                    viewer.removeAttribute(ATTRIBUTES[name]);
+                } else {
+                    viewer.setAttribute(ATTRIBUTES[name], value === true ? "" : value);
+                }
+            }
+        }
     }
 
-    // Apply HTML attributes
-    for (const [key, value] of Object.entries(model.html_attrs)) {
-        viewer.setAttribute(key, value);
+    function schedulePatch(name) {
+        pending.add(name);
+        if (patchFrame !== null) return;
+        patchFrame = requestAnimationFrame(() => {
+            patchFrame = null;
+            const names = [...pending];
+            pending.clear();
+            patch(names);
+        });
     }
 
+    patch([...Object.keys(ATTRIBUTES), "style", "html_attrs"]);
     el.appendChild(viewer);
 
-    // Model <-> View Syncing
-    // Observe changes from Python
-    model.on('src', () => {
-        if (model.src) viewer.setAttribute("src", model.src);
-        else viewer.removeAttribute("src");
-    });
-    model.on('alt', () => { viewer.alt = model.alt; });
-    model.on('auto_rotate', () => {
-        if (model.auto_rotate) viewer.setAttribute("auto-rotate", "");
+    // Render policy: auto-rotation and animations stop while paused, and
+    // with max_fps they are advanced by a timer instead of every frame
+    let pageHidden = document.visibilityState === "hidden";
+    let inView = true;
+    let animating = false;
+    let ticker = null;
+
+    function renderState() {
+        const policy = model.render_policy;
+        if (policy === "on-demand" || (policy === "visible" && (pageHidden || !inView))) {
+            return "paused";
+        }
+        return model.max_fps ? "throttled" : "running";
+    }
+
+    function tick(dt) {
+        if (model.auto_rotate) {
+            const speed = parseAngle(viewer.getAttribute("rotation-per-second"));
+            const orbit = viewer.getCameraOrbit();
+            const theta = orbit.theta + (speed ?? DEFAULT_ROTATION_SPEED) * dt;
+            viewer.cameraOrbit = `${theta}rad ${orbit.phi}rad ${orbit.radius}m`;
+            viewer.jumpCameraToGoal();
+        }
+        if (animating) viewer.currentTime += dt;
+    }
+
+    function applyPolicy() {
+        const state = renderState();
+        if (state !== "running" && !viewer.paused) {
+            animating = true;
+            viewer.pause();
+        }
+        if (state === "running" && model.auto_rotate) viewer.setAttribute("auto-rotate", "");
         else viewer.removeAttribute("auto-rotate");
+        if (state === "running" && animating) {
+            animating = false;
+            viewer.play();
+        }
+
+        clearInterval(ticker);
+        ticker = null;
+        if (state === "throttled") {
+            let last = performance.now();
+            ticker = setInterval(() => {
+                const now = performance.now();
+                tick((now - last) / 1000);
+                last = now;
+            }, 1000 / model.max_fps);
+        }
+        if (model.render_state !== state) model.render_state = state;
+    }
+
+    function onVisibilityChange() {
+        pageHidden = document.visibilityState === "hidden";
+        applyPolicy();
+    }
+
+    const visibilityObserver = new IntersectionObserver((entries) => {
+        inView = entries[entries.length - 1].isIntersecting;
+        applyPolicy();
+    });
+    visibilityObserver.observe(viewer);
+    document.addEventListener("visibilitychange", onVisibilityChange);
+    // Animations started by autoplay once a model has loaded
+    viewer.addEventListener("play", () => {
+        if (renderState() !== "running") applyPolicy();
+    });
+    applyPolicy();
+
+    // Material edits are diffed per material against what was applied, like
+    // style. The original values of edited materials are recorded so that
+    // properties removed from the edits can be restored.
+    let appliedMaterials = {};
+    let originalMaterials = new Map();
+    const textures = new Map();
+    const textureRequests = new Map();
+
+    function setTexture(name, pbr, texture) {
+        textureRequests.set(name, texture);
+        if (typeof texture !== "string") {
+            pbr.baseColorTexture?.setTexture(texture);
+            return;
+        }
+        if (!textures.has(texture)) textures.set(texture, viewer.createTexture(texture));
+        textures.get(texture).then(
+            (created) => {
+                // A later edit of the same material wins
+                if (textureRequests.get(name) === texture) pbr.baseColorTexture?.setTexture(created);
+            },
+            (error) => {
+                textures.delete(texture);
+                console.error(`ModelViewer: loading texture ${texture} failed`, error);
+            }
+        );
+    }
+
+    function applyMaterials() {
+        const scene = viewer.model;
+        if (!srcLoaded || !scene) return;
+        const edits = model.materials ?? {};
+        const names = new Set([...Object.keys(appliedMaterials), ...Object.keys(edits)]);
+        for (const name of names) {
+            const edit = JSON.stringify(edits[name] ?? {});
+            if (JSON.stringify(appliedMaterials[name] ?? {}) === edit) continue;
+            const material = findMaterial(scene, name);
+            if (!material) {
+                console.warn(`ModelViewer: the model has no material ${name}`);
+                continue;
+            }
+            const pbr = material.pbrMetallicRoughness;
+            if (!originalMaterials.has(name)) {
+                const original = {};
+                for (const [key, read] of Object.entries(MATERIAL_PROPERTIES)) original[key] = read(pbr);
+                originalMaterials.set(name, original);
+            }
+            const original = originalMaterials.get(name);
+            const values = { ...original, ...(edits[name] ?? {}) };
+            pbr.setBaseColorFactor(values.base_color);
+            pbr.setMetallicFactor(values.metallic);
+            pbr.setRoughnessFactor(values.roughness);
+            const texture = textureRequests.has(name)
+                ? textureRequests.get(name)
+                : original.base_color_texture;
+            if (values.base_color_texture !== texture) setTexture(name, pbr, values.base_color_texture);
+        }
+        appliedMaterials = JSON.parse(JSON.stringify(edits));
+    }
+
+    // Geometry updates wait for the model to load and are applied together
+    // in the next animation frame
+    let geometryQueue = [];
+    let geometryFrame = null;
+
+    function scheduleGeometry() {
+        if (!srcLoaded || !geometryQueue.length || geometryFrame !== null) return;
+        geometryFrame = requestAnimationFrame(() => {
+            geometryFrame = null;
+            const queue = geometryQueue;
+            geometryQueue = [];
+            for (const msg of queue) applyGeometry(viewer, msg);
+        });
+    }
+
+    // Levels of detail: start with the coarsest level and upgrade once it
+    // has loaded, to the level that matches the rendered size
+    let lodIndex = -1;
+    let srcLoaded = false;
+    // Digest of the local model shown, and the object URL of a payload
+    // received for a handle
+    let loadedDigest = null;
+    let objectUrl = null;
+    let payloadBytes = 0;
+    // Start of the current load and statistics not reported yet
+    let loadStart = performance.now();
+    let pendingStats = {};
+
+    function setSrc(src) {
+        if ((src || null) === viewer.getAttribute("src")) return;
+        srcLoaded = false;
+        loadStart = performance.now();
+        loadedDigest = null;
+        // Streamed geometry belongs to the previous model
+        geometryQueue = [];
+        if (objectUrl && src !== objectUrl) {
+            URL.revokeObjectURL(objectUrl);
+            objectUrl = null;
+        }
+        if (src) viewer.setAttribute("src", src);
+        else viewer.removeAttribute("src");
+    }
+
+    function updateSrc() {
+        const levels = model.lod_sources;
+        lodIndex = -1;
+        if (!levels || !levels.length) {
+            if (model.src?.startsWith(SRC_HANDLE)) {
+                // Keep showing a released model, fetch one this view lacks
+                const digest = model.src.slice(SRC_HANDLE.length);
+                if (digest !== loadedDigest) model.send_msg({ type: "payload", digest });
+                return;
+            }
+            setSrc(model.src);
+            return;
+        }
+        lodIndex = 0;
+        setSrc(levels[0].src);
+        const target = levels[selectLevel(levels, viewer)].src;
+        if (!target.startsWith("data:")) prefetch([target]);
+    }
+
+    function upgradeLevel() {
+        const levels = model.lod_sources;
+        if (lodIndex < 0 || !srcLoaded || !levels || !levels.length) return;
+        const target = selectLevel(levels, viewer);
+        if (target > lodIndex) {
+            lodIndex = target;
+            setSrc(levels[target].src);
+        }
+    }
+
+    updateSrc();
+    viewer.addEventListener('load', () => {
+        srcLoaded = true;
+        loadedDigest = model.source_digest ?? null;
+        // Lets Python release the inlined payload
+        if (loadedDigest && viewer.getAttribute("src")?.startsWith("data:")) {
+            model.send_msg({ type: "loaded", digest: loadedDigest });
+        }
+        // A new model starts from its own materials
+        appliedMaterials = {};
+        originalMaterials = new Map();
+        textureRequests.clear();
+        applyMaterials();
+        const variants = viewer.availableVariants ?? [];
+        if (JSON.stringify(variants) !== JSON.stringify(model.variants)) model.variants = variants;
+        scheduleGeometry();
+        // Levels of detail after the first are upgrades, not loads
+        if (model.collect_stats && lodIndex <= 0) {
+            pendingStats.load_ms = performance.now() - loadStart;
+            const bytes = transferredBytes(viewer.getAttribute("src"));
+            if (bytes !== null) pendingStats.bytes = bytes;
+        }
+        upgradeLevel();
     });
-    model.on('camera_controls', () => {
-        if (model.camera_controls) viewer.setAttribute("camera-controls", "");
-        else viewer.removeAttribute("camera-controls");
+    // Performance statistics with collect_stats: load and poster timings
+    // are reported once, frame times as a histogram per interval
+    let statsFrame = null;
+    let statsTimer = null;
+    const frameHistogram = new FrameHistogram();
+
+    function transferredBytes(src) {
+        if (!src) return null;
+        // Inlined into the document or received over the websocket
+        if (src.startsWith("data:")) return src.length;
+        if (src.startsWith("blob:")) return payloadBytes;
+        // 0 when served from the HTTP cache
+        const entries = performance.getEntriesByName(new URL(src, document.baseURI).href);
+        return entries.length ? entries[entries.length - 1].transferSize : null;
+    }
+
+    function measurePoster() {
+        if (!model.collect_stats || !model.poster) return;
+        const start = performance.now();
+        const image = new Image();
+        image.src = model.poster;
+        image.decode().then(
+            () => { pendingStats.poster_ms = performance.now() - start; },
+            () => {}
+        );
+    }
+
+    function measureFrame(now) {
+        frameHistogram.frame(now);
+        statsFrame = requestAnimationFrame(measureFrame);
+    }
+
+    function sendStats() {
+        const report = { ...pendingStats };
+        pendingStats = {};
+        if (frameHistogram.size) Object.assign(report, frameHistogram.take());
+        if (!Object.keys(report).length) return;
+        model.send_msg({ type: "stats", renderer: gpuRenderer(), ...report });
+    }
+
+    function applyStats() {
+        cancelAnimationFrame(statsFrame);
+        clearInterval(statsTimer);
+        statsFrame = statsTimer = null;
+        frameHistogram.reset();
+        if (!model.collect_stats) return;
+        statsFrame = requestAnimationFrame(measureFrame);
+        statsTimer = setInterval(sendStats, model.stats_interval_ms);
+    }
+
+    applyStats();
+    measurePoster();
+    model.on('collect_stats', applyStats);
+    model.on('stats_interval_ms', applyStats);
+    model.on('poster', measurePoster);
+
+    // Created on the first hotspots message
+    let hotspots = null;
+
+    const resizeObserver = new ResizeObserver(() => {
+        upgradeLevel();
+        hotspots?.schedule();
     });
-    model.on('poster', () => {
-        if (model.poster) viewer.setAttribute("poster", model.poster);
-        else viewer.removeAttribute("poster");
+    resizeObserver.observe(viewer);
+    model.on('remove', () => {
+        resizeObserver.disconnect();
+        visibilityObserver.disconnect();
+        document.removeEventListener("visibilitychange", onVisibilityChange);
+        clearInterval(ticker);
+        clearTimeout(cameraTimer);
+        cancelAnimationFrame(cameraFrame);
+        cancelAnimationFrame(patchFrame);
+        cancelAnimationFrame(geometryFrame);
+        hotspots?.remove();
+        if (objectUrl) URL.revokeObjectURL(objectUrl);
+        if (model.collect_stats) sendStats();
+        cancelAnimationFrame(statsFrame);
+        clearInterval(statsTimer);
     });
-    model.on('style', () => {
-        for (const [key, value] of Object.entries(model.style)) {
-            viewer.style[key] = value;
+
+    // Model <-> View Syncing
+    // Observe changes from Python
+    model.on('src', updateSrc);
+    model.on('lod_sources', updateSrc);
+    model.on('auto_rotate', applyPolicy);
+    model.on('render_policy', applyPolicy);
+    model.on('max_fps', applyPolicy);
+    for (const name of [...Object.keys(ATTRIBUTES), "style", "html_attrs"]) {
+        model.on(name, () => schedulePatch(name));
+    }
+
+    model.on('max_hotspot_labels', () => hotspots?.schedule());
+    model.on('materials', applyMaterials);
+
+    model.on('msg:custom', (msg) => {
+        if (msg.type === 'prefetch') prefetch(msg.urls);
+        else if (msg.type === 'payload') {
+            if (model.src !== SRC_HANDLE + msg.digest || msg.digest === loadedDigest) return;
+            const url = URL.createObjectURL(new Blob([msg.data], { type: msg.mime }));
+            payloadBytes = msg.data.byteLength;
+            setSrc(url);
+            objectUrl = url;
+        }
+        else if (msg.type === 'geometry') {
+            geometryQueue.push(msg);
+            scheduleGeometry();
+        } else if (msg.type === 'hotspots') {
+            if (hotspots === null) {
+                hotspots = createHotspotLayer(viewer, model);
+                el.style.position = "relative";
+                el.appendChild(hotspots.layer);
+            }
+            hotspots.update(msg);
         }
     });
+    // Hotspots and geometry sent before this view was rendered
+    model.send_msg({ type: 'sync' });
 
     // Events back to Python
+
+    // Camera changes by the user are read at most once per animation frame
+    // and camera_sync_hz times per second, and only sent if they moved by
+    // more than CAMERA_EPSILON. A trailing update always follows the last
+    // change, so Python ends up with the final camera position.
+    let cameraFrame = null;
+    let cameraTimer = null;
+    let cameraSent = 0;
+    let cameraLast = null;
+
+    function sendCamera() {
+        const state = cameraState(viewer);
+        if (!cameraChanged(cameraLast, state)) return;
+        cameraLast = state;
+        cameraSent = performance.now();
+        const [theta, phi, radius, x, y, z, fov] = state;
+        const deg = (rad) => formatNumber((rad * 180) / Math.PI);
+        const m = (value) => `${formatNumber(value)}m`;
+        const camera = {
+            camera_orbit: `${deg(theta)}deg ${deg(phi)}deg ${m(radius)}`,
+            camera_target: `${m(x)} ${m(y)} ${m(z)}`,
+            field_of_view: `${deg(fov)}deg`,
+        };
+        for (const [name, value] of Object.entries(camera)) {
+            (synced[name] ??= new Set()).add(value);
+        }
+        model.send_msg({ type: "camera", ...camera });
+    }
+
+    function scheduleCamera() {
+        if (!model.camera_sync_hz || cameraFrame !== null || cameraTimer !== null) return;
+        const wait = cameraSent + 1000 / model.camera_sync_hz - performance.now();
+        if (wait > 0) {
+            cameraTimer = setTimeout(() => {
+                cameraTimer = null;
+                scheduleCamera();
+            }, wait);
+        } else {
+            cameraFrame = requestAnimationFrame(() => {
+                cameraFrame = null;
+                sendCamera();
+            });
+        }
+    }
+
     viewer.addEventListener('camera-change', (event) => {
-        // Example: throttle this if exposing camera state
+        // Ignore changes made by Python, auto-rotation and interpolation
+        if (event.detail.source === 'user-interaction') scheduleCamera();
     });
 
 
     viewer.addEventListener('click', (event) => {
+        // The camera ray through the clicked pixel, for picking on the server
+        const { eye, forward, right, up, focal } = cameraBasis(viewer);
+        const bounds = viewer.getBoundingClientRect();
+        const x = event.clientX - bounds.left - bounds.width / 2;
+        const y = bounds.height / 2 - (event.clientY - bounds.top);
+        const direction = [0, 1, 2].map((i) => focal * forward[i] + x * right[i] + y * up[i]);
+        const length = Math.hypot(...direction);
         model.send_event('click', {
             clientX: event.clientX,
             clientY: event.clientY,
-            target: event.target.tagName
+            target: event.target.tagName,
+            ray: { origin: eye, direction: direction.map((d) => d / length) },
         });
     });
 
+    // Interaction stream: presses, releases and exits are recorded as they
+    // happen, moves at most once per animation frame. Records are sent as
+    // one binary message every interaction_flush_ms or as soon as
+    // interaction_flush_size of them are buffered.
+    const interactions = new InteractionBuffer();
+    let interactionTimer = null;
+    let pendingMove = null;
+    let moveFrame = null;
+
+    function flushInteractions() {
+        clearTimeout(interactionTimer);
+        interactionTimer = null;
+        if (interactions.size) model.send_msg({ type: "interactions", data: interactions.take() });
+    }
+
+    function record(event) {
+        const kind = INTERACTION_KINDS[event.type];
+        const bounds = viewer.getBoundingClientRect();
+        const hit =
+            model.interaction_surface && event.type !== "pointerleave"
+                ? viewer.positionAndNormalFromPoint(event.clientX, event.clientY)
+                : null;
+        interactions.push(
+            performance.timeOrigin + event.timeStamp,
+            kind,
+            event.buttons,
+            (event.clientX - bounds.left) / bounds.width,
+            (event.clientY - bounds.top) / bounds.height,
+            hit?.position
+        );
+        if (interactions.size >= model.interaction_flush_size) flushInteractions();
+        else if (interactionTimer === null) {
+            interactionTimer = setTimeout(flushInteractions, model.interaction_flush_ms);
+        }
+    }
+
+    function recordMove() {
+        cancelAnimationFrame(moveFrame);
+        moveFrame = null;
+        if (pendingMove !== null) record(pendingMove);
+        pendingMove = null;
+    }
+
+    function onPointer(event) {
+        if (!model.stream_interactions || !event.isPrimary) return;
+        if (event.type === "pointermove") {
+            pendingMove = event;
+            if (moveFrame === null) moveFrame = requestAnimationFrame(recordMove);
+            return;
+        }
+        // Keep the order of a move that is still waiting for its frame
+        recordMove();
+        record(event);
+    }
+
+    for (const type of Object.keys(INTERACTION_KINDS)) viewer.addEventListener(type, onPointer);
+    model.on('stream_interactions', () => {
+        if (model.stream_interactions) return;
+        pendingMove = null;
+        recordMove();
+        flushInteractions();
+    });
+    model.on('remove', () => {
+        cancelAnimationFrame(moveFrame);
+        flushInteractions();
+    });
+
     viewer.addEventListener('error', (event) => {
         console.error("ModelViewer error:", event.detail);
     });
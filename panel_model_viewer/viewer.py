@@ -1,20 +1,84 @@
-import base64
+import io
+import mimetypes
+import re
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
+from urllib.parse import urlsplit
 
 import param
-from panel.custom import JSComponent
+from panel.io.document import hold
+from panel.io.state import state
 
+from . import assets
+from .bvh import SpatialIndex, spatial_index
+from .cache import Blob, blob_cache
+from .convert import as_glb, mesh_to_glb, path_mime, sniff_mime
+from .gltf import GLB, GLBError, ModelInfo, image_mime
+from .hotspots import EMPTY, Hotspots
+from .interactions import decode_interactions
+from .lod import LevelOfDetail
+from .memory import session_ledger
+from .pipeline import Stage, run_pipeline
+from .poster import orbit_angles, poster_for
+from .runtime import ModelViewerRuntime
+from .streaming import ATTRIBUTES, GeometryStream, geometry_message
+from .telemetry import frame_percentiles, stats_aggregator, validate_report
 
-class ModelViewer(JSComponent):
+CHUNK_SIZE = 1024**2
+
+# Poster size for viewers without a fixed width and height
+POSTER_SIZE = 512
+
+SOURCE_TYPES = (bytes, Path, io.IOBase)
+
+# src of a released local model, which the browser requests over the
+# websocket when a new view of the viewer needs it
+SRC_HANDLE = "model-viewer-asset:"
+
+_loader = ThreadPoolExecutor(thread_name_prefix="model-viewer-load")
+
+
+def _dispatch(doc, callback) -> None:
+    """
+    Run a callback from the loader thread on the document's event loop.
+    """
+    if doc is None or doc.session_context is None:
+        callback()
+    else:
+        doc.add_next_tick_callback(callback)
+
+
+_HEX_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$")
+
+
+def _base_color(color: str | tuple) -> str | list[float]:
+    """
+    Validate a base color, a CSS color string or a linear RGB(A) tuple.
+    """
+    if isinstance(color, str):
+        if color.startswith("#") and not _HEX_COLOR.match(color):
+            raise ValueError(f"Invalid hex color {color!r}")
+        return color
+    rgba = [float(c) for c in color]
+    if len(rgba) not in (3, 4) or not all(0 <= c <= 1 for c in rgba):
+        raise ValueError(f"base_color must have 3 or 4 components in [0, 1], got {color!r}")
+    return rgba + [1.0] * (4 - len(rgba))
+
+
+class ModelViewer(ModelViewerRuntime):
     """
     A Panel component for displaying 3D models using <model-viewer>.
     """
 
     src = param.ClassSelector(
-        class_=(str, bytes, Path),
+        class_=(str, bytes, Path, io.IOBase),
         doc="""
         Source of the 3D model. Can be a URL (str), a local path (str/Path),
-        or raw bytes.""",
+        raw bytes or a binary file-like object. Local sources may be GLB,
+        STL, OBJ or PLY, the latter are converted to GLB on the server.""",
     )
 
     alt = param.String(default="A 3D model", doc="Alternative text.")
@@ -25,41 +89,801 @@ class ModelViewer(JSComponent):
 
     poster = param.String(default=None, doc="URL or path to poster image.")
 
+    render_policy = param.Selector(
+        default="always",
+        objects=["always", "visible", "on-demand"],
+        doc="""
+        When auto-rotation and animations advance. 'visible' pauses them
+        while the viewer is scrolled out of view, collapsed or in a hidden
+        tab. 'on-demand' only renders in response to interaction and
+        changes.""",
+    )
+
+    max_fps = param.Number(
+        default=None,
+        bounds=(0, None),
+        inclusive_bounds=(False, True),
+        doc="""
+        Cap on the rate at which auto-rotation and animations are advanced.
+        None renders them every frame.""",
+    )
+
+    render_state = param.Selector(
+        default="running",
+        objects=["running", "throttled", "paused"],
+        doc="""
+        Effective rendering state reported by the browser: 'running' every
+        frame, 'throttled' by max_fps or 'paused' by the render_policy.""",
+    )
+
+    camera_target = param.String(
+        default=None, doc="Point the camera orbits around, e.g. '0m 1m 0m'."
+    )
+
+    camera_orbit = param.String(
+        default=None, doc="Camera position as theta, phi and radius, e.g. '0deg 75deg 2m'."
+    )
+
+    field_of_view = param.String(default=None, doc="Vertical field of view, e.g. '30deg'.")
+
+    camera_sync_hz = param.Number(
+        default=10,
+        bounds=(0, None),
+        doc="""
+        Maximum rate at which camera changes made by the user are sent back
+        to camera_orbit, camera_target and field_of_view. 0 disables it.""",
+    )
+
+    auto_camera = param.Boolean(
+        default=False,
+        doc="""
+        Set camera_target and camera_orbit from the bounds of local GLB
+        sources on the server instead of having every client compute them.""",
+    )
+
+    auto_poster = param.Boolean(
+        default=False,
+        doc="""
+        Render a poster image of local GLB sources on the server, from the
+        angles of camera_orbit, so the browser shows the model before it
+        has downloaded and parsed it. Replaces poster.""",
+    )
+
+    max_gpu_bytes = param.Integer(
+        default=None,
+        bounds=(0, None),
+        doc="""
+        Reject local GLB sources whose estimated GPU memory footprint exceeds
+        this many bytes before they are sent to the browser.""",
+    )
+
+    pipeline = param.List(
+        default=[],
+        item_type=Stage,
+        doc="""
+        Stages such as optimize.MeshOptimizer applied to Path/bytes sources
+        before they are served. Results are cached per model and options.
+        Setting ModelViewer.pipeline changes the default for all viewers.""",
+    )
+
+    lod = param.ClassSelector(
+        class_=LevelOfDetail,
+        default=None,
+        doc="""
+        Generate simplified levels of detail for local sources. The browser
+        shows the coarsest level first and upgrades to the level matching
+        the rendered size. Requires transport='http' and is ignored with a
+        warning otherwise, as levels inlined as data URIs would only add
+        to the document.""",
+    )
+
+    lod_sources = param.List(
+        default=[],
+        doc="""
+        Levels of detail of the current source, from coarse to fine, as
+        dicts with src, resolution and triangles.""",
+    )
+
+    model_info = param.ClassSelector(
+        class_=ModelInfo,
+        default=None,
+        doc="Statistics of the current local GLB source, see gltf.ModelInfo.",
+    )
+
+    variant_name = param.String(
+        default=None,
+        doc="Active KHR_materials_variants variant, None for the default materials.",
+    )
+
+    variants = param.List(
+        default=[], doc="Variant names of the loaded model, reported by the browser."
+    )
+
+    materials = param.Dict(
+        default={},
+        doc="""
+        Edits of the model's materials by name, as dicts with base_color,
+        metallic, roughness and base_color_texture, see set_material. They
+        are applied to the loaded model in place; properties and materials
+        removed from the dict revert to their original values.""",
+    )
+
     style = param.Dict(default={}, doc="CSS styles to apply to the component.")
     
     html_attrs = param.Dict(default={}, doc="HTML attributes to apply to the model-viewer tag.")
 
+    pickable = param.Boolean(
+        default=False,
+        doc="""
+        Build a spatial index of local GLB sources and resolve clicks to the
+        mesh, material, triangle and barycentric position that was hit,
+        reported under 'hit' in clicked.""",
+    )
+
+    max_hotspot_labels = param.Integer(
+        default=200,
+        bounds=(0, None),
+        doc="""
+        Maximum number of hotspot labels shown at once, nearest to the
+        camera first. All visible hotspots are drawn as markers.""",
+    )
+
+    stream_interactions = param.Boolean(
+        default=False,
+        doc="""
+        Stream pointer moves, presses, releases and exits over the viewer
+        to interaction_batch, in batches of binary records.""",
+    )
+
+    interaction_flush_ms = param.Integer(
+        default=250,
+        bounds=(16, None),
+        doc="Longest time in milliseconds an interaction is buffered before it is sent.",
+    )
+
+    interaction_flush_size = param.Integer(
+        default=256,
+        bounds=(1, None),
+        doc="Number of buffered interactions that are sent at once without waiting.",
+    )
+
+    interaction_surface = param.Boolean(
+        default=True,
+        doc="""
+        Resolve the model surface point under the pointer for streamed
+        interactions. Costs one raycast in the browser per interaction.""",
+    )
+
+    interaction_batch = param.Array(
+        default=None,
+        doc="""
+        The last batch of streamed interactions, a structured array of
+        interactions.INTERACTION_DTYPE. Watch it to process every batch.""",
+    )
+
+    collect_stats = param.Boolean(
+        default=False,
+        doc="""
+        Measure the time to the poster and to the loaded model, the bytes
+        transferred, the GPU renderer and the page's frame times in the
+        browser and report them to stats and telemetry.stats_aggregator.""",
+    )
+
+    stats_interval_ms = param.Integer(
+        default=10000,
+        bounds=(1000, None),
+        doc="Interval in milliseconds at which the browser reports statistics.",
+    )
+
+    stats = param.Dict(
+        default={},
+        doc="""
+        Latest statistics reported by the browser with collect_stats:
+        load_ms, poster_ms, bytes, renderer, and fps and frame_ms
+        percentiles over the last interval.""",
+    )
+
+    stats_name = param.String(
+        default=None,
+        doc="""
+        Name of the model in aggregated statistics. Defaults to the file
+        name of Path sources, the last URL segment, or the digest.""",
+    )
+
+    transport = param.Selector(
+        default="data_uri",
+        objects=["data_uri", "http"],
+        doc="""
+        How Path/bytes sources reach the browser. 'data_uri' inlines them
+        into the document as base64, 'http' registers them with the
+        content-addressed asset route and sets src to a short URL.
+        Defaults to 'http' when blob_cache has a model store, whose shared
+        copies a data URI would duplicate in every worker.""",
+    )
+
+    release_src = param.Boolean(
+        default=True,
+        doc="""
+        Once the browser has loaded a local model inlined as a data URI,
+        replace src with the handle 'model-viewer-asset:<sha256>' so the
+        document no longer holds the payload. Views rendered later fetch
+        it from the shared cache on demand.""",
+    )
+
+    max_session_bytes = param.Integer(
+        default=None,
+        bounds=(0, None),
+        doc="""
+        Budget for the data URIs held by the viewers of a session. Local
+        models that would exceed it are sent as a handle instead of being
+        inlined. Setting ModelViewer.max_session_bytes applies to all
+        viewers.""",
+    )
+
+    source_digest = param.String(
+        default=None, doc="SHA-256 digest of the current local source, None for URLs."
+    )
+
+    load_async = param.Boolean(
+        default=False,
+        doc="""
+        Read Path and file-like sources in a background thread instead of
+        blocking the event loop. The viewer renders immediately in its
+        loading state and src is filled in once the data is ready.""",
+    )
+
+    bytes_loaded = param.Integer(default=0, doc="Bytes read so far by an asynchronous load.")
+
+    load_error = param.String(default=None, doc="Error message of a failed asynchronous load.")
+
     _esm = Path(__file__).parent / "viewer.js"
 
+    # Included once for all components by ModelViewerRuntime
+    __javascript_modules__ = []
+
+    _property_mapping = {
+        "stats": None,
+        "interaction_batch": None,
+        "lod": None,
+        "model_info": None,
+        "pipeline": None,
+    }
+
     clicked = param.Dict(default={}, doc="Last click event data.")
 
     def _handle_click(self, event):
         """
         Handle click event sent from JS.
         """
-        self.clicked = event.data
+        data = dict(event.data)
+        ray = data.get("ray")
+        index = self.spatial_index() if self.pickable and ray else None
+        if ray and index is not None:
+            (hit,) = index.raycast(ray["origin"], ray["direction"])
+            data["hit"] = hit.to_dict() if hit is not None else None
+        self.clicked = data
+
+    def _handle_msg(self, data):
+        if data.get("type") == "camera":
+            self.param.update(
+                {k: data[k] for k in ("camera_orbit", "camera_target", "field_of_view")}
+            )
+        elif data.get("type") == "sync":
+            # A new view of this viewer needs the full state
+            if len(self._hotspots):
+                self._send_msg(self._hotspots.message())
+            for message in self._geometry.sync_messages():
+                self._send_msg(message)
+        elif data.get("type") == "interactions":
+            self.interaction_batch = decode_interactions(data["data"])
+        elif data.get("type") == "loaded":
+            self._release(data.get("digest"))
+        elif data.get("type") == "payload":
+            self._send_payload(data.get("digest"))
+        elif data.get("type") == "stats":
+            self._record_stats(validate_report(data))
 
     def __init__(self, **params):
-        if 'src' in params and isinstance(params['src'], (bytes, Path)):
-            params['src'] = self._process_blob(params['src'])
-        
+        source = None
+        if isinstance(params.get('src'), SOURCE_TYPES):
+            source = params.pop('src')
+
+        self._load_token = 0
+        self._resolved_src = None
+        self._hotspots = EMPTY
+        self._geometry = GeometryStream()
+        self._blob = None
+        self._source_name = None
+        self._unspill = None
+        if 'transport' not in params and blob_cache.store is not None:
+            params['transport'] = 'http'
         super().__init__(**params)
+        self.param.watch(self._update_src, 'src')
+
+        if source is not None:
+            self._set_source(source)
+
+    @classmethod
+    def from_arrays(
+        cls, vertices, faces, normals=None, colors=None, uvs=None, **params
+    ) -> "ModelViewer":
+        """
+        Create a viewer of a triangle mesh given as NumPy arrays.
+
+        Parameters
+        ----------
+        vertices: array-like
+            Positions of shape (n, 3).
+        faces: array-like
+            Vertex indices of shape (m, 3).
+        normals: array-like, optional
+            Normals of shape (n, 3). Without normals the mesh is shaded flat.
+        colors: array-like, optional
+            RGB or RGBA colors of shape (n, 3) or (n, 4), uint8 or floats in
+            [0, 1].
+        uvs: array-like, optional
+            Texture coordinates of shape (n, 2).
+        **params
+            Further parameters of the viewer.
+        """
+        return cls(src=mesh_to_glb(vertices, faces, normals, colors, uvs), **params)
+
+    def _update_src(self, event):
+        if isinstance(event.new, SOURCE_TYPES):
+            self._set_source(event.new)
+        elif event.new is not self._resolved_src:
+            if self.loading:
+                # An explicit URL supersedes a pending asynchronous load
+                self._load_token += 1
+                self.loading = False
+            # Streamed geometry belongs to the previous model
+            self._geometry.clear()
+            self._blob = None
+            self._source_name = None
+            self._release_spill()
+            session_ledger.record(state.curdoc, self, 0)
+            self.param.update(lod_sources=[], source_digest=None)
+
+    def _process_param_change(self, params):
+        params = super()._process_param_change(params)
+        if isinstance(params.get('src'), SOURCE_TYPES):
+            # Raw sources never reach the frontend, _update_src replaces them
+            del params['src']
+        return params
+
+    def _set_source(self, source):
+        """
+        Route a Path, bytes or file-like source through the same pipeline
+        at construction time and on later assignment.
+        """
+        self._source_name = source.name if isinstance(source, Path) else None
+        if self.load_async and not isinstance(source, bytes):
+            self._load_async(source)
+        else:
+            self._load_token += 1
+            self._apply_blob(self._read_blob(source))
 
     def _process_blob(self, data):
-        # Very basic data URI implementation for bytes/path
-        # In a real app, might want to serve via invalidation handler or similar
-        mime = "model/gltf-binary"  # Default assumption
+        return self._blob_src(self._read_blob(data))
+
+    def _read_blob(self, data, read=None) -> Blob:
         if isinstance(data, Path):
-            data = data.read_bytes()
+            blob = blob_cache.load(data, path_mime(data), read or Path.read_bytes)
+        else:
+            if isinstance(data, io.IOBase):
+                data = read(data) if read else data.read()
+            blob = blob_cache.put(data, sniff_mime(data))
+        blob = run_pipeline(as_glb(blob), self.pipeline, viewer=self)
+        info = self._blob_info(blob)
+        if self.max_gpu_bytes is not None and info and info.gpu_bytes > self.max_gpu_bytes:
+            raise ValueError(
+                f"Model needs an estimated {info.gpu_bytes} bytes of GPU memory, "
+                f"exceeding max_gpu_bytes={self.max_gpu_bytes}."
+            )
+        if self.lod is not None and info is not None and self.transport == "http":
+            # Generate the levels off the event loop when loading asynchronously
+            self.lod.levels(blob)
+        if self.auto_poster and info is not None:
+            self._blob_poster(blob, info)
+        if self.pickable and info is not None:
+            spatial_index(blob)
+        return blob
 
-        b64 = base64.b64encode(data).decode("utf-8")
-        return f"data:{mime};base64,{b64}"
+    def _blob_info(self, blob: Blob) -> ModelInfo | None:
+        def build(blob):
+            try:
+                return GLB(blob.data).info()
+            except (GLBError, KeyError, IndexError):
+                return None
 
-    __javascript__ = ["https://unpkg.com/@google/model-viewer@3.4.0/dist/model-viewer.min.js"]
+        return blob_cache.representation(blob, "info", build)
 
-    @classmethod
-    def _get_resources(cls):
-        # Serve local assets
-        print("_get_resources called")
-        # return {"js": {"model-viewer": "static/model-viewer.min.js"}}
-        return {"js": {"model-viewer": "https://unpkg.com/@google/model-viewer@3.4.0/dist/model-viewer.min.js"}}
+    def _apply_blob(self, blob: Blob, **params):
+        """
+        Point the viewer at a resolved blob, updating the model statistics
+        and, with auto_camera, the camera.
+        """
+        info = self._blob_info(blob)
+        if self.auto_camera and info is not None:
+            params.update(camera_target=info.camera_target(), camera_orbit=info.camera_orbit())
+        params["lod_sources"] = [
+            {"src": self._blob_src(level), "resolution": resolution, "triangles": triangles}
+            for resolution, triangles, level in self._lod_levels(blob, info)
+        ]
+        if self.auto_poster and info is not None:
+            poster = self._blob_poster(blob, info)
+            if poster is not None:
+                params["poster"] = self._blob_src(poster)
+        if info is not None:
+            params["variants"] = info.variants
+        self._geometry.clear()
+        self._blob = blob
+        self._release_spill()
+        self._resolved_src = self._source_src(blob)
+        self.param.update(
+            src=self._resolved_src, source_digest=blob.digest, model_info=info, **params
+        )
+
+    def _lod_levels(self, blob: Blob, info: ModelInfo | None) -> list:
+        if self.lod is None or info is None:
+            return []
+        if self.transport != "http":
+            self.param.warning("Levels of detail require transport='http' and are skipped.")
+            return []
+        return self.lod.levels(blob)
+
+    def _source_src(self, blob: Blob) -> str:
+        """
+        The src of a local model, a data URI only if it fits the session's
+        max_session_bytes, whose ledger is updated.
+        """
+        doc = state.curdoc
+        if self.transport == "data_uri" and self.max_session_bytes is not None:
+            size = len(f"data:{blob.mime};base64,") + 4 * -(-blob.size // 3)
+            if session_ledger.held(doc, exclude=self) + size > self.max_session_bytes:
+                session_ledger.record(doc, self, 0)
+                return SRC_HANDLE + blob.digest
+        src = self._blob_src(blob)
+        session_ledger.record(doc, self, len(src) if src.startswith("data:") else 0)
+        return src
+
+    def _source_blob(self) -> Blob | None:
+        if self._blob is not None or self.source_digest is None:
+            return self._blob
+        return blob_cache.get(self.source_digest)
+
+    def _release(self, digest: str | None):
+        """
+        Replace the data URI of a model the browser has loaded with a
+        handle, unpinning the payload where it can be re-read from disk.
+        """
+        if not self.release_src or digest is None or digest != self.source_digest:
+            return
+        if not self.src.startswith("data:") or self.lod_sources or self._blob is None:
+            return
+        if blob_cache.spill(self._blob):
+            # The cache re-reads it after eviction, until the viewer is gone
+            self._release_spill()
+            self._unspill = weakref.finalize(self, blob_cache.unspill, digest)
+            self._blob = None
+        self._resolved_src = SRC_HANDLE + digest
+        session_ledger.record(state.curdoc, self, 0)
+        self.src = self._resolved_src
+
+    def _release_spill(self):
+        if self._unspill is not None:
+            self._unspill()
+            self._unspill = None
+
+    def _record_stats(self, report: dict):
+        """
+        Add a browser report to the process-wide aggregate and update stats.
+        """
+        if not report:
+            return
+        stats_aggregator.record(self._stats_model(), report)
+        stats = {**self.stats, **report}
+        frames, total = stats.pop("frames", None), stats.pop("frame_total_ms", None)
+        if frames is not None:
+            stats["fps"] = 1000 * sum(frames) / total if total else None
+            stats["frame_ms"] = {
+                f"p{q * 100:g}": value for q, value in frame_percentiles(frames).items()
+            }
+        self.stats = stats
+
+    def _stats_model(self) -> str:
+        if self.stats_name:
+            return self.stats_name
+        if self._source_name:
+            return self._source_name
+        if self.source_digest:
+            return self.source_digest[:12]
+        if not self.src:
+            return "unknown"
+        return urlsplit(self.src).path.rsplit("/", 1)[-1] or self.src
+
+    def _send_payload(self, digest: str | None):
+        # Only the current source, other digests are not this viewer's to share
+        if digest is None or digest != self.source_digest:
+            return
+        blob = self._source_blob()
+        if blob is None:
+            self.param.warning(f"Model {digest} is no longer available.")
+            return
+        self._send_msg(
+            {"type": "payload", "digest": digest, "mime": blob.mime, "data": bytes(blob.data)}
+        )
+
+    def _blob_poster(self, blob: Blob, info: ModelInfo) -> Blob | None:
+        if self.width and self.height:
+            width, height = self.width, self.height
+        else:
+            width = height = self.width or self.height or POSTER_SIZE
+        # The orbit _apply_blob will set, so the poster matches the first frame
+        theta, phi = orbit_angles(info.camera_orbit() if self.auto_camera else self.camera_orbit)
+        try:
+            return poster_for(blob, width, height, theta, phi)
+        except (GLBError, KeyError, IndexError, ValueError) as e:
+            self.param.warning(f"Rendering a poster failed: {e}")
+            return None
+
+    def _blob_src(self, blob: Blob) -> str:
+        return assets.blob_src(blob, self.transport)
+
+    def spatial_index(self) -> SpatialIndex | None:
+        """
+        The spatial index of the current local GLB source, built on first
+        use and cached with the model, for batch ray and distance queries
+        in world coordinates. None for URL sources.
+        """
+        blob = self._source_blob()
+        if blob is None or self._blob_info(blob) is None:
+            return None
+        return spatial_index(blob)
+
+    @property
+    def hotspots(self) -> Hotspots:
+        """
+        The hotspots currently shown, see set_hotspots.
+        """
+        return self._hotspots
+
+    def set_hotspots(self, positions, normals=None, labels=None, ids=None):
+        """
+        Replace the hotspots pinned to the model.
+
+        Only rows that were added, moved or relabeled and the ids that were
+        removed are sent to the browser, as binary arrays, so thousands of
+        hotspots can be updated several times per second. Hotspots are
+        matched by id; without ids, rows are numbered in order.
+
+        Parameters
+        ----------
+        positions: array-like
+            Positions of shape (n, 3) in model coordinates.
+        normals: array-like, optional
+            Surface normals of shape (n, 3). Hotspots whose normal faces
+            away from the camera are hidden.
+        labels: list[str], optional
+            Text shown next to the hotspots.
+        ids: array-like, optional
+            Unique non-negative integer ids of shape (n,).
+        """
+        hotspots = Hotspots.from_arrays(positions, normals, labels, ids)
+        msg = self._hotspots.diff(hotspots)
+        self._hotspots = hotspots
+        if msg is not None:
+            self._send_msg(msg)
+
+    def clear_hotspots(self):
+        self.set_hotspots(EMPTY.positions)
+
+    def update_geometry(
+        self,
+        positions=None,
+        normals=None,
+        colors=None,
+        uvs=None,
+        encoding: str = "auto",
+        primitive: int = 0,
+    ):
+        """
+        Patch vertex attributes of the loaded model in place, without
+        reloading it or resetting the camera.
+
+        Only the vertices that changed since the last update are sent, as
+        binary buffers, unless a full frame is smaller. The vertex count
+        and topology must stay the same; reassign src to change them.
+        Updates are dropped by a browser whose model has a different
+        vertex count, and reassigning src discards them.
+
+        Parameters
+        ----------
+        positions, normals: array-like, optional
+            New values of shape (n, 3).
+        colors: array-like, optional
+            New RGB or RGBA colors of shape (n, 3) or (n, 4) as floats in
+            [0, 1].
+        uvs: array-like, optional
+            New texture coordinates of shape (n, 2).
+        encoding: str
+            'full' sends every value, 'delta' the changed vertices and
+            'quantized' their changes as int16, with an error of at most
+            half the largest change / 32767. 'auto' picks the smaller of
+            'full' and 'delta'. The first update of an attribute is full.
+        primitive: int
+            Index of the mesh primitive in depth-first scene order, 0 for
+            models created with from_arrays.
+        """
+        attributes = {"positions": positions, "normals": normals, "colors": colors, "uvs": uvs}
+        updates = [
+            self._geometry.encode(primitive, ATTRIBUTES[key], values, encoding)
+            for key, values in attributes.items()
+            if values is not None
+        ]
+        updates = [update for update in updates if update is not None]
+        if updates:
+            self._send_msg(geometry_message(primitive, updates))
+
+    def set_material(
+        self,
+        name: str,
+        base_color: str | tuple | None = None,
+        metallic: float | None = None,
+        roughness: float | None = None,
+        base_color_texture: str | Path | bytes | None = None,
+    ):
+        """
+        Edit a material of the loaded model in place, without reloading it.
+
+        The change is recorded in ``materials``, which holds the edits of
+        all materials, and only the changed material is updated in the
+        browser. Properties left as None keep their current edit.
+
+        Parameters
+        ----------
+        name: str
+            Name of the material, or material_<index> for unnamed ones.
+        base_color: str | tuple
+            A CSS color in sRGB, e.g. '#ff0000', or a linear RGB(A) tuple of
+            floats in [0, 1] as in glTF's baseColorFactor.
+        metallic, roughness: float
+            Factors in [0, 1].
+        base_color_texture: str | Path | bytes
+            A PNG, JPEG or WebP image replacing the base color texture, as
+            a URL, a path or raw bytes. Local images are served with the
+            viewer's transport.
+        """
+        info = self.model_info
+        if info is not None and name not in info.materials:
+            raise ValueError(f"Model has no material {name!r}, expected one of {info.materials}")
+        edit = dict(self.materials.get(name, {}))
+        if base_color is not None:
+            edit["base_color"] = _base_color(base_color)
+        for key, value in (("metallic", metallic), ("roughness", roughness)):
+            if value is not None:
+                if not 0 <= value <= 1:
+                    raise ValueError(f"{key} must be between 0 and 1, got {value}")
+                edit[key] = float(value)
+        if base_color_texture is not None:
+            edit["base_color_texture"] = self._texture_src(base_color_texture)
+        self.materials = {**self.materials, name: edit}
+
+    def reset_material(self, name: str | None = None):
+        """
+        Revert the edits of a material, or of all materials if name is None.
+        """
+        if name is None:
+            self.materials = {}
+        elif name in self.materials:
+            self.materials = {k: v for k, v in self.materials.items() if k != name}
+
+    def _texture_src(self, texture: str | Path | bytes) -> str:
+        if isinstance(texture, str):
+            return texture
+        if isinstance(texture, Path):
+            mime = mimetypes.guess_type(texture.name)[0]
+            blob = blob_cache.load(texture, mime or "application/octet-stream")
+        else:
+            blob = blob_cache.put(texture, image_mime(texture) or "application/octet-stream")
+        return self._blob_src(blob)
+
+    @contextmanager
+    def batch_update(self, **params):
+        """
+        Update several parameters and send them to the browser in one
+        message, which applies them in a single animation frame.
+
+        Changes made to any component inside the block are held back and
+        sent along with them.
+
+        >>> with viewer.batch_update(auto_rotate=True, style={"background": "#000"}):
+        ...     viewer.camera_orbit = "45deg 60deg auto"
+        """
+        with hold():
+            self.param.update(**params)
+            yield self
+
+    def prefetch(self, sources):
+        """
+        Warm the caches for models that are likely to be shown next.
+
+        Sources are read into the shared blob cache on the loader thread
+        pool, so a later assignment to src resolves without touching the
+        disk. Remote URLs and, with the http transport, local models are
+        also fetched by the browser ahead of time.
+
+        Parameters
+        ----------
+        sources: list[str | bytes | Path]
+            The upcoming sources, in the order they will be needed.
+        """
+        doc = state.curdoc
+
+        def read_all():
+            return [s if isinstance(s, str) else self._read_blob(s) for s in sources]
+
+        def send(future):
+            if future.exception() is not None:
+                self.param.warning(f"Prefetching models failed: {future.exception()}")
+                return
+            # Data URIs cannot be prefetched, so local models are only
+            # encoded for the http transport, whose asset URLs are cheap
+            urls = [
+                s if isinstance(s, str) else self._blob_src(s)
+                for s in future.result()
+                if isinstance(s, str) or self.transport == "http"
+            ]
+            if urls:
+                self._send_msg({"type": "prefetch", "urls": urls})
+
+        future = _loader.submit(read_all)
+        future.add_done_callback(lambda f: _dispatch(doc, partial(send, f)))
+
+    def _load_async(self, source):
+        """
+        Read a Path or file-like source on the loader thread pool, reporting
+        progress through bytes_loaded. Results of superseded loads are
+        discarded.
+        """
+        self._load_token += 1
+        token, doc = self._load_token, state.curdoc
+        self.param.update(loading=True, bytes_loaded=0, load_error=None)
+
+        def current(callback):
+            if token == self._load_token:
+                callback()
+
+        def dispatch(callback):
+            _dispatch(doc, partial(current, callback))
+
+        future = _loader.submit(self._read_source, source, dispatch)
+        future.add_done_callback(lambda f: dispatch(partial(self._load_done, f)))
+
+    def _read_source(self, source, dispatch) -> Blob:
+        def read(fh) -> bytes:
+            chunks, nbytes = [], 0
+            while chunk := fh.read(CHUNK_SIZE):
+                chunks.append(chunk)
+                nbytes += len(chunk)
+                dispatch(partial(self._progress, nbytes))
+            return b"".join(chunks)
+
+        def read_path(path: Path) -> bytes:
+            with path.open("rb") as fh:
+                return read(fh)
+
+        return self._read_blob(source, read_path if isinstance(source, Path) else read)
+
+    def _progress(self, nbytes: int):
+        # Scheduled callbacks may run out of order, only ever move forward
+        if self.loading and nbytes > self.bytes_loaded:
+            self.bytes_loaded = nbytes
+
+    def _load_done(self, future):
+        try:
+            blob = future.result()
+        except Exception as e:
+            self.param.update(loading=False, load_error=str(e))
+            return
+        self._apply_blob(blob, bytes_loaded=blob.size, loading=False)
@@ -0,0 +1,25 @@
+"""
+Fingerprint and precompress a <model-viewer> runtime into the package.
+
+    python scripts/build_runtime.py path/to/model-viewer.min.js
+
+Writes static/model-viewer.<digest>.min.js with .br and .gz variants and
+removes earlier builds. The variants are committed and ship in the wheel,
+so installs never need brotli; building needs the brotli package from the
+dev dependencies.
+"""
+
+import sys
+from pathlib import Path
+
+from panel_model_viewer.runtime import build
+
+
+def main():
+    target = build(Path(sys.argv[1]))
+    for path in sorted(target.parent.glob(f"{target.name}*")):
+        print(f"{path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+import tempfile
 import urllib.request
 from pathlib import Path
 
+from panel_model_viewer.runtime import build, runtime_file
+
+RUNTIME_URL = "https://unpkg.com/@google/model-viewer@3.4.0/dist/model-viewer.min.js"
+
 
 def download_file(url: str, dest: Path):
     print(f"Downloading {url} to {dest}...")
@@ -13,9 +18,17 @@ def main():
     static_dir = Path("panel_model_viewer/static")
     static_dir.mkdir(parents=True, exist_ok=True)
 
+    # The runtime is fingerprinted and precompressed, see build_runtime.py
+    if runtime_file(static_dir) is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "model-viewer.min.js"
+            download_file(RUNTIME_URL, source)
+            build(source, static_dir)
+    else:
+        print("model-viewer runtime already built. Skipping.")
+
     # Assets to download
     assets = {
-        "model-viewer.min.js": "https://unpkg.com/@google/model-viewer@3.4.0/dist/model-viewer.min.js",
         # Example model (Astronaut)
         "astronaut.glb": "https://modelviewer.dev/shared-assets/models/Astronaut.glb",
     }
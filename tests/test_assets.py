@@ -0,0 +1,67 @@
+import gzip
+import json
+
+from tornado.testing import AsyncHTTPTestCase
+from tornado.web import Application
+
+from panel_model_viewer import assets
+from panel_model_viewer.cache import blob_cache
+
+DATA = b"glTF" + bytes(range(256)) * 64
+
+
+class TestModelAssetHandler(AsyncHTTPTestCase):
+    def get_app(self):
+        self.digest = blob_cache.put(DATA).digest
+        return Application(assets.ROUTES)
+
+    def fetch_asset(self, **headers):
+        return self.fetch(
+            f"/{assets.ASSET_PATH}/{self.digest}.glb", headers=headers, decompress_response=False
+        )
+
+    def test_full_response(self):
+        response = self.fetch_asset()
+        assert response.code == 200
+        assert response.body == DATA
+        assert response.headers["ETag"] == f'"{self.digest}"'
+        assert "immutable" in response.headers["Cache-Control"]
+        assert response.headers["Content-Type"] == "model/gltf-binary"
+
+    def test_not_modified(self):
+        response = self.fetch_asset(**{"If-None-Match": f'"{self.digest}"'})
+        assert response.code == 304
+
+    def test_range(self):
+        response = self.fetch_asset(Range="bytes=4-7")
+        assert response.code == 206
+        assert response.body == DATA[4:8]
+        assert response.headers["Content-Range"] == f"bytes 4-7/{len(DATA)}"
+
+        response = self.fetch_asset(Range=f"bytes={len(DATA)}-")
+        assert response.code == 416
+
+    def test_gzip(self):
+        response = self.fetch_asset(**{"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.body) == DATA
+
+        response = self.fetch_asset(**{"Accept-Encoding": "br, gzip;q=0"})
+        assert "Content-Encoding" not in response.headers
+        assert response.body == DATA
+
+    def test_unknown_digest(self):
+        response = self.fetch(f"/{assets.ASSET_PATH}/{'0' * 64}")
+        assert response.code == 404
+
+    def test_memory_stats(self):
+        response = self.fetch(f"/{assets.ASSET_PATH}/memory")
+        stats = json.loads(response.body)
+        assert response.code == 200
+        assert stats["cache"]["entries"] == len(blob_cache)
+        assert {"bytes", "sessions", "max_session_bytes"} <= stats.keys()
+
+    def test_metrics(self):
+        response = self.fetch(f"/{assets.ASSET_PATH}/metrics")
+        assert response.code == 200
+        assert b"# TYPE model_viewer_load_seconds summary" in response.body
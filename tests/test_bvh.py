@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import numpy as np
+
+from panel_model_viewer import ModelViewer
+from panel_model_viewer.bvh import BVH, closest_point_on_triangle, spatial_index
+from panel_model_viewer.cache import blob_cache
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
+
+
+def random_triangles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    corners = rng.random((n, 3, 3)) * 10
+    return corners[:, :1] + (corners - corners[:, :1]) * 0.2
+
+
+def test_raycast_matches_brute_force():
+    triangles = random_triangles(500)
+    rng = np.random.default_rng(1)
+    origins, directions = rng.random((100, 3)) * 10, rng.normal(size=(100, 3))
+    distance, face, uv = BVH(triangles, leaf_size=4).raycast(origins, directions)
+    assert (face >= 0).any()
+    hit = face >= 0
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    a, b, c = (triangles[face[hit], i] for i in range(3))
+    points = a + (b - a) * uv[hit, :1] + (c - a) * uv[hit, 1:]
+    assert np.allclose(points, origins[hit] + directions[hit] * distance[hit, None])
+    # Every hit is the nearest one along its ray
+    for i in np.flatnonzero(hit)[:10]:
+        ts, _, _ = BVH(triangles[face[i] != np.arange(500)]).raycast(origins[i], directions[i])
+        assert ts[0] >= distance[i]
+
+
+def test_closest_matches_brute_force():
+    triangles = random_triangles(300)
+    points = np.random.default_rng(2).random((40, 3)) * 12 - 1
+    distance, face, closest = BVH(triangles).closest(points)
+    brute = np.array(
+        [
+            np.linalg.norm(closest_point_on_triangle(np.tile(p, (300, 1)), triangles) - p, axis=1)
+            for p in points
+        ]
+    )
+    assert np.allclose(distance, brute.min(axis=1))
+    assert np.allclose(np.linalg.norm(closest - points, axis=1), distance)
+
+
+def test_empty_queries():
+    bvh = BVH(random_triangles(50))
+    for result in (bvh.closest(np.zeros((0, 3))), bvh.raycast(np.zeros((0, 3)), np.zeros((0, 3)))):
+        assert [len(r) for r in result] == [0, 0, 0]
+
+
+def test_spatial_index_counts_towards_the_cache_budget():
+    blob = blob_cache.load(STATIC / "Fox.glb", "model/gltf-binary")
+    index = spatial_index(blob)
+    assert index.nbytes > index.bvh.nbytes > 0
+    assert blob_cache._entries[blob.digest].nbytes >= blob.size + index.nbytes
+
+
+def test_spatial_index_box():
+    index = spatial_index(blob_cache.load(STATIC / "Box.glb", "model/gltf-binary"))
+    (hit, miss) = index.raycast([[0.1, 0.2, 5], [5, 5, 5]], [[0, 0, -1], [0, 0, -1]])
+    assert hit is not None and miss is None
+    assert np.allclose(hit.position, (0.1, 0.2, 0.5)) and np.isclose(hit.distance, 4.5)
+    assert (hit.mesh, hit.material) == (0, 0)
+    assert np.isclose(sum(hit.barycentric), 1)
+    distance, _, _ = index.distance([[0, 0, 2], [0, 0, 0]])
+    assert np.allclose(distance, [1.5, 0.5])
+
+
+def test_click_hit():
+    viewer = ModelViewer(src=STATIC / "Box.glb", pickable=True)
+
+    class Event:
+        data = {
+            "clientX": 0,
+            "clientY": 0,
+            "target": "MODEL-VIEWER",
+            "ray": {"origin": [0, 0, 5], "direction": [0, 0, -1]},
+        }
+
+    viewer._handle_click(Event())
+    assert viewer.clicked["hit"]["position"] == [0, 0, 0.5]
+    assert viewer.clicked["hit"]["mesh"] == 0
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+from panel_model_viewer.cache import BlobCache
+
+
+def test_put_deduplicates():
+    cache = BlobCache()
+    first = cache.put(b"glTF" * 10)
+    second = cache.put(bytearray(b"glTF" * 10))
+    assert first is second
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.nbytes == 40
+
+
+def test_load_skips_unchanged_files(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(b"glTF")
+    cache = BlobCache()
+    blob = cache.load(path)
+    assert cache.load(path) is blob
+
+    path.write_bytes(b"glTF2")
+    assert cache.load(path).data == b"glTF2"
+
+
+def test_lru_eviction():
+    cache = BlobCache(max_bytes=25)
+    a = cache.put(b"a" * 10)
+    b = cache.put(b"b" * 10)
+    cache.get(a.digest)
+    cache.put(b"c" * 10)
+    assert a.digest in cache
+    assert b.digest not in cache
+    assert cache.stats()["evictions"] == 1
+
+    # The data URI pushes the entry over budget, the most recent one is kept
+    cache.data_uri(a)
+    assert list(cache._entries) == [a.digest]
+
+
+def test_evicted_file_is_reloaded(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(b"glTF" * 10)
+    cache = BlobCache(max_bytes=50)
+    digest = cache.load(path).digest
+    cache.put(b"x" * 40)
+    assert digest not in cache
+    reloaded = cache.get(digest)
+    assert reloaded is not None and reloaded.data == b"glTF" * 10
+
+
+def test_spilled_blob_is_reloaded(tmp_path):
+    cache = BlobCache(max_bytes=50)
+    blob = cache.put(b"glTF" * 10, "model/stl")
+    assert cache.spill(blob, tmp_path)
+    cache.put(b"x" * 40)
+    assert blob.digest not in cache
+    reloaded = cache.get(blob.digest)
+    assert reloaded is not None
+    assert (reloaded.data, reloaded.mime) == (blob.data, "model/stl")
+
+
+def test_unspilled_blob_is_deleted(tmp_path):
+    cache = BlobCache(max_bytes=50)
+    blob = cache.put(b"glTF" * 10)
+    assert cache.spill(blob, tmp_path) and cache.spill(blob, tmp_path)
+    path = tmp_path / f"{blob.digest}.{os.getpid()}"
+    cache.unspill(blob.digest)
+    assert path.is_file()
+    cache.unspill(blob.digest)
+    assert not path.exists()
+    assert not cache._paths and not cache._origins
+    cache.put(b"x" * 40)
+    assert cache.get(blob.digest) is None
+
+
+def test_spills_of_dead_processes_are_deleted(tmp_path):
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    stale = tmp_path / f"{'0' * 64}.{process.pid}"
+    stale.write_bytes(b"glTF")
+    assert BlobCache().spill(BlobCache().put(b"glTF"), tmp_path)
+    assert not stale.exists()
@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from panel_model_viewer import ModelViewer
+from panel_model_viewer import convert as convert_module
+from panel_model_viewer.convert import (
+    GLB_MIME,
+    OBJ_MIME,
+    PLY_MIME,
+    STL_MIME,
+    ConversionError,
+    mesh_to_glb,
+    read_mesh,
+    sniff_mime,
+)
+from panel_model_viewer.gltf import GLB, scene_geometry
+
+# A unit square in the z=0 plane as two triangles
+SQUARE = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=np.float32)
+SQUARE_FACES = np.array([[0, 1, 2], [0, 2, 3]])
+
+
+def binary_stl(vertices, faces):
+    record: np.dtype = np.dtype(
+        [("normal", "<f4", 3), ("corners", "<f4", (3, 3)), ("attr", "<u2")]
+    )
+    table = np.zeros(len(faces), dtype=record)
+    table["corners"] = vertices[faces]
+    # Binary STL headers are free-form and may start like ASCII files
+    return b"solid binary".ljust(80) + len(faces).to_bytes(4, "little") + table.tobytes()
+
+
+def ascii_stl(vertices, faces):
+    facets = "".join(
+        "facet normal 0 0 1\nouter loop\n"
+        + "".join(f"vertex {x} {y} {z}\n" for x, y, z in vertices[face])
+        + "endloop\nendfacet\n"
+        for face in faces
+    )
+    return f"solid square\n{facets}endsolid square\n".encode()
+
+
+def test_mesh_to_glb():
+    colors = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255], [255, 255, 255]], dtype=np.uint8)
+    glb = GLB(mesh_to_glb(SQUARE, SQUARE_FACES, colors=colors, uvs=SQUARE[:, :2]))
+    geometry = scene_geometry(glb)
+    np.testing.assert_array_equal(geometry.positions, SQUARE)
+    np.testing.assert_array_equal(geometry.faces, SQUARE_FACES)
+    np.testing.assert_allclose(geometry.colors[:, :3], colors / 255)
+    assert glb.info().triangle_count == 2
+    with pytest.raises(ConversionError, match="outside"):
+        mesh_to_glb(SQUARE, [[0, 1, 4]])
+    with pytest.raises(ConversionError, match="colors"):
+        mesh_to_glb(SQUARE, SQUARE_FACES, colors=colors[:2])
+
+
+@pytest.mark.parametrize("write", [binary_stl, ascii_stl])
+def test_read_stl(write):
+    data = write(SQUARE, SQUARE_FACES)
+    assert sniff_mime(data) == STL_MIME
+    mesh = read_mesh(data)
+    # Shared corners are welded
+    assert len(mesh.vertices) == 4
+    np.testing.assert_array_equal(mesh.vertices[mesh.faces], SQUARE[SQUARE_FACES])
+
+
+def test_read_obj():
+    data = b"""# a quad with uvs and normals, indexed relative
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+vt 0 0
+vt 1 1
+vn 0 0 1
+f -4/1/1 -3/1/1 -2/2/1 -1/2/1
+"""
+    assert sniff_mime(data, "model.obj") == OBJ_MIME
+    mesh = read_mesh(data)
+    assert mesh.faces.shape == (2, 3)
+    np.testing.assert_array_equal(mesh.vertices[mesh.faces], SQUARE[SQUARE_FACES])
+    np.testing.assert_array_equal(mesh.normals, np.tile([0, 0, 1], (4, 1)))
+    # v points down in glTF
+    assert mesh.uvs is not None
+    np.testing.assert_array_equal(np.unique(mesh.uvs[:, 1]), [0, 1])
+    np.testing.assert_array_equal(mesh.uvs[mesh.faces[0, 0]], [0, 1])
+    with pytest.raises(ConversionError, match="missing vertex"):
+        read_mesh(b"v 0 0 0\nf 1 2 3\n")
+
+
+def test_read_ply():
+    header = "ply\nformat {}\nelement vertex 4\nproperty float x\nproperty float y\n"
+    header += "property float z\nproperty uchar red\nproperty uchar green\nproperty uchar blue\n"
+    header += "element face 2\nproperty list uchar int vertex_indices\nend_header\n"
+    colors = np.arange(12, dtype=np.uint8).reshape(4, 3)
+    ascii = header.format("ascii 1.0") + "".join(
+        f"{x} {y} {z} {r} {g} {b}\n" for (x, y, z), (r, g, b) in zip(SQUARE, colors, strict=True)
+    )
+    # A quad and a triangle, lists of different lengths
+    ascii += "4 0 1 2 3\n3 0 2 3\n"
+    vertex: np.dtype = np.dtype([("p", "<f4", 3), ("c", "u1", 3)])
+    table = np.zeros(4, dtype=vertex)
+    table["p"], table["c"] = SQUARE, colors
+    binary = header.format("binary_little_endian 1.0").encode() + table.tobytes()
+    binary += bytes([4]) + np.arange(4, dtype="<i4").tobytes()
+    binary += bytes([3]) + np.array([0, 2, 3], dtype="<i4").tobytes()
+    for data in (ascii.encode(), binary):
+        assert sniff_mime(data) == PLY_MIME
+        mesh = read_mesh(data)
+        np.testing.assert_array_equal(mesh.vertices, SQUARE)
+        np.testing.assert_array_equal(mesh.colors, colors)
+        np.testing.assert_array_equal(mesh.faces, [[0, 1, 2], [0, 2, 3], [0, 2, 3]])
+
+
+@pytest.mark.parametrize("chunk", [7, 64, 1 << 16])
+def test_read_ply_mixed_polygons(monkeypatch, chunk):
+    # Lists of different lengths that cross the boundaries of small chunks
+    monkeypatch.setattr(convert_module, "PLY_LIST_CHUNK", chunk)
+    rng = np.random.default_rng(0)
+    vertices = rng.random((50, 3)).astype(np.float32)
+    polygons = [rng.integers(0, 50, n) for n in rng.integers(3, 7, 300)]
+    header = "ply\nformat binary_big_endian 1.0\nelement vertex 50\nproperty float x\n"
+    header += "property float y\nproperty float z\nelement face 300\n"
+    header += "property list ushort int vertex_indices\nend_header\n"
+    data = header.encode() + vertices.astype(">f4").tobytes() + b"".join(
+        np.array([len(p)], ">u2").tobytes() + p.astype(">i4").tobytes() for p in polygons
+    )
+    mesh = read_mesh(data)
+    fans = [[p[0], p[i], p[i + 1]] for p in polygons for i in range(1, len(p) - 1)]
+    np.testing.assert_array_equal(mesh.faces, fans)
+    with pytest.raises(ConversionError, match="truncated"):
+        read_mesh(data[:-1])
+
+
+def test_viewer_converts_sources(tmp_path):
+    path = tmp_path / "square.stl"
+    path.write_bytes(binary_stl(SQUARE, SQUARE_FACES))
+    viewer = ModelViewer(src=path)
+    assert viewer.src.startswith(f"data:{GLB_MIME};base64,")
+    assert viewer.model_info is not None and viewer.model_info.triangle_count == 2
+
+    viewer = ModelViewer.from_arrays(SQUARE, SQUARE_FACES, alt="Square")
+    assert viewer.model_info is not None and viewer.model_info.vertex_count == 4
+    assert viewer.alt == "Square"
@@ -0,0 +1,74 @@
+import time
+from pathlib import Path
+
+from panel_model_viewer.gallery import ModelGallery
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 10
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_gallery_pages():
+    objects = [STATIC / "Box.glb", "https://example.com/a.glb", STATIC / "Box.glb"]
+    gallery = ModelGallery(objects=objects, page_size=2, item_width=32, item_height=32)
+    wait_for(lambda: len(gallery.items) == 2)
+    box, url = gallery.items
+    assert box["src"].endswith(".glb") and box["poster"].endswith(".webp")
+    assert box["alt"] == "Box.glb"
+    assert url == {
+        "src": "https://example.com/a.glb",
+        "poster": None,
+        "alt": "Model 2",
+        "error": None,
+    }
+
+    gallery._handle_msg({"type": "page"})
+    wait_for(lambda: len(gallery.items) == 3)
+    gallery._handle_msg({"type": "page"})
+    assert len(gallery.items) == 3
+    properties = gallery.get_root().data.properties()  # ty: ignore[unresolved-attribute]
+    assert not {"objects", "items"} & properties
+
+
+def test_gallery_sends_pages_once(monkeypatch):
+    gallery = ModelGallery(objects=["a.glb", "b.glb", "c.glb"], page_size=2, auto_poster=False)
+    wait_for(lambda: len(gallery.items) == 2)
+    sent = []
+    monkeypatch.setattr(gallery, "_send_msg", sent.append)
+    gallery._handle_msg({"type": "page"})
+    wait_for(lambda: len(sent) == 1)
+    (page,) = sent
+    assert (page["type"], page["start"]) == ("items", 2)
+    assert [i["src"] for i in page["items"]] == ["c.glb"]
+    # A new view receives every item resolved so far
+    gallery._handle_msg({"type": "sync"})
+    assert sent[-1] == {"type": "items", "start": 0, "items": gallery.items}
+    gallery.objects = ["d.glb"]
+    wait_for(lambda: len(sent) == 4)
+    assert sent[2] == {"type": "reset"}
+    assert (sent[3]["start"], [i["src"] for i in sent[3]["items"]]) == (0, ["d.glb"])
+
+
+def test_gallery_reset_and_select():
+    gallery = ModelGallery(objects=["a.glb", "b.glb"], auto_poster=False)
+    wait_for(lambda: len(gallery.items) == 2)
+    gallery.objects = ["c.glb"]
+    wait_for(lambda: [i["src"] for i in gallery.items] == ["c.glb"])
+    gallery._handle_msg({"type": "select", "index": 0})
+    assert gallery.selected == 0
+
+
+def test_gallery_failed_items_are_placeholders(tmp_path):
+    objects = [STATIC / "Box.glb", tmp_path / "missing.glb", STATIC / "Fox.glb"]
+    gallery = ModelGallery(objects=objects, auto_poster=False)
+    wait_for(lambda: len(gallery.items) == 3)
+    box, missing, fox = gallery.items
+    assert box["src"].endswith(".glb") and fox["src"].endswith(".glb")
+    assert box["error"] is None and fox["error"] is None
+    assert (missing["src"], missing["alt"]) == (None, "missing.glb")
+    assert "missing.glb" in missing["error"]
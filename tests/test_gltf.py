@@ -0,0 +1,61 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from panel_model_viewer.gltf import GLB, GLBError, image_size, inspect
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
+
+
+def test_accessors_are_zero_copy_views():
+    with GLB.open(STATIC / "Box.glb") as glb:
+        prim = glb.json["meshes"][0]["primitives"][0]
+        positions = glb.accessor(prim["attributes"]["POSITION"])
+        indices = glb.accessor(prim["indices"])
+        assert positions.shape == (24, 3)
+        assert positions.dtype == np.float32
+        assert not positions.flags.owndata
+        assert not positions.flags.writeable
+        assert indices.shape == (36,)
+        assert indices.max() < len(positions)
+        del positions, indices
+
+
+def test_box_info():
+    info = inspect(STATIC / "Box.glb")
+    assert info.vertex_count == 24
+    assert info.triangle_count == 12
+    assert info.bounds_min == (-0.5, -0.5, -0.5)
+    assert info.bounds_max == (0.5, 0.5, 0.5)
+    assert info.camera_target() == "0m 0m 0m"
+    assert (info.materials, info.variants) == (["Red"], [])
+
+
+def test_fox_info():
+    info = inspect((STATIC / "Fox.glb").read_bytes())
+    assert info.animations == ["Survey", "Walk", "Run"]
+    assert [(t.width, t.height) for t in info.textures] == [(1024, 1024)]
+    assert info.gpu_bytes > info.texture_bytes > 1024 * 1024 * 4
+
+
+def test_invalid_data():
+    with pytest.raises(GLBError):
+        GLB(b"not a glb file at all")
+
+
+def _glb(text: bytes) -> bytes:
+    text += b" " * (-len(text) % 4)
+    return struct.pack("<4sII2I", b"glTF", 2, 20 + len(text), len(text), 0x4E4F534A) + text
+
+
+@pytest.mark.parametrize("text", [b"{not json", b"[1, 2, 3]", b"\xff\xfe"])
+def test_invalid_json_chunk(text):
+    with pytest.raises(GLBError, match="JSON chunk"):
+        GLB(_glb(text))
+
+
+def test_image_size():
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + (640).to_bytes(4) + (480).to_bytes(4)
+    assert image_size(png) == (640, 480)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from panel_model_viewer import ModelViewer
+from panel_model_viewer.hotspots import EMPTY, Hotspots
+
+
+def test_diff():
+    positions = np.arange(30, dtype=np.float32).reshape(10, 3)
+    old = Hotspots.from_arrays(positions, labels=[f"s{i}" for i in range(10)])
+    moved = positions.copy()
+    moved[3] += 1
+    labels = [f"s{i}" for i in range(10)]
+    labels[4] = "renamed"
+    new = Hotspots.from_arrays(moved[2:], labels=labels[2:], ids=np.arange(2, 10))
+
+    msg = old.diff(new)
+    assert msg is not None
+    assert msg["remove"].tolist() == [0, 1]
+    assert msg["ids"].tolist() == [3]
+    assert msg["positions"].tolist() == (moved[3]).tolist()
+    assert (msg["label_ids"].tolist(), msg["labels"]) == ([4], ["renamed"])
+    assert new.diff(new) is None
+    added = EMPTY.diff(new)
+    assert added is not None and len(added["ids"]) == 8
+
+
+def test_validation():
+    with pytest.raises(ValueError, match="unique"):
+        Hotspots.from_arrays(np.zeros((2, 3)), ids=[1, 1])
+    with pytest.raises(ValueError, match="same length"):
+        Hotspots.from_arrays(np.zeros((2, 3)), labels=["a"])
+
+
+def test_viewer_hotspots(monkeypatch):
+    viewer = ModelViewer()
+    sent = []
+    monkeypatch.setattr(viewer, "_send_msg", sent.append)
+    viewer.set_hotspots(np.zeros((3, 3)), labels=["a", "b", "c"])
+    viewer.set_hotspots(np.zeros((3, 3)), labels=["a", "b", "c"])
+    viewer._handle_msg({"type": "sync"})
+    viewer.clear_hotspots()
+    assert [(m["reset"], len(m["ids"]), len(m["remove"])) for m in sent] == [
+        (False, 3, 0),
+        (True, 3, 0),
+        (False, 0, 3),
+    ]
+    assert len(viewer.hotspots) == 0
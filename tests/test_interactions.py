@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from panel_model_viewer import ModelViewer
+from panel_model_viewer.interactions import (
+    DOWN,
+    INTERACTION_DTYPE,
+    LEAVE,
+    MOVE,
+    UP,
+    decode_interactions,
+    drag_paths,
+)
+
+
+def make_batch(kinds, buttons):
+    batch = np.zeros(len(kinds), dtype=INTERACTION_DTYPE)
+    batch["time"] = 1.7e12 + np.arange(len(kinds)) * 16
+    batch["kind"], batch["buttons"] = kinds, buttons
+    batch["position"] = np.nan
+    return batch
+
+
+def test_record_layout():
+    # Must match INTERACTION_RECORD and the offsets written by viewer.js
+    assert INTERACTION_DTYPE.itemsize == 30
+    fields = INTERACTION_DTYPE.fields or {}
+    assert [field[1] for field in fields.values()] == [
+        0, 8, 9, 10, 14, 18
+    ]
+    with pytest.raises(ValueError, match="record size"):
+        decode_interactions(b"\0" * 31)
+
+
+def test_drag_paths():
+    batch = make_batch(
+        [MOVE, DOWN, MOVE, MOVE, UP, MOVE, DOWN, MOVE, LEAVE, MOVE],
+        [0, 1, 1, 1, 0, 0, 1, 1, 0, 1],
+    )
+    assert [path["time"].tolist() for path in drag_paths(batch)] == [
+        batch["time"][2:4].tolist(),
+        batch["time"][7:8].tolist(),
+        batch["time"][9:].tolist(),
+    ]
+    assert drag_paths(batch[:0]) == []
+
+
+def test_viewer_interaction_batches():
+    viewer = ModelViewer(stream_interactions=True)
+    assert "interaction_batch" not in viewer.get_root().data.properties()  # ty: ignore[unresolved-attribute]
+    batches = []
+    viewer.param.watch(lambda event: batches.append(event.new), "interaction_batch")
+    sent = make_batch([MOVE, DOWN, UP], [0, 1, 0])
+    viewer._handle_msg({"type": "interactions", "data": sent.tobytes()})
+    viewer._handle_msg({"type": "interactions", "data": sent[:1].tobytes()})
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert batches[0].dtype == INTERACTION_DTYPE
+    assert batches[0]["kind"].tolist() == [MOVE, DOWN, UP]
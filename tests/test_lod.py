@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import numpy as np
+
+from panel_model_viewer import lod as lod_module
+from panel_model_viewer.cache import blob_cache
+from panel_model_viewer.gltf import GLB, Primitive
+from panel_model_viewer.lod import LevelOfDetail, cluster_vertices, decimate
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
+
+
+def test_decimate_reduces_triangles():
+    data = (STATIC / "astronaut.glb").read_bytes()
+    before = GLB(data).info()
+    coarse, fine = GLB(decimate(data, 16)).info(), GLB(decimate(data, 64)).info()
+    assert coarse.triangle_count < fine.triangle_count < before.triangle_count
+    assert fine.bounds_max is not None and before.bounds_max is not None
+    np.testing.assert_allclose(fine.bounds_max, before.bounds_max, atol=0.05)
+
+
+def test_cluster_non_indexed_primitive():
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0.01, 0, 0], [1, 1, 0], [0, 1, 0]])
+    prim = Primitive({"POSITION": positions.astype(np.float32)}, {}, None)
+    clustered = cluster_vertices(prim, np.zeros(3), 0.5)
+    assert clustered.vertex_count == 4
+    assert clustered.indices is not None and len(clustered.indices) == 6
+
+
+def test_decimate_keeps_animations():
+    data = (STATIC / "Fox.glb").read_bytes()
+    assert GLB(decimate(data, 8)).info().animations == ["Survey", "Walk", "Run"]
+
+
+def test_levels_are_parsed_once(tmp_path, monkeypatch):
+    lod = LevelOfDetail(resolutions=[4, 16], cache_dir=str(tmp_path))
+    blob = blob_cache.load(STATIC / "Fox.glb", "model/gltf-binary")
+    levels = lod.levels(blob)
+    assert [resolution for resolution, _, _ in levels][-1] is None
+    monkeypatch.setattr(lod_module, "GLB", None)
+    assert lod.levels(blob) == levels
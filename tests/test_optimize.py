@@ -0,0 +1,70 @@
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from panel_model_viewer.gltf import GLB, Primitive
+from panel_model_viewer.optimize import MeshOptimizer, optimize, reorder_for_cache
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
+
+
+def test_optimize_preserves_geometry():
+    data = (STATIC / "Box.glb").read_bytes()
+    before, after = GLB(data).info(), GLB(optimize(data)).info()
+    assert after.triangle_count == before.triangle_count
+    assert after.bounds_min is not None and before.bounds_min is not None
+    assert after.bounds_max is not None and before.bounds_max is not None
+    np.testing.assert_allclose(after.bounds_min, before.bounds_min, atol=1e-4)
+    np.testing.assert_allclose(after.bounds_max, before.bounds_max, atol=1e-4)
+    assert after.geometry_bytes < before.geometry_bytes
+
+
+def test_quantized_positions_roundtrip():
+    data = (STATIC / "Box.glb").read_bytes()
+    glb = GLB(optimize(data))
+    assert "KHR_mesh_quantization" in glb.json["extensionsRequired"]
+    (_, mesh, world), = glb.mesh_instances()
+    prim = glb.json["meshes"][mesh]["primitives"][0]
+    positions = glb.float_accessor(prim["attributes"]["POSITION"])
+    world_positions = positions @ world[:3, :3].T + world[:3, 3]
+    np.testing.assert_allclose(np.abs(world_positions), 0.5, atol=1e-4)
+
+
+def test_weld_skinned_model():
+    data = (STATIC / "Fox.glb").read_bytes()
+    before, after = GLB(data).info(), GLB(optimize(data)).info()
+    assert after.vertex_count < before.vertex_count
+    assert after.triangle_count == before.triangle_count
+    assert after.animations == before.animations
+
+
+def test_reorder_non_indexed_primitive():
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [5, 5, 5], [6, 5, 5], [5, 6, 5]])
+    prim = Primitive({"POSITION": positions.astype(np.float32)}, {}, None)
+    reordered = reorder_for_cache(prim)
+    assert reordered.indices is not None
+    corners = reordered.attributes["POSITION"][reordered.indices].reshape(-1, 3, 3)
+    assert sorted(map(tuple, corners.sum(axis=1))) == [(1, 1, 0), (16, 16, 15)]
+
+
+def test_stage_cache_key():
+    assert MeshOptimizer().cache_key == "MeshOptimizer(quantize=True,reorder=True,weld=True)"
+
+
+def test_optimize_without_nodes():
+    glb = GLB((STATIC / "Box.glb").read_bytes())
+    document = {k: v for k, v in glb.json.items() if k not in ("nodes", "scenes", "scene")}
+    text = json.dumps(document).encode()
+    text += b" " * (-len(text) % 4)
+    assert glb.bin is not None
+    binary = bytes(glb.bin)
+    data = b"".join([
+        struct.pack("<4sII", b"glTF", 2, 28 + len(text) + len(binary)),
+        struct.pack("<II", len(text), 0x4E4F534A), text,
+        struct.pack("<II", len(binary), 0x004E4942), binary,
+    ])
+    optimized = GLB(optimize(data))
+    assert "nodes" not in optimized.json
+    assert len(optimized.json["meshes"]) == len(document["meshes"])
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import numpy as np
+
+from panel_model_viewer.cache import BlobCache
+from panel_model_viewer.gltf import GLB, scene_geometry
+from panel_model_viewer.poster import orbit_angles, poster_for, rasterize, render_poster
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
+
+
+def test_scene_geometry():
+    geometry = scene_geometry(GLB((STATIC / "Box.glb").read_bytes()))
+    assert geometry.faces.shape == (12, 3)
+    assert geometry.triangles.shape == (12, 3, 3)
+    assert np.allclose(geometry.positions.min(axis=0), -0.5)
+    assert geometry.normals is not None
+    assert set(geometry.face_material) == {0}
+
+
+def test_rasterize_depth():
+    screen = np.array(
+        [[0, 0, 1], [16, 0, 1], [0, 16, 1], [0, 0, 0], [8, 0, 0], [8, 8, 0]], dtype=float
+    )
+    face, bary = rasterize(screen, np.array([[0, 1, 2], [3, 5, 4]]), 8, 8)
+    # The second triangle is closer where the two overlap
+    assert face[0, 7] == 1 and face[7, 0] == 0 and face[1, 1] == 1
+    assert (face >= 0).all()
+    assert ((bary >= 0) & (bary <= 1)).all()
+
+
+def test_render_poster():
+    image = render_poster((STATIC / "Box.glb").read_bytes(), 64, 48)
+    assert image.size == (64, 48) and image.mode == "RGBA"
+    pixels = np.asarray(image)
+    assert pixels[0, 0, 3] == 0
+    # The box is red and centered
+    r, g, b, a = pixels[24, 32]
+    assert a == 255 and r > 100 and g < 10 and b < 10
+
+
+def test_poster_for_is_cached():
+    cache = BlobCache()
+    blob = cache.load(STATIC / "Box.glb", "model/gltf-binary")
+    poster = poster_for(blob, 32, 32, cache=cache)
+    assert poster.mime == "image/webp" and poster.data[8:12] == b"WEBP"
+    assert poster_for(blob, 32, 32, cache=cache) is poster
+    assert poster_for(blob, 32, 32, theta=45, cache=cache) is not poster
+
+
+def test_orbit_angles():
+    assert orbit_angles("45deg 60deg 2m") == (45, 60)
+    assert np.allclose(orbit_angles("0rad 1.5708rad auto"), (0, 90), atol=1e-3)
+    assert orbit_angles("auto auto 2m") == (0, 75)
+    assert orbit_angles(None) == (0, 75)
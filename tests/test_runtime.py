@@ -0,0 +1,66 @@
+import gzip
+from pathlib import Path
+
+import brotli
+from tornado.testing import AsyncHTTPTestCase
+from tornado.web import Application
+
+from panel_model_viewer import ModelGallery, ModelViewer, runtime
+
+
+def built_runtime() -> Path:
+    path = runtime.runtime_file()
+    assert path is not None
+    return path
+
+
+def test_build(tmp_path):
+    source = tmp_path / "source.js"
+    source.write_bytes(b"customElements.define('model-viewer', class {});" * 100)
+    (tmp_path / "model-viewer.0123456789abcdef.min.js").write_bytes(b"stale")
+    target = runtime.build(source, tmp_path)
+    assert target.name == f"model-viewer.{runtime.fingerprint(source.read_bytes())}.min.js"
+    assert runtime.runtime_file(tmp_path) == target
+    compressed = target.with_name(target.name + ".gz").read_bytes()
+    assert gzip.decompress(compressed) == target.read_bytes()
+    compressed = target.with_name(target.name + ".br").read_bytes()
+    assert brotli.decompress(compressed) == target.read_bytes()
+
+
+def test_packaged_runtime_is_precompressed():
+    path = built_runtime()
+    data = path.read_bytes()
+    assert gzip.decompress(path.with_name(path.name + ".gz").read_bytes()) == data
+    assert brotli.decompress(path.with_name(path.name + ".br").read_bytes()) == data
+
+
+def test_included_once():
+    assert ModelViewer.__javascript_modules__ == ModelGallery.__javascript_modules__ == []
+    assert runtime.ModelViewerRuntime.__javascript_modules__ == [
+        f"static/{built_runtime().name}"
+    ]
+
+
+class TestRuntimeHandler(AsyncHTTPTestCase):
+    def get_app(self):
+        return Application(runtime.ROUTES)
+
+    def fetch_runtime(self, name=None, **headers):
+        # The URL Panel gives the module listed on ModelViewerRuntime
+        path = "/components/panel_model_viewer.runtime/ModelViewerRuntime/__javascript_modules__"
+        name = name or built_runtime().name
+        return self.fetch(f"{path}/static/{name}", headers=headers, decompress_response=False)
+
+    def test_precompressed(self):
+        data = built_runtime().read_bytes()
+        response = self.fetch_runtime(**{"Accept-Encoding": "gzip, deflate"})
+        assert response.code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert gzip.decompress(response.body) == data
+        assert self.fetch_runtime().body == data
+        refused = self.fetch_runtime(**{"Accept-Encoding": "br;q=0, gzip;q=0"})
+        assert "Content-Encoding" not in refused.headers and refused.body == data
+
+    def test_unknown_runtime(self):
+        assert self.fetch_runtime("model-viewer.0123456789abcdef.min.js").code == 404
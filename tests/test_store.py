@@ -0,0 +1,70 @@
+import gc
+import subprocess
+import sys
+
+from panel_model_viewer.cache import BlobCache
+from panel_model_viewer.store import ModelStore
+
+
+def test_glb_files_are_mapped_from_the_store(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(b"glTF" * 10)
+    store = ModelStore(tmp_path / "store")
+    blob = BlobCache(store=store).load(path)
+    assert isinstance(blob.data, memoryview)
+    assert blob.data == b"glTF" * 10
+    assert store.references(blob.digest) == 1
+
+    # Another cache, as in another worker, maps it without reading the file
+    reads = []
+    other = BlobCache(store=store).load(path, read=lambda p: reads.append(p) or p.read_bytes())
+    assert other.digest == blob.digest and not reads
+
+
+def test_mapped_models_are_derived_from_bytes(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(b"glTF" * 10)
+    cache = BlobCache(store=ModelStore(tmp_path / "store"))
+    blob = cache.load(path)
+    derived = cache.derive(blob, "suffix", lambda data: data + b"!")
+    assert derived.data == b"glTF" * 10 + b"!"
+
+
+def test_non_glb_files_are_read(tmp_path):
+    path = tmp_path / "model.stl"
+    path.write_bytes(b"solid x\nendsolid x\n")
+    store = ModelStore(tmp_path / "store")
+    blob = BlobCache(store=store).load(path, "model/stl")
+    assert isinstance(blob.data, bytes)
+    assert store.stats()["models"] == 0
+
+
+def test_released_models_are_deleted(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(b"glTF" * 10)
+    store = ModelStore(tmp_path / "store")
+    cache = BlobCache(store=store)
+    digest = cache.load(path).digest
+    assert store.stats() == {"models": 1, "bytes": 40, "mapped": 1}
+
+    cache.clear()
+    gc.collect()
+    assert store.stats() == {"models": 0, "bytes": 0, "mapped": 0}
+    # Loading again stores it again
+    assert cache.load(path).digest == digest
+
+
+def test_references_of_dead_processes_are_ignored(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(b"glTF" * 10)
+    store = ModelStore(tmp_path / "store")
+    digest = store.add(path)
+    code = (
+        "import sys; from panel_model_viewer.store import ModelStore; "
+        f"ModelStore(sys.argv[1]).open({digest!r})"
+    )
+    subprocess.run([sys.executable, "-c", code, str(store.directory)], check=True)
+    assert list(store._refs.iterdir())
+    assert store.references(digest) == 0
+    assert store.collect() == 1
+    assert store.lookup(path) is None
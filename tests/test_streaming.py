@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from panel_model_viewer import ModelViewer
+from panel_model_viewer.streaming import GeometryStream
+
+
+def apply(frame, update):
+    """
+    Apply an update the way viewer.js does, in float64 rounded to float32.
+    """
+    width = update["width"]
+    if update["encoding"] == "full":
+        return update["values"].reshape(-1, width).copy()
+    frame = frame.copy()
+    rows = update["indices"]
+    values = update["values"].reshape(-1, width)
+    if update["encoding"] == "delta":
+        frame[rows] = values
+    else:
+        frame[rows] = frame[rows].astype(np.float64) + values * update["scale"]
+    return frame
+
+
+def test_encodings():
+    stream = GeometryStream()
+    rng = np.random.default_rng(0)
+    positions = rng.random((1000, 3), dtype=np.float32)
+    first = stream.encode(0, "position", positions)
+    assert first is not None and first["encoding"] == "full"
+    client = apply(None, first)
+
+    moved = positions.copy()
+    moved[:10] += 0.01
+    update = stream.encode(0, "position", moved)
+    assert update is not None and update["encoding"] == "delta"
+    assert update["indices"].tolist() == list(range(10))
+    client = apply(client, update)
+    np.testing.assert_array_equal(client, moved)
+    assert stream.encode(0, "position", moved) is None
+
+    # Most vertices moved, a full frame is smaller
+    full = stream.encode(0, "position", moved + 1)
+    assert full is not None and full["encoding"] == "full"
+    client = moved + 1
+
+    # Quantization errors do not accumulate over many frames
+    for step in range(1, 50):
+        target = moved + 1 + np.float32(0.001 * step) * rng.standard_normal((1000, 3))
+        update = stream.encode(0, "position", target, encoding="quantized")
+        assert update is not None and update["values"].dtype == np.int16
+        client = apply(client, update)
+        assert np.abs(client - target).max() <= update["scale"] * 0.51 + 1e-6
+    (synced,) = stream.sync_messages()[0]["attributes"]
+    np.testing.assert_array_equal(client, synced["values"].reshape(-1, 3))
+
+    with pytest.raises(ValueError, match="changed shape"):
+        stream.encode(0, "position", positions[:10])
+
+
+def test_viewer_update_geometry(monkeypatch):
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32)
+    viewer = ModelViewer.from_arrays(vertices, [[0, 1, 2]])
+    sent = []
+    monkeypatch.setattr(viewer, "_send_msg", sent.append)
+    viewer.update_geometry(positions=vertices, normals=np.tile([0, 0, 1], (3, 1)))
+    viewer.update_geometry(positions=vertices + [0, 0, 1], encoding="delta")
+    viewer._handle_msg({"type": "sync"})
+    assert [[u["encoding"] for u in m["attributes"]] for m in sent] == [
+        ["full", "full"],
+        ["delta"],
+        ["full", "full"],
+    ]
+    # A new model starts a new stream
+    viewer.src = "https://example.com/model.glb"
+    viewer.update_geometry(positions=vertices)
+    assert sent[-1]["attributes"][0]["encoding"] == "full"
@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from panel_model_viewer import ModelViewer
+from panel_model_viewer.telemetry import (
+    FRAME_BUCKETS_MS,
+    StatsAggregator,
+    frame_percentiles,
+    stats_aggregator,
+    validate_report,
+)
+
+# 90 frames of at most 16.7ms and 10 of at most 50ms
+FRAMES = [0, 0, 0, 90, 0, 0, 0, 10, 0, 0, 0, 0, 0]
+
+
+def test_frame_percentiles():
+    percentiles = frame_percentiles(FRAMES)
+    assert 12 < percentiles[0.5] <= 16.7
+    assert percentiles[0.99] == pytest.approx(33.3 + 0.9 * (50 - 33.3))
+    overflow = [0] * len(FRAME_BUCKETS_MS) + [5]
+    assert frame_percentiles(overflow)[0.5] == FRAME_BUCKETS_MS[-1]
+    assert math.isnan(frame_percentiles([0] * len(FRAMES))[0.5])
+
+
+def test_validate_report():
+    report = validate_report(
+        {"load_ms": 120, "bytes": -1, "poster_ms": "x", "renderer": "GPU" * 100,
+         "frames": FRAMES, "frame_total_ms": 1900}
+    )
+    assert report.keys() == {"load_ms", "renderer", "frames", "frame_total_ms"}
+    assert len(report["renderer"]) == 120
+    assert "frames" not in validate_report({"frames": FRAMES[:-1], "frame_total_ms": 1})
+
+
+def test_aggregator():
+    aggregator = StatsAggregator(samples=2, max_groups=2)
+    for load_ms in (100.0, 200.0, 300.0):
+        aggregator.record("Fox.glb", {"load_ms": load_ms, "renderer": "A"})
+    aggregator.record("Fox.glb", {"frames": FRAMES, "frame_total_ms": 1900, "renderer": "B"})
+    summary = aggregator.summary()
+    assert [(s["model"], s["renderer"]) for s in summary] == [("Fox.glb", "A"), ("Fox.glb", "B")]
+    # Only the most recent samples are kept
+    assert summary[0]["load_ms"]["p50"] == 250
+    assert summary[1]["frame_ms"]["count"] == 100
+    text = aggregator.prometheus()
+    assert 'model_viewer_load_seconds{model="Fox.glb",renderer="A",quantile="0.5"} 0.25' in text
+    assert 'model_viewer_frame_seconds_bucket{model="Fox.glb",renderer="B",le="+Inf"} 100' in text
+    aggregator.record("Box.glb", {"load_ms": 1.0})
+    assert len(aggregator.summary()) == 2
+
+
+def test_viewer_stats(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(b"glTF")
+    viewer = ModelViewer(src=path, collect_stats=True)
+    stats_aggregator.clear()
+    viewer._handle_msg({"type": "stats", "load_ms": 80, "renderer": "GPU"})
+    viewer._handle_msg({"type": "stats", "frames": FRAMES, "frame_total_ms": 2000})
+    assert viewer.stats["load_ms"] == 80
+    assert viewer.stats["fps"] == 50
+    assert 12 < viewer.stats["frame_ms"]["p50"] <= 16.7
+    assert {s["model"] for s in stats_aggregator.summary()} == {"model.glb"}
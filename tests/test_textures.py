@@ -0,0 +1,42 @@
+import io
+from pathlib import Path
+
+from PIL import Image
+
+from panel_model_viewer import ModelViewer
+from panel_model_viewer.gltf import GLB
+from panel_model_viewer.textures import TextureCompressor, compress_textures, recompress_image
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
+
+
+def test_compress_to_webp():
+    data = (STATIC / "astronaut.glb").read_bytes()
+    glb = GLB(compress_textures(data, max_size=512))
+    (texture,) = glb.info().textures
+    assert (texture.mime, texture.width, texture.height) == ("image/webp", 512, 512)
+    assert glb.json["textures"][0]["extensions"]["EXT_texture_webp"] == {"source": 0}
+    assert "EXT_texture_webp" in glb.json["extensionsRequired"]
+    assert glb.nbytes < len(data) / 4
+
+
+def test_compress_to_jpeg():
+    data = (STATIC / "astronaut.glb").read_bytes()
+    glb = GLB(compress_textures(data, max_size=256, format="jpeg"))
+    assert [(t.mime, t.width) for t in glb.info().textures] == [("image/jpeg", 256)]
+    assert "extensionsRequired" not in glb.json
+
+
+def test_viewer_budget():
+    stage = TextureCompressor(max_size=2048, viewer_budget=True)
+    viewer = ModelViewer(width=300, height=200)
+    assert stage.for_viewer(viewer).max_size == 1024
+    assert stage.for_viewer(ModelViewer(sizing_mode="stretch_width")) is stage
+
+
+def test_opaque_alpha_is_dropped():
+    for image in (Image.new("LA", (64, 64), (128, 255)), Image.new("RGBA", (64, 64), "red")):
+        out = io.BytesIO()
+        image.save(out, "PNG")
+        result = recompress_image(out.getvalue(), 32, "jpeg", 80)
+        assert result is not None and result[1] == "image/jpeg"
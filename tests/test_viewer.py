@@ -1,4 +1,23 @@
+import hashlib
+import io
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
 from panel_model_viewer import ModelViewer
+from panel_model_viewer import cache as cache_module
+from panel_model_viewer.cache import blob_cache
+from panel_model_viewer.lod import LevelOfDetail
+from panel_model_viewer.memory import session_ledger
+from panel_model_viewer.optimize import MeshOptimizer
+from panel_model_viewer.store import ModelStore
+from panel_model_viewer.viewer import SRC_HANDLE
+
+STATIC = Path(__file__).parent.parent / "panel_model_viewer" / "static"
 
 
 def test_model_viewer_init():
@@ -29,3 +48,256 @@ def test_click_handling():
     viewer._handle_click(MockEvent())
 
     assert viewer.clicked["clientX"] == 100
+
+
+def test_src_http_transport(tmp_path):
+    d = tmp_path / "test.glb"
+    d.write_bytes(b"glTF")
+
+    viewer = ModelViewer(src=d, transport="http")
+    digest = hashlib.sha256(b"glTF").hexdigest()
+    assert viewer.src == f"model_viewer_assets/{digest}.glb"
+    assert digest in blob_cache
+
+
+def test_src_shared_between_viewers(tmp_path):
+    d = tmp_path / "test.glb"
+    d.write_bytes(b"glTF")
+
+    first, second = ModelViewer(src=d), ModelViewer(src=d.read_bytes())
+    assert first.src is second.src
+
+
+def test_src_async_loading(tmp_path):
+    d = tmp_path / "test.glb"
+    d.write_bytes(b"glTF" * 1000)
+
+    viewer = ModelViewer(src=d, load_async=True)
+    deadline = time.monotonic() + 5
+    while viewer.loading and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert viewer.loading is False
+    assert viewer.bytes_loaded == 4000
+    assert viewer.src.startswith("data:model/gltf-binary;base64,")
+
+
+def test_src_async_loading_error(tmp_path):
+    viewer = ModelViewer(src=tmp_path / "missing.glb", load_async=True)
+    deadline = time.monotonic() + 5
+    while viewer.loading and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert viewer.src is None
+    assert viewer.load_error is not None and "missing.glb" in viewer.load_error
+
+
+def test_src_assignment_is_processed(tmp_path):
+    d = tmp_path / "test.glb"
+    d.write_bytes(b"glTF")
+
+    viewer = ModelViewer(src="https://example.com/model.glb")
+    model = viewer.get_root()
+    viewer.src = d
+    assert viewer.src.startswith("data:model/gltf-binary;base64,")
+    assert model.data.src == viewer.src  # ty: ignore[unresolved-attribute]
+
+
+def test_prefetch(tmp_path, monkeypatch):
+    d = tmp_path / "test.glb"
+    d.write_bytes(b"prefetched glTF")
+
+    viewer = ModelViewer(transport="http")
+    sent = []
+    monkeypatch.setattr(viewer, "_send_msg", sent.append)
+    viewer.prefetch([d, "https://example.com/model.glb"])
+    deadline = time.monotonic() + 5
+    while not sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    digest = hashlib.sha256(b"prefetched glTF").hexdigest()
+    assert digest in blob_cache
+    assert sent == [
+        {
+            "type": "prefetch",
+            "urls": [f"model_viewer_assets/{digest}.glb", "https://example.com/model.glb"],
+        }
+    ]
+
+
+def test_prefetch_does_not_encode_data_uris(tmp_path, monkeypatch):
+    d = tmp_path / "test.glb"
+    d.write_bytes(b"prefetched data URI glTF")
+
+    viewer = ModelViewer()
+    sent = []
+    monkeypatch.setattr(viewer, "_send_msg", sent.append)
+    viewer.prefetch([d, "https://example.com/model.glb"])
+    deadline = time.monotonic() + 5
+    while not sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    digest = hashlib.sha256(b"prefetched data URI glTF").hexdigest()
+    assert sent == [{"type": "prefetch", "urls": ["https://example.com/model.glb"]}]
+    assert "data_uri" not in blob_cache._entries[digest].representations
+
+
+def test_auto_camera():
+    viewer = ModelViewer(src=STATIC / "Box.glb", auto_camera=True)
+    assert viewer.model_info is not None and viewer.model_info.triangle_count == 12
+    assert viewer.camera_target == "0m 0m 0m"
+    assert viewer.camera_orbit is not None and viewer.camera_orbit.startswith("0deg 75deg")
+    assert "model_info" not in viewer.get_root().data.properties()  # ty: ignore[unresolved-attribute]
+
+
+def test_corrupt_glb_is_shown_without_info():
+    data = b"glTF" + (2).to_bytes(4, "little") + (29).to_bytes(4, "little")
+    data += (9).to_bytes(4, "little") + b"JSON{not json"
+    viewer = ModelViewer(src=data)
+    assert viewer.src.startswith("data:model/gltf-binary;base64,")
+    assert viewer.model_info is None
+
+
+def test_max_gpu_bytes():
+    with pytest.raises(ValueError, match="max_gpu_bytes"):
+        ModelViewer(src=STATIC / "Fox.glb", max_gpu_bytes=1024**2)
+
+
+def test_pipeline():
+    viewer = ModelViewer(src=STATIC / "Box.glb", pipeline=[MeshOptimizer()])
+    assert viewer.model_info is not None and viewer.model_info.geometry_bytes < 648
+
+
+def test_lod_sources(tmp_path):
+    lod = LevelOfDetail(resolutions=[4, 16], cache_dir=str(tmp_path))
+    viewer = ModelViewer(src=STATIC / "Fox.glb", transport="http", lod=lod)
+    levels = viewer.lod_sources
+    assert [level["resolution"] for level in levels] == [4, 16, None]
+    assert levels[-1]["src"] == viewer.src
+    assert levels[0]["triangles"] < levels[1]["triangles"] < levels[2]["triangles"]
+    assert len(list(tmp_path.glob("*.glb"))) == 2
+
+    viewer.src = "https://example.com/model.glb"
+    assert viewer.lod_sources == []
+
+
+def test_lod_requires_http_transport(tmp_path):
+    lod = LevelOfDetail(resolutions=[4, 16], cache_dir=str(tmp_path))
+    viewer = ModelViewer(src=STATIC / "Fox.glb", lod=lod)
+    assert viewer.lod_sources == []
+    assert not list(tmp_path.glob("*.glb"))
+
+
+def test_auto_poster():
+    viewer = ModelViewer(
+        src=STATIC / "Box.glb", transport="http", auto_poster=True, width=40, height=30
+    )
+    assert viewer.poster is not None and viewer.poster.endswith(".webp")
+    digest = viewer.poster.rsplit("/", 1)[-1].split(".")[0]
+    poster = blob_cache.get(digest)
+    assert poster is not None and poster.mime == "image/webp"
+
+
+def test_render_policy():
+    viewer = ModelViewer(render_policy="visible", max_fps=10)
+    properties = viewer.get_root().data.properties()  # ty: ignore[unresolved-attribute]
+    assert {"render_policy", "max_fps", "render_state"} <= properties
+    assert viewer.render_state == "running"
+    with pytest.raises(ValueError):
+        viewer.max_fps = 0
+
+
+def test_camera_sync():
+    viewer = ModelViewer()
+    viewer._handle_msg(
+        {
+            "type": "camera",
+            "camera_orbit": "45deg 60deg 2m",
+            "camera_target": "0m 1m 0m",
+            "field_of_view": "30deg",
+        }
+    )
+    assert viewer.camera_orbit == "45deg 60deg 2m"
+    assert viewer.camera_target == "0m 1m 0m"
+    assert viewer.field_of_view == "30deg"
+
+
+def test_batch_update():
+    viewer = ModelViewer()
+    with viewer.batch_update(auto_rotate=True, style={"color": "red"}) as batched:
+        batched.alt = "Batched"
+    assert (viewer.auto_rotate, viewer.style, viewer.alt) == (True, {"color": "red"}, "Batched")
+
+
+def test_materials():
+    viewer = ModelViewer(src=STATIC / "Box.glb")
+    assert "materials" in viewer.get_root().data.properties()  # ty: ignore[unresolved-attribute]
+    viewer.set_material("Red", base_color="#00ff00", metallic=0.5)
+    viewer.set_material("Red", roughness=0.25, base_color_texture=_png())
+    edit = viewer.materials["Red"]
+    assert (edit["base_color"], edit["metallic"], edit["roughness"]) == ("#00ff00", 0.5, 0.25)
+    assert edit["base_color_texture"].startswith("data:image/png;base64,")
+    viewer.set_material("Red", base_color=(1, 0, 0))
+    assert viewer.materials["Red"]["base_color"] == [1.0, 0.0, 0.0, 1.0]
+    with pytest.raises(ValueError, match="no material"):
+        viewer.set_material("Blue", metallic=1)
+    with pytest.raises(ValueError):
+        viewer.set_material("Red", base_color=(2, 0, 0))
+    viewer.reset_material("Red")
+    assert viewer.materials == {}
+
+
+def _png() -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (4, 4), "blue").save(out, "PNG")
+    return out.getvalue()
+
+
+def test_release_src(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "DEFAULT_CACHE_DIR", tmp_path)
+    # A model no earlier test has cached
+    vertices = np.eye(3) + time.time()
+    viewer = ModelViewer.from_arrays(vertices, [[0, 1, 2]], pickable=True)
+    sent = []
+    monkeypatch.setattr(viewer, "_send_msg", sent.append)
+    digest = viewer.source_digest
+    assert digest is not None
+    blob = blob_cache.get(digest)
+    assert blob is not None
+    data = blob.data
+    # Acknowledgements of an earlier model are ignored
+    viewer._handle_msg({"type": "loaded", "digest": "0" * 64})
+    assert viewer.src.startswith("data:")
+    viewer._handle_msg({"type": "loaded", "digest": digest})
+    assert viewer.src == SRC_HANDLE + digest
+    spilled = tmp_path / "spill" / f"{digest}.{os.getpid()}"
+    assert spilled.read_bytes() == data
+    assert viewer.spatial_index() is not None
+    # New views request the payload of the current source only
+    viewer._handle_msg({"type": "payload", "digest": "0" * 64})
+    viewer._handle_msg({"type": "payload", "digest": digest})
+    assert [(m["type"], m["data"]) for m in sent] == [("payload", data)]
+    viewer.src = "https://example.com/model.glb"
+    assert viewer.source_digest is None
+    # No viewer uses the spilled file anymore
+    assert not spilled.exists()
+
+
+def test_max_session_bytes():
+    session_ledger.clear()
+    first = ModelViewer(src=b"glTF" * 100, max_session_bytes=1000)
+    second = ModelViewer(src=b"glTF" * 101, max_session_bytes=1000)
+    assert first.src.startswith("data:")
+    assert second.source_digest is not None
+    assert second.src == SRC_HANDLE + second.source_digest
+    assert session_ledger.stats()["bytes"] == len(first.src)
+    first.src = "https://example.com/model.glb"
+    second.src = b"glTF" * 102
+    assert second.src.startswith("data:")
+
+
+def test_store_defaults_to_http_transport(tmp_path, monkeypatch):
+    assert ModelViewer().transport == "data_uri"
+    monkeypatch.setattr(blob_cache, "store", ModelStore(tmp_path))
+    assert ModelViewer().transport == "http"
+    assert ModelViewer(transport="data_uri").transport == "data_uri"
@@ -16,10 +16,12 @@ def verify_assets_present():
     Debug: Verify if static assets exist.
     """
     import panel_model_viewer
+    from panel_model_viewer.runtime import runtime_file
+
     module_dir = Path(panel_model_viewer.__file__).parent
-    static_file = module_dir / "static" / "model-viewer.min.js"
+    static_file = runtime_file()
     print(f"Checking for static asset at: {static_file}")
-    if static_file.exists():
+    if static_file is not None:
         print(f"Static asset found. Size: {static_file.stat().st_size} bytes")
     else:
         print("ERROR: Static asset NOT FOUND!")